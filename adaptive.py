@@ -0,0 +1,211 @@
+import functools
+import math
+import time
+from enums import *
+from rate_table import current_policy
+from borrower_scoring import Decision
+
+
+DEFAULT_SAMPLE_EVERY = 256
+DEFAULT_REORDER_EVERY = 16384
+
+# Rules before the half-income cap, which needs the payment and stays last.
+RULES = (
+    Reason.UNRELIABLE_BORROWER,
+    Reason.LOAN_RATING_PROHIBITED,
+    Reason.RETIREMENT_AGE,
+    Reason.THIRD_OF_INCOME,
+    Reason.AVAILABLE_LOAN_AMOUNT
+)
+
+# Rejection tests of RULES on record r under policy p, as in Scorer.score().
+_TESTS = {
+    Reason.UNRELIABLE_BORROWER: 'r.income_source is IncomeSource_UNEMPLOYED',
+    Reason.LOAN_RATING_PROHIBITED: 'r.loan_rating is LoanRating_PROHIBITED',
+    Reason.RETIREMENT_AGE: '(r.age + r.credit_term) > p.retirement_age[r.sex.code]',
+    Reason.THIRD_OF_INCOME: 'r.loan_amount / r.credit_term > r.income_amount / 3',
+    Reason.AVAILABLE_LOAN_AMOUNT: 'p.available_loan_amount[r.rate_index] < r.loan_amount'
+}
+
+_NAMESPACE = {
+    'log10': math.log10,
+    'IncomeSource_UNEMPLOYED': IncomeSource.UNEMPLOYED,
+    'LoanRating_PROHIBITED': LoanRating.PROHIBITED,
+    'Decision': Decision,
+    'Reason_APPROVED': Reason.APPROVED,
+    'Reason_HALF_OF_INCOME': Reason.HALF_OF_INCOME,
+    'REJECTED': tuple(Decision(reason, None, None) for reason in Reason)
+}
+
+_CHECKS = {reason: eval('lambda r, p: ' + test, dict(_NAMESPACE)) for reason, test in _TESTS.items()}
+
+
+class AdaptiveScorer:
+    """Scorer with the rules before the half-income cap checked in an order learned from traffic.
+
+    Every sample_every-th call also runs each rule on its own, timing it and
+    noting whether it rejects; every reorder_every calls the rules are sorted
+    by cost per rejection, the best order for independent filters, and older
+    observations count half from then on.
+
+    score() returns the same as Scorer.score(). decide() returns the same
+    Decision as Scorer.decide(): after a rule rejects, the rules canonically
+    before it that have not run yet are checked too, and the first of them
+    that rejects gives the reason. So only score(), which needs no reason,
+    can do less work than the canonical order.
+    """
+
+    __order = RULES
+    __score = None
+    __decide = None
+    __countdown = None
+
+    def __init__(self, sample_every=DEFAULT_SAMPLE_EVERY, reorder_every=DEFAULT_REORDER_EVERY):
+        if sample_every < 1 or reorder_every < sample_every:
+            raise ValueError('sample_every must be positive and reorder_every at least sample_every')
+
+        self.__sample_every = sample_every
+        self.__samples_per_reorder = reorder_every // sample_every
+        self.__samples = 0
+        self.__countdown = sample_every
+        self.__checks = {reason: 0.0 for reason in RULES}
+        self.__rejections = {reason: 0.0 for reason in RULES}
+        self.__nanoseconds = {reason: 0.0 for reason in RULES}
+        self.__timer_nanoseconds = _timer_overhead()
+        self.__use(RULES)
+
+    @property
+    def order(self):
+        return self.__order
+
+    def statistics(self):
+        """{rule: (share of sampled records it rejects, nanoseconds per check)} of the decayed samples."""
+        return {
+            reason: (
+                self.__rejections[reason] / self.__checks[reason] if self.__checks[reason] else 0.0,
+                self.__nanoseconds[reason] / self.__checks[reason] if self.__checks[reason] else 0.0
+            )
+            for reason in RULES
+        }
+
+    def score(self, record, policy=None):
+        """Year payment or None, as Scorer.score()."""
+        if policy is None:
+            policy = current_policy()
+
+        self.__countdown -= 1
+
+        if self.__countdown <= 0:
+            self.__sample(record, policy)
+
+        return self.__score(record, policy)
+
+    def decide(self, record, policy=None):
+        """Decision with the reason of the canonical rule order, as Scorer.decide()."""
+        if policy is None:
+            policy = current_policy()
+
+        self.__countdown -= 1
+
+        if self.__countdown <= 0:
+            self.__sample(record, policy)
+
+        return self.__decide(record, policy)
+
+    def __sample(self, record, policy):
+        self.__countdown = self.__sample_every
+        clock = time.perf_counter_ns
+
+        for reason, check in _CHECKS.items():
+            started = clock()
+            rejected = check(record, policy)
+            elapsed = clock() - started
+
+            self.__checks[reason] += 1
+            self.__rejections[reason] += rejected
+            self.__nanoseconds[reason] += max(elapsed - self.__timer_nanoseconds, 1)
+
+        self.__samples += 1
+
+        if self.__samples >= self.__samples_per_reorder:
+            self.__reorder()
+
+    def __reorder(self):
+        statistics = self.statistics()
+
+        # Expected cost of a check per rejection it makes, rules that never
+        # reject go last, in canonical order.
+        def rank(reason):
+            share, nanoseconds = statistics[reason]
+
+            return (0, nanoseconds / share, reason) if share else (1, 0, reason)
+
+        self.__use(tuple(sorted(RULES, key=rank)))
+
+        for observations in (self.__checks, self.__rejections, self.__nanoseconds):
+            for reason in RULES:
+                observations[reason] /= 2
+
+        self.__samples = 0
+
+    def __use(self, order):
+        self.__score, self.__decide = _compiled(order)
+        self.__order = order
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(order):
+    """score and decide functions of record and policy checking the rules in order."""
+    namespace = dict(_NAMESPACE)
+    exec(compile(_source(order), '<rule order %s>' % ', '.join(reason.name for reason in order), 'exec'), namespace)
+
+    return namespace['score'], namespace['decide']
+
+
+def _source(order):
+    payment = [
+        '    rate = p.fixed_rate[r.rate_index] - log10(r.loan_amount)',
+        '    payment = (r.loan_amount * (1 + r.credit_term * (rate / 100))) / r.credit_term'
+    ]
+    lines = ['def score(r, p):']
+
+    for reason in order:
+        lines.append('    if %s:' % _TESTS[reason])
+        lines.append('        return None')
+
+    lines.extend(payment)
+    lines.append('    if payment > (r.income_amount / 2):')
+    lines.append('        return None')
+    lines.append('    return payment')
+
+    lines.append('def decide(r, p):')
+    passed = set()
+
+    for reason in order:
+        lines.append('    if %s:' % _TESTS[reason])
+
+        for earlier in RULES[:RULES.index(reason)]:
+            if earlier not in passed:
+                lines.append('        if %s:' % _TESTS[earlier])
+                lines.append('            return REJECTED[%d]' % earlier)
+
+        lines.append('        return REJECTED[%d]' % reason)
+        passed.add(reason)
+
+    lines.extend(payment)
+    lines.append('    if payment > (r.income_amount / 2):')
+    lines.append('        return Decision(Reason_HALF_OF_INCOME, None, rate)')
+    lines.append('    return Decision(Reason_APPROVED, payment, rate)')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _timer_overhead():
+    clock = time.perf_counter_ns
+    elapsed = []
+
+    for _ in range(1000):
+        started = clock()
+        elapsed.append(clock() - started)
+
+    return sorted(elapsed)[len(elapsed) // 2]
@@ -0,0 +1,155 @@
+import time
+import numpy as np
+import audit
+import metrics
+from enums import *
+from rate_table import current_policy
+from batch_scoring import FIELDS, decide_rules, reason_of_rules, validate_batch
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+DEFAULT_BATCH_SIZE = 65536
+
+_ENUMS = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+_CODES = {field: {member.name: member.code for member in enum} for field, enum in _ENUMS.items()}
+_REASON_NAMES = [reason.name for reason in Reason]
+
+# Code of a null or unknown enum value, validate_batch reports it as invalid.
+_NULL_CODE = -1
+
+
+def decide_record_batch(batch, id_field='id', policy=None):
+    """Arrow record batch of decisions for a record batch of applications.
+
+    Enum columns hold member names, plain or dictionary encoded, and only
+    the dictionary is decoded in Python. The result has the id_field column
+    if batch has one, payment (null when rejected), reason and policy_version
+    as dictionary columns, and errors as the uint8 validate_batch bit set.
+    Nulls make a row invalid.
+    """
+    _require_pyarrow()
+    policy = policy or current_policy()
+    missing = [field for field in FIELDS if field not in batch.schema.names]
+
+    if missing:
+        raise ValueError('field %r is missing' % missing[0])
+
+    instruments = metrics.active
+    log = audit.active
+
+    if instruments is not None:
+        started = time.perf_counter()
+
+    # Every numeric column is converted whole rather than only the rows the
+    # enum prefilter below keeps: without nulls to_numpy is a zero-copy view,
+    # with them one copy, while take() on the kept rows and checking the
+    # rejected ones in Arrow cost more than both.
+    columns = {}
+
+    for field in FIELDS:
+        column = batch.column(field)
+        columns[field] = _codes(field, column) if field in _ENUMS else column.to_numpy(zero_copy_only=False)
+
+    errors = validate_batch(**columns)
+    payment = np.full(batch.num_rows, np.nan)
+
+    # The first two rules only read enum codes, rows they reject skip the
+    # payment arithmetic altogether.
+    unreliable = columns['income_source'] == IncomeSource.UNEMPLOYED.code
+    prohibited = columns['loan_rating'] == LoanRating.PROHIBITED.code
+    reason = np.where(unreliable, Reason.UNRELIABLE_BORROWER, Reason.LOAN_RATING_PROHIBITED).astype(np.int8)
+
+    # decide_rules rather than decide_batch, the whole batch is counted and
+    # audited below, not only the rows scored here.
+    scored = np.flatnonzero(~(unreliable | prohibited) & (errors == 0))
+    scored_payment, rules = decide_rules(
+        **{field: column.take(scored) for field, column in columns.items()}, policy=policy
+    )
+    reason[scored] = reason_of_rules(rules)
+    payment[scored] = np.where(reason[scored] == Reason.APPROVED, scored_payment, np.nan)
+    reason[errors != 0] = Reason.INVALID
+
+    if instruments is not None:
+        instruments.observe_batch(time.perf_counter() - started, np.bincount(reason, minlength=len(Reason)).tolist())
+
+    if log is not None:
+        log.append_batch(tuple(columns[field] for field in FIELDS), reason, payment, None, policy)
+
+    arrays = [
+        pa.array(payment, mask=np.isnan(payment)),
+        pa.DictionaryArray.from_arrays(reason, _REASON_NAMES),
+        pa.array(errors),
+        pa.DictionaryArray.from_arrays(np.zeros(batch.num_rows, dtype=np.int8), [policy.version])
+    ]
+    names = ['payment', 'reason', 'errors', 'policy_version']
+
+    if id_field in batch.schema.names:
+        arrays.insert(0, batch.column(id_field))
+        names.insert(0, id_field)
+
+    return pa.RecordBatch.from_arrays(arrays, names)
+
+
+def score_parquet(source, destination, batch_size=DEFAULT_BATCH_SIZE, id_field='id', policy=None):
+    """Writes decide_record_batch results of a Parquet file to another one, returns the number of rows.
+
+    Only the scoring columns and id_field are read, batch by batch, and the
+    whole file is scored with one policy.
+    """
+    _require_pyarrow()
+    policy = policy or current_policy()
+    parquet = pq.ParquetFile(source, read_dictionary=list(_ENUMS))
+    names = parquet.schema_arrow.names
+    missing = [field for field in FIELDS if field not in names]
+
+    if missing:
+        raise ValueError('field %r is missing' % missing[0])
+
+    columns = list(FIELDS) + ([id_field] if id_field in names else [])
+    writer = None
+    rows = 0
+
+    try:
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+            decisions = decide_record_batch(batch, id_field, policy)
+
+            if writer is None:
+                writer = pq.ParquetWriter(destination, decisions.schema)
+
+            writer.write_batch(decisions)
+            rows += batch.num_rows
+
+        if writer is None:
+            schema = pa.schema([parquet.schema_arrow.field(name) for name in columns])
+            empty = pa.RecordBatch.from_arrays([pa.array([], type=field.type) for field in schema], schema=schema)
+            writer = pq.ParquetWriter(destination, decide_record_batch(empty, id_field, policy).schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows
+
+
+def _codes(field, column):
+    if not pa.types.is_dictionary(column.type):
+        column = column.dictionary_encode()
+
+    codes = _CODES[field]
+
+    # Unknown names make the row invalid like nulls, not the whole file fail.
+    lookup = [codes.get(name, _NULL_CODE) for name in column.dictionary.to_pylist()]
+    lookup.append(_NULL_CODE)
+
+    indices = column.indices.fill_null(len(lookup) - 1).to_numpy(zero_copy_only=False)
+
+    return np.array(lookup, dtype=np.int8).take(indices)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('Arrow and Parquet scoring needs pyarrow, pip install pyarrow')
@@ -0,0 +1,416 @@
+import atexit
+import gzip
+import json
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+import numpy as np
+from enums import *
+from rate_table import current_policy
+
+
+FORMATS = ('jsonl', 'binary')
+WHEN_FULL = ('drop', 'block')
+
+DEFAULT_CAPACITY = 65536
+DEFAULT_SEGMENT_SIZE = 64 * 2 ** 20
+DEFAULT_FSYNC_BYTES = 2 ** 20
+DEFAULT_FSYNC_SECONDS = 1
+
+INPUT_FIELDS = ('age', 'income_amount', 'loan_rating', 'loan_amount', 'credit_term', 'sex', 'income_source', 'purpose')
+
+# Rows of a binary segment. Inputs are floats, as batch rows failing
+# validation may hold any number; payment and rate are NaN where a
+# Decision has None.
+AUDIT_DTYPE = np.dtype(
+    [('time', '<f8')] + [(field, '<f8') for field in INPUT_FIELDS] +
+    [('reason', 'i1'), ('payment', '<f8'), ('rate', '<f8')]
+)
+
+# A binary segment is a sequence of blocks: the policy version length and
+# the row count, the version and the AUDIT_DTYPE rows.
+_BLOCK = struct.Struct('<HI')
+
+_EXTENSIONS = {'jsonl': '.jsonl.gz', 'binary': '.bin.gz'}
+
+# Member names per AUDIT_DTYPE field written by name, None for numbers.
+_FIELD_NAMES = tuple(
+    tuple(member.name for member in enum) if enum is not None else None
+    for enum in (None, None, None, LoanRating, None, None, Sex, IncomeSource, Purpose, Reason, None, None)
+)
+_INTEGER_FIELDS = ('age', 'income_amount', 'credit_term')
+
+# Level 1 compresses JSON Lines about 7 times at less than half the time of the default level.
+_COMPRESS_LEVEL = 1
+
+# Seconds between the writer's looks at a buffer that is not filling up.
+_POLL_SECONDS = 0.05
+
+# Scalar decisions serialized at once, blocked producers resume in between.
+_ROWS_PER_WRITE = 4096
+
+# AuditLog installed by enable(). Scoring code only compares it with None
+# while disabled.
+active = None
+
+
+class AuditLog:
+    """Decisions with their inputs, rate and policy version, written by a background thread.
+
+    Scoring threads only append to a deque of at most about capacity
+    entries, a batch call being one entry. The writer drains it into gzip
+    segments of directory in the given format, starts a new segment after
+    segment_size uncompressed bytes and fsyncs after fsync_bytes or
+    fsync_seconds. When the deque is full, when_full='drop' counts the rows
+    in dropped and when_full='block' waits for the writer. Scalar records
+    are kept by reference until written, batch columns are copied.
+    """
+
+    error = None
+
+    def __init__(self, directory, format='jsonl', capacity=DEFAULT_CAPACITY, when_full='drop',
+                 segment_size=DEFAULT_SEGMENT_SIZE, fsync_bytes=DEFAULT_FSYNC_BYTES,
+                 fsync_seconds=DEFAULT_FSYNC_SECONDS):
+        if format not in FORMATS:
+            raise ValueError('unknown audit format %r, expected one of %s' % (format, ', '.join(FORMATS)))
+
+        if when_full not in WHEN_FULL:
+            raise ValueError('when_full must be one of %s' % ', '.join(WHEN_FULL))
+
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.__directory = directory
+        self.__format = format
+        self.__capacity = capacity
+        self.__high_water = capacity // 2
+        self.__block = when_full == 'block'
+        self.__segment_size = segment_size
+        self.__fsync_bytes = fsync_bytes
+        self.__fsync_seconds = fsync_seconds
+        # deque.append and popleft are atomic, so scoring threads take no lock.
+        self.__buffer = deque()
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__drained = threading.Event()
+        self.__stopping = False
+        self.__raw = None
+        self.__stream = None
+        self.__segment_bytes = 0
+        self.__unsynced_bytes = 0
+        self.__synced = time.monotonic()
+        self.paths = []
+        self.written = 0
+        self.dropped = 0
+
+        self.__writer = threading.Thread(target=self.__run, name='audit-writer', daemon=True)
+        self.__writer.start()
+        atexit.register(self.close)
+
+    def score(self, scorer, record, instruments=None):
+        """scorer.score(record), counted by instruments, a ScoringMetrics, if given."""
+        return self.decide(scorer, record, instruments).payment
+
+    def decide(self, scorer, record, instruments=None):
+        """scorer.decide(record) under the current policy, queued for the log."""
+        policy = current_policy()
+
+        if instruments is None:
+            decision = scorer.decide(record, policy)
+        else:
+            decision = instruments.decide(scorer, record, policy)
+
+        entry = (time.time(), record, decision, policy)
+        buffer = self.__buffer
+
+        if len(buffer) < self.__high_water:
+            buffer.append(entry)
+        else:
+            self.__queue(entry, 1)
+
+        return decision
+
+    def append_batch(self, columns, reason, payment, rate, policy):
+        """Queues decision_batch results for columns in INPUT_FIELDS order; rate None is worked out by the writer."""
+        self.__queue((
+            time.time(), tuple(np.array(column, dtype=np.float64) for column in columns),
+            (reason.copy(), payment.copy(), None if rate is None else rate.copy()), policy
+        ), len(reason))
+
+    def flush(self, timeout=None):
+        """Waits until everything queued so far is written and fsynced, False on timeout or a failed writer."""
+        done = threading.Event()
+        self.__buffer.append(done)
+        self.__wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not done.wait(_POLL_SECONDS):
+            if not self.__writer.is_alive() or (deadline is not None and time.monotonic() > deadline):
+                return False
+
+        return True
+
+    def close(self):
+        """Writes what is queued, closes the segment and stops the writer; error tells if writing failed."""
+        atexit.unregister(self.close)
+        self.__stopping = True
+        self.__wakeup.set()
+        self.__writer.join()
+
+    def __queue(self, entry, rows):
+        buffer = self.__buffer
+
+        if len(buffer) < self.__high_water:
+            buffer.append(entry)
+            return
+
+        self.__wakeup.set()
+
+        if self.__block:
+            while len(buffer) >= self.__capacity and self.__writer.is_alive():
+                self.__drained.clear()
+                self.__drained.wait(_POLL_SECONDS)
+
+        if len(buffer) < self.__capacity and self.__writer.is_alive():
+            buffer.append(entry)
+            return
+
+        with self.__lock:
+            self.dropped += rows
+
+    def __run(self):
+        try:
+            while True:
+                self.__wakeup.wait(_POLL_SECONDS)
+                self.__wakeup.clear()
+                stopping = self.__stopping
+                self.__drain()
+
+                if stopping:
+                    break
+        except (OSError, ValueError) as error:
+            self.error = error
+        finally:
+            self.__drained.set()
+
+            try:
+                self.__close_segment()
+            except (OSError, ValueError) as error:
+                self.error = self.error or error
+
+    def __drain(self):
+        buffer = self.__buffer
+        rows = []
+        policy = None
+
+        while buffer:
+            entry = buffer.popleft()
+
+            if isinstance(entry, threading.Event):
+                self.__write(policy, rows)
+                rows = []
+                self.__sync()
+                entry.set()
+                continue
+
+            if entry[3] is not policy:
+                self.__write(policy, rows)
+                rows = []
+                policy = entry[3]
+
+            if isinstance(entry[2][0], np.ndarray):
+                self.__write(policy, rows)
+                rows = []
+                self.__write(policy, _batch_rows(*entry))
+            else:
+                rows.append(_scalar_row(*entry))
+
+            if len(rows) >= _ROWS_PER_WRITE:
+                self.__write(policy, rows)
+                rows = []
+                self.__drained.set()
+
+        self.__write(policy, rows)
+        self.__drained.set()
+
+        if self.__unsynced_bytes and (
+            self.__unsynced_bytes >= self.__fsync_bytes or time.monotonic() - self.__synced >= self.__fsync_seconds
+        ):
+            self.__sync()
+
+    def __write(self, policy, rows):
+        if not len(rows):
+            return
+
+        if not isinstance(rows, np.ndarray):
+            rows = np.array(rows, dtype=AUDIT_DTYPE)
+
+        version = policy.version
+
+        if self.__format == 'binary':
+            data = _BLOCK.pack(len(version.encode()), len(rows)) + version.encode() + rows.tobytes()
+        else:
+            data = ''.join(json.dumps(_row_dict(values, version)) + '\n' for values in rows.tolist()).encode()
+
+        if self.__stream is None:
+            self.__open_segment()
+
+        self.__stream.write(data)
+        self.written += len(rows)
+        self.__segment_bytes += len(data)
+        self.__unsynced_bytes += len(data)
+
+        if self.__segment_bytes >= self.__segment_size:
+            self.__close_segment()
+
+    def __open_segment(self):
+        path = os.path.join(self.__directory, 'audit-%s-%d-%06d%s' % (
+            time.strftime('%Y%m%dT%H%M%S'), os.getpid(), len(self.paths), _EXTENSIONS[self.__format]
+        ))
+        self.__raw = open(path, 'xb')
+        self.__stream = gzip.GzipFile(fileobj=self.__raw, mode='wb', compresslevel=_COMPRESS_LEVEL)
+        self.__segment_bytes = 0
+        self.paths.append(path)
+        _fsync_directory(self.__directory)
+
+    def __close_segment(self):
+        if self.__stream is None:
+            return
+
+        stream, raw = self.__stream, self.__raw
+        self.__stream = self.__raw = None
+
+        try:
+            stream.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        finally:
+            raw.close()
+
+        self.__unsynced_bytes = 0
+        self.__synced = time.monotonic()
+
+    def __sync(self):
+        if self.__stream is not None:
+            self.__stream.flush()
+            os.fsync(self.__raw.fileno())
+
+        self.__unsynced_bytes = 0
+        self.__synced = time.monotonic()
+
+
+def enable(directory, format='jsonl', **options):
+    """Starts logging decisions into a new AuditLog and returns it, see AuditLog for the options."""
+    global active
+
+    disable()
+    active = AuditLog(directory, format, **options)
+
+    return active
+
+
+def disable():
+    """Stops logging and closes the log after it has written what is queued."""
+    global active
+
+    log, active = active, None
+
+    if log is not None:
+        log.close()
+
+
+def read_segment(path):
+    """Rows of a segment as dicts, like its JSON Lines; a segment cut short by a crash gives its complete rows."""
+    with open(path, 'rb') as stream:
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(stream.read())
+
+    if path.endswith(_EXTENSIONS['jsonl']):
+        return [json.loads(line) for line in data.split(b'\n')[:-1]]
+
+    rows = []
+    offset = 0
+
+    while offset + _BLOCK.size <= len(data):
+        version_length, count = _BLOCK.unpack_from(data, offset)
+        start = offset + _BLOCK.size + version_length
+        offset = start + count * AUDIT_DTYPE.itemsize
+
+        if offset > len(data):
+            break
+
+        version = data[start - version_length:start].decode()
+        block = np.frombuffer(data, dtype=AUDIT_DTYPE, count=count, offset=start)
+        rows.extend(_row_dict(values, version) for values in block.tolist())
+
+    return rows
+
+
+def _scalar_row(when, record, decision, policy):
+    payment = decision.payment
+    rate = decision.rate
+
+    return (
+        when, record.age, record.income_amount, record.loan_rating.code, record.loan_amount, record.credit_term,
+        record.sex.code, record.income_source.code, record.purpose.code, decision.reason,
+        np.nan if payment is None else payment, np.nan if rate is None else rate
+    )
+
+
+def _batch_rows(when, columns, decision, policy):
+    reason, payment, rate = decision
+    rows = np.empty(len(reason), dtype=AUDIT_DTYPE)
+    rows['time'] = when
+
+    for field, column in zip(INPUT_FIELDS, columns):
+        rows[field] = column
+
+    rows['reason'] = reason
+    rows['payment'] = payment
+
+    if rate is None:
+        # Same arithmetic as decision_batch, for the rows it gives a rate.
+        age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose = columns
+        rated = (reason == Reason.APPROVED) | (reason == Reason.HALF_OF_INCOME)
+        index = ((purpose[rated] * len(LoanRating) + loan_rating[rated]) * len(IncomeSource) + income_source[rated])
+        rate = np.full(len(reason), np.nan)
+        rate[rated] = np.array(policy.fixed_rate, dtype=np.float64).take(index.astype(np.intp)) - np.log10(
+            loan_amount[rated]
+        )
+
+    rows['rate'] = rate
+
+    return rows
+
+
+def _row_dict(values, version):
+    row = {}
+
+    for field, value, names in zip(AUDIT_DTYPE.names, values, _FIELD_NAMES):
+        if names is not None:
+            if value in range(len(names)):
+                value = names[int(value)]
+        elif math.isnan(value):
+            value = None
+        elif field in _INTEGER_FIELDS and value.is_integer():
+            value = int(value)
+
+        row[field] = value
+
+    row['policy_version'] = version
+
+    return row
+
+
+def _fsync_directory(directory):
+    descriptor = os.open(directory, os.O_RDONLY)
+
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
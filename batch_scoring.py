@@ -0,0 +1,404 @@
+import functools
+import math
+import time
+from collections import namedtuple
+from collections.abc import Hashable
+import numpy as np
+import audit
+import metrics
+from enums import *
+from exceptions import *
+from rate_table import current_policy
+
+
+FIELDS = ('age', 'income_amount', 'loan_rating', 'loan_amount', 'credit_term', 'sex', 'income_source', 'purpose')
+
+_ENUMS = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+_CODES = {field: {member.name: member.code for member in enum} for field, enum in _ENUMS.items()}
+_DTYPES = {'age': np.float64, 'income_amount': np.float64, 'loan_amount': np.float64, 'credit_term': np.float64}
+
+# Bit i of a validate_batch result stands for VALIDATION_ERRORS[i].
+VALIDATION_ERRORS = (
+    InvalidAgeException,
+    InvalidIncomeAmountException,
+    InvalidLoanRatingException,
+    InvalidLoanAmountException,
+    InvalidCreditTermException,
+    InvalidSexException,
+    InvalidIncomeSourceException,
+    InvalidPurposeException
+)
+
+# Parallel arrays of borrower_scoring.Decision fields, see decision_batch().
+BatchDecision = namedtuple('BatchDecision', ('reason', 'payment', 'rate'))
+
+# Values a row failing validation is scored with before being marked INVALID.
+_SAFE_ROW = (0, 1, 0, 1, 1, 0, 0, 0)
+
+# Reason of the lowest set bit, bit i standing for the i-th rule of _evaluate.
+_FIRST_REASON = np.array(
+    [Reason.APPROVED] + [(rules & -rules).bit_length() for rules in range(1, 2 ** Reason.HALF_OF_INCOME)], dtype=np.int8
+)
+
+# np.log10 may differ from math.log10 in the last bit, so payments this close
+# to the half-income cap are recomputed the way BorrowerScoring does it.
+_HALF_INCOME_TOLERANCE = 1e-12
+
+# Rows score_batch evaluates at a time, 64 KiB per float64 temporary.
+_CHUNK_ROWS = 8192
+
+
+def score_batch(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose, errors=None,
+                policy=None):
+    """Year payment per row, NaN where BorrowerScoring.score() returns None.
+
+    Enum arguments are integer codes, see enums.py. Rows with non-zero
+    errors from validate_batch are not scored and get NaN. All rows are
+    scored with policy, the current one by default.
+    """
+    if metrics.active is not None or audit.active is not None:
+        # Counting and auditing decisions needs the reasons decide_batch works out.
+        return decide_batch(
+            age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose, errors, policy
+        )[0]
+
+    policy = policy or current_policy()
+    columns = np.broadcast_arrays(*_without_invalid_rows(
+        errors, age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+    ))
+    payment = np.empty(columns[0].shape, dtype=np.float64)
+
+    # Temporaries of a chunk stay in cache and below malloc's mmap threshold,
+    # whole-column ones are page faulted in again on every call.
+    for start in range(0, len(payment), _CHUNK_ROWS):
+        chunk = slice(start, start + _CHUNK_ROWS)
+        chunk_payment, rules, _ = _evaluate(policy, *(column[chunk] for column in columns))
+        rejected = rules[0][1]
+
+        for _, rule_rejected in rules[1:]:
+            rejected |= rule_rejected
+
+        np.copyto(chunk_payment, np.nan, where=rejected)
+        payment[chunk] = chunk_payment
+
+    if errors is not None:
+        payment[np.asarray(errors) != 0] = np.nan
+
+    return payment
+
+
+def decide_batch(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose, errors=None,
+                 policy=None):
+    """Year payment (NaN when rejected) and int8 Reason code per row.
+
+    Rows with non-zero errors from validate_batch get Reason.INVALID.
+    """
+    instruments = metrics.active
+    log = audit.active
+
+    if instruments is not None:
+        started = time.perf_counter()
+
+    if log is not None:
+        policy = policy or current_policy()
+
+    payment, rules = decide_rules(
+        age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose, errors, policy
+    )
+    reason = _FIRST_REASON.take(rules)
+
+    if errors is not None:
+        np.copyto(reason, Reason.INVALID, where=np.asarray(errors) != 0)
+
+    np.copyto(payment, np.nan, where=reason != Reason.APPROVED)
+
+    if instruments is not None:
+        instruments.observe_batch(time.perf_counter() - started, np.bincount(reason, minlength=len(Reason)).tolist())
+
+    if log is not None:
+        log.append_batch(
+            (age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose),
+            reason, payment, None, policy
+        )
+
+    return payment, reason
+
+
+def decide_rules(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose, errors=None,
+                 policy=None):
+    """Unmasked year payment and uint8 bit set of the score() rules each row fails.
+
+    Bit i - 1 stands for the rule rejecting with Reason i, the reason of a
+    row is that of its lowest set bit. Rows with non-zero errors are scored
+    with placeholder values, their payment and bits mean nothing.
+    """
+    payment, rules, _ = _decide_rules(
+        (age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose), errors, policy
+    )
+
+    return payment, rules
+
+
+def decision_batch(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose,
+                   errors=None, policy=None):
+    """BatchDecision of int8 Reason codes, payments and rates, Scorer.decide() per row.
+
+    payment is NaN unless the row is approved and rate is NaN for rows the
+    rules before the half-income cap reject, as well as for rows with
+    non-zero errors, which get Reason.INVALID. np.bincount(reason) is the
+    rejection histogram, over a segment it is np.bincount(reason[mask]).
+    """
+    instruments = metrics.active
+    log = audit.active
+
+    if instruments is not None:
+        started = time.perf_counter()
+
+    if log is not None:
+        policy = policy or current_policy()
+
+    payment, rules, rate = _decide_rules(
+        (age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose), errors, policy, True
+    )
+    reason = _FIRST_REASON.take(rules)
+
+    if errors is not None:
+        np.copyto(reason, Reason.INVALID, where=np.asarray(errors) != 0)
+
+    np.copyto(payment, np.nan, where=reason != Reason.APPROVED)
+    np.copyto(rate, np.nan, where=(reason != Reason.APPROVED) & (reason != Reason.HALF_OF_INCOME))
+
+    if instruments is not None:
+        instruments.observe_batch(time.perf_counter() - started, np.bincount(reason, minlength=len(Reason)).tolist())
+
+    if log is not None:
+        log.append_batch(
+            (age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose),
+            reason, payment, rate, policy
+        )
+
+    return BatchDecision(reason, payment, rate)
+
+
+def reason_of_rules(rules):
+    """int8 Reason codes of decide_rules bit sets."""
+    return _FIRST_REASON.take(rules)
+
+
+def payment_batch(rate_index, loan_amount, credit_term, income_amount, log_loan_amount=None, policy=None):
+    """Unmasked year payment per row, as decide_batch computes it, from the rate_table.rate_index of each row.
+
+    log_loan_amount, np.log10(loan_amount), may be kept from an earlier call.
+    """
+    policy = policy or current_policy()
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+
+    if log_loan_amount is None:
+        log_loan_amount = np.log10(loan_amount)
+
+    return _payment(
+        policy, np.asarray(rate_index), loan_amount, np.asarray(credit_term, dtype=np.float64),
+        np.asarray(income_amount, dtype=np.float64) / 2, log_loan_amount
+    )
+
+
+def validate_batch(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose):
+    """uint8 bit set of the BorrowerRecord validations each row fails, 0 for valid rows.
+
+    Bit i stands for VALIDATION_ERRORS[i]. Unlike BorrowerRecord, integral
+    floats are accepted for integer arguments and NaN amounts are rejected.
+    """
+    instruments = metrics.active
+
+    if instruments is not None:
+        started = time.perf_counter()
+
+    age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose = (
+        np.asarray(column) for column in (
+            age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+        )
+    )
+
+    failures = (
+        ~(age >= 0) | _not_integer(age),
+        ~(income_amount >= 1) | _not_integer(income_amount),
+        _not_code(loan_rating, LoanRating),
+        ~((loan_amount >= 0.1) & (loan_amount <= 10) & np.isfinite(loan_amount)),
+        ~((credit_term >= 1) & (credit_term <= 20)) | _not_integer(credit_term),
+        _not_code(sex, Sex),
+        _not_code(income_source, IncomeSource),
+        _not_code(purpose, Purpose)
+    )
+
+    errors = np.zeros(age.shape, dtype=np.uint8)
+
+    for bit, failed in enumerate(failures):
+        errors |= failed.view(np.uint8) << bit
+
+    if instruments is not None:
+        instruments.observe_validation('batch', time.perf_counter() - started)
+
+    return errors
+
+
+def validation_errors(errors):
+    """Exception classes for one row's validate_batch bit set."""
+    return tuple(exception for bit, exception in enumerate(VALIDATION_ERRORS) if int(errors) >> bit & 1)
+
+
+def columns_from_rows(rows):
+    """Keyword columns for score_batch from mappings with enum names, e.g. parsed CSV or JSON.
+
+    Unknown or unhashable names get code -1 and values that are not numbers,
+    or too large for a float, get NaN, so validate_batch marks those rows
+    instead of the whole chunk failing.
+    """
+    columns = {}
+
+    for field in FIELDS:
+        try:
+            values = [row[field] for row in rows]
+        except KeyError:
+            raise ValueError('field %r is missing' % field)
+
+        if field in _CODES:
+            codes = _CODES[field]
+            columns[field] = np.array(
+                [codes.get(value, -1) if isinstance(value, Hashable) else -1 for value in values], dtype=np.int8
+            )
+        else:
+            try:
+                columns[field] = np.array(values, dtype=_DTYPES[field])
+            except (OverflowError, TypeError, ValueError):
+                columns[field] = np.array([_number(value) for value in values], dtype=_DTYPES[field])
+
+    return columns
+
+
+@functools.lru_cache(maxsize=4)
+def policy_tables(policy):
+    """fixed_rate, available_loan_amount and retirement_age of policy as arrays, cached for the last few policies."""
+    return (
+        np.array(policy.fixed_rate, dtype=np.float64),
+        np.array(policy.available_loan_amount, dtype=np.float64),
+        np.array(policy.retirement_age, dtype=np.int64)
+    )
+
+
+def _codes(column):
+    column = np.asarray(column)
+
+    # Checked by dtype.kind, np.issubdtype is slow next to the arithmetic on a chunk.
+    return column if column.dtype.kind in 'iu' else column.astype(np.intp)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (OverflowError, TypeError, ValueError):
+        return np.nan
+
+
+def _not_integer(column):
+    if np.issubdtype(column.dtype, np.integer):
+        return np.zeros(column.shape, dtype=bool)
+
+    # inf equals its floor.
+    return ~np.isfinite(column) | (column != np.floor(column))
+
+
+def _not_code(column, enum):
+    return ~((column >= 0) & (column < len(enum))) | _not_integer(column)
+
+
+def _without_invalid_rows(errors, *columns):
+    if errors is None:
+        return columns
+
+    invalid = np.asarray(errors) != 0
+
+    if not invalid.any():
+        return columns
+
+    return tuple(np.where(invalid, safe, column) for safe, column in zip(_SAFE_ROW, columns))
+
+
+def _decide_rules(columns, errors, policy, keep_rate=False):
+    columns = _without_invalid_rows(errors, *columns)
+    payment, rules, rate = _evaluate(policy or current_policy(), *columns, keep_rate=keep_rate)
+    rejected_rules = rules[0][1].view(np.uint8).copy()
+
+    for bit, (_, rule_rejected) in enumerate(rules[1:], 1):
+        rejected_rules |= rule_rejected.view(np.uint8) << bit
+
+    return payment, rejected_rules, rate
+
+
+def _evaluate(policy, age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose,
+              keep_rate=False):
+    """Unmasked payment, the rejection mask of every rule in score() order and, if keep_rate, unmasked rates."""
+    fixed_rate, available_loan_amount, retirement_age = policy_tables(policy)
+    age = np.asarray(age)
+    income_amount = np.asarray(income_amount, dtype=np.float64)
+    loan_rating = _codes(loan_rating)
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+    credit_term = np.asarray(credit_term)
+    sex = _codes(sex)
+    income_source = _codes(income_source)
+    purpose = _codes(purpose)
+    term = credit_term.astype(np.float64)
+
+    # int8 codes cannot overflow int16 here, and the narrow arithmetic is cheaper than intp.
+    index = purpose.astype(np.result_type(purpose, loan_rating, income_source, np.int16)) * len(LoanRating)
+    index += loan_rating
+    index *= len(IncomeSource)
+    index += income_source
+    index = index.astype(np.intp)
+
+    log_loan_amount = np.log10(loan_amount)
+    half_income = income_amount / 2
+    payment = _payment(policy, index, loan_amount, term, half_income, log_loan_amount)
+    rate = None
+
+    if keep_rate:
+        rate = fixed_rate.take(index)
+        rate -= log_loan_amount
+
+    rules = (
+        (Reason.UNRELIABLE_BORROWER, income_source == IncomeSource.UNEMPLOYED.code),
+        (Reason.LOAN_RATING_PROHIBITED, loan_rating == LoanRating.PROHIBITED.code),
+        # take() is several times slower on int8 indices than on intp ones.
+        (Reason.RETIREMENT_AGE, (age + credit_term) > retirement_age.take(sex.astype(np.intp))),
+        (Reason.THIRD_OF_INCOME, loan_amount / term > income_amount / 3),
+        (Reason.AVAILABLE_LOAN_AMOUNT, available_loan_amount.take(index) < loan_amount),
+        (Reason.HALF_OF_INCOME, payment > half_income)
+    )
+
+    return payment, rules, rate
+
+
+def _payment(policy, rate_index, loan_amount, term, half_income, log_loan_amount):
+    """payment_batch of converted columns, half_income being income_amount / 2."""
+    rate = policy_tables(policy)[0].take(rate_index)
+    rate -= log_loan_amount
+    payment = _get_payment(loan_amount, term, rate)
+
+    distance = payment - half_income
+    np.abs(distance, out=distance)
+
+    for i in np.flatnonzero(distance <= half_income * _HALF_INCOME_TOLERANCE).tolist():
+        rate = policy.fixed_rate[rate_index[i]] - math.log10(loan_amount[i])
+        payment[i] = (loan_amount[i] * (1 + term[i] * (rate / 100))) / term[i]
+
+    return payment
+
+
+def _get_payment(loan_amount, credit_term, rate):
+    """Same arithmetic as BorrowerScoring.__get_payment, done in place on rate."""
+    rate /= 100
+    rate *= credit_term
+    rate += 1
+    rate *= loan_amount
+    rate /= credit_term
+
+    return rate
@@ -0,0 +1,73 @@
+"""Adaptive rule order against the canonical one on a workload the available-amount rule mostly rejects.
+
+Run from the repository root: python -m benchmarks.bench_adaptive
+"canonical" is an AdaptiveScorer that never reorders, so it pays the same
+sampling and differs from "adaptive" only in the rule order.
+"""
+import argparse
+from enums import *
+from borrower_scoring import BorrowerRecord, Scorer
+from generator import PortfolioGenerator
+from adaptive import AdaptiveScorer
+from benchmarks.bench_scoring import best_of
+
+
+ROWS = 100000
+
+
+def skewed_records(rows, seed=0):
+    """Mostly LOW ratings and PASSIVE incomes, whose loan limits most amounts exceed, young and well paid."""
+    columns = PortfolioGenerator(
+        seed=seed,
+        age=(18, 40),
+        income_amount=(20, 40),
+        loan_rating={LoanRating.LOW: 8, LoanRating.MIDDLE: 1, LoanRating.HIGH: 1},
+        income_source={IncomeSource.PASSIVE: 6, IncomeSource.EMPLOYEE: 3, IncomeSource.BUSINESSMAN: 1}
+    ).columns(rows)
+    members = {field: list(enum) for field, enum in (
+        ('loan_rating', LoanRating), ('sex', Sex), ('income_source', IncomeSource), ('purpose', Purpose)
+    )}
+
+    return [
+        BorrowerRecord(
+            age, income_amount, members['loan_rating'][loan_rating], loan_amount, credit_term,
+            members['sex'][sex], members['income_source'][income_source], members['purpose'][purpose]
+        )
+        for age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose in zip(*(
+            columns[field].tolist() for field in (
+                'age', 'income_amount', 'loan_rating', 'loan_amount', 'credit_term', 'sex', 'income_source', 'purpose'
+            )
+        ))
+    ]
+
+
+def run(method, records):
+    for record in records:
+        method(record)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_adaptive')
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    records = skewed_records(args.rows)
+    scorer = Scorer()
+    canonical = AdaptiveScorer(reorder_every=2 ** 62)
+    adaptive = AdaptiveScorer()
+
+    # Learn the order before timing.
+    run(adaptive.score, records)
+
+    print('order: %s' % ', '.join(reason.name for reason in adaptive.order))
+    print('%-10s %-10s %10s' % ('method', 'scorer', 'us/call'))
+
+    for name in ('score', 'decide'):
+        for label, instance in (('Scorer', scorer), ('canonical', canonical), ('adaptive', adaptive)):
+            seconds = best_of(args.repeat, run, getattr(instance, name), records)
+            print('%-10s %-10s %10.4f' % (name, label, seconds / args.rows * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Memory per borrower and allocations per score() call, measured with tracemalloc.
+
+Run from the repository root: python -m benchmarks.bench_allocations
+"""
+import gc
+import tracemalloc
+from enums import *
+from borrower_scoring import BorrowerScoring
+
+try:
+    from borrower_scoring import BorrowerRecord, Scorer
+except ImportError:
+    BorrowerRecord = Scorer = None
+
+
+COUNT = 100000
+
+ARGUMENTS = dict(
+    age=35,
+    income_amount=10,
+    loan_rating=LoanRating.HIGH,
+    loan_amount=3,
+    credit_term=10,
+    sex=Sex.MALE,
+    income_source=IncomeSource.EMPLOYEE,
+    purpose=Purpose.MORTGAGE
+)
+
+
+def bytes_per_object(factory):
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory() for _ in range(COUNT)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+
+    return size / COUNT
+
+
+def peak_bytes_per_call(score):
+    """Largest amount of memory alive at once during a call, including the result."""
+    peaks = []
+
+    for _ in range(10):
+        score()
+        gc.collect()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        result = score()
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+        tracemalloc.stop()
+        del result
+
+    return min(peaks)
+
+
+def main():
+    borrower_scoring = BorrowerScoring(**ARGUMENTS)
+    rows = [('BorrowerScoring', lambda: BorrowerScoring(**ARGUMENTS), borrower_scoring.score)]
+
+    if BorrowerRecord is not None:
+        record = BorrowerRecord(**ARGUMENTS)
+        scorer = Scorer()
+        rows.append(('BorrowerRecord + Scorer', lambda: BorrowerRecord(**ARGUMENTS), lambda: scorer.score(record)))
+
+    print('%-24s %14s %16s' % ('', 'bytes/borrower', 'peak bytes/call'))
+
+    for name, factory, score in rows:
+        print('%-24s %14.0f %16d' % (name, bytes_per_object(factory), peak_bytes_per_call(score)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Cost of the decision audit log on score() and decide_batch, disabled and enabled.
+
+Run from the repository root: python -m benchmarks.bench_audit
+Enabled timings include the writer thread's share of the interpreter, the
+log is closed after each format, so every queued decision is written
+before the next one is timed. score() against a subclass without the
+audit.active check shows the cost of the check.
+"""
+import argparse
+import tempfile
+import audit
+from borrower_scoring import BorrowerScoring, Scorer
+from batch_scoring import decide_batch, validate_batch
+from benchmarks.bench_scoring import SCALAR_ROWS, batch_columns, best_of, scalar_rows
+
+
+BATCH_ROWS = 10 ** 5
+
+
+def score(records):
+    for record in records:
+        record.score()
+
+
+class UnauditedScoring(BorrowerScoring):
+    """score() as it was before the audit.active check."""
+
+    __slots__ = ()
+    __scorer = Scorer()
+
+    def score(self):
+        return self.__scorer.score(self)
+
+
+def batch(columns):
+    decide_batch(*columns, errors=validate_batch(*columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_audit')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--when-full', choices=audit.WHEN_FULL, default='block')
+    args = parser.parse_args(argv)
+
+    rows = scalar_rows(SCALAR_ROWS)
+    records = [BorrowerScoring(*row) for row in rows]
+    columns = batch_columns(BATCH_ROWS)
+    results = [
+        ('score_us', 'no check', best_of(args.repeat, score, [UnauditedScoring(*row) for row in rows]) / SCALAR_ROWS * 1e6),
+        ('score_us', 'disabled', best_of(args.repeat, score, records) / SCALAR_ROWS * 1e6),
+        ('batch_ns_per_row', 'disabled', best_of(args.repeat, batch, columns) / BATCH_ROWS * 1e9)
+    ]
+
+    for audit_format in audit.FORMATS:
+        with tempfile.TemporaryDirectory() as directory:
+            log = audit.enable(directory, audit_format, when_full=args.when_full)
+            results.append(('score_us', audit_format, best_of(args.repeat, score, records) / SCALAR_ROWS * 1e6))
+            results.append(('batch_ns_per_row', audit_format, best_of(args.repeat, batch, columns) / BATCH_ROWS * 1e9))
+            audit.disable()
+            print('%s: %d rows written, %d dropped' % (audit_format, log.written, log.dropped))
+
+    print('%-20s %-10s %10s' % ('metric', 'audit', 'time'))
+
+    for name, state, value in sorted(results, key=lambda result: result[0]):
+        print('%-20s %-10s %10.4f' % (name, state, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""End-to-end latency of scoring a small CSV file: cold start against the warm daemon.
+
+Run from the repository root: python -m benchmarks.bench_daemon --rows 1000
+"cold" runs python -m borrower_scoring score per file, "client" runs
+daemon_client.py per file against a running daemon, both as new processes
+the way a shell job would. "in-process" is one DaemonClient request.
+"""
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from daemon import DaemonClient
+from generator import PortfolioGenerator
+from batch_scoring import FIELDS
+from enums import *
+
+
+ENUMS = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+
+
+def write_applications(path, rows):
+    columns = PortfolioGenerator(seed=0).columns(rows)
+
+    with open(path, 'w', newline='') as stream:
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+
+        for i in range(rows):
+            writer.writerow([
+                list(ENUMS[field])[columns[field][i]].name if field in ENUMS else columns[field][i].item()
+                for field in FIELDS
+            ])
+
+
+def timed(function, repeat):
+    seconds = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - started)
+
+    return seconds
+
+
+def wait_for(path, seconds=30):
+    deadline = time.monotonic() + seconds
+
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise TimeoutError('daemon did not start')
+
+        time.sleep(0.01)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_daemon')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        applications = os.path.join(directory, 'applications.csv')
+        output = os.path.join(directory, 'decisions.csv')
+        socket_path = os.path.join(directory, 'scoring.sock')
+        write_applications(applications, args.rows)
+
+        daemon = subprocess.Popen([
+            sys.executable, '-m', 'borrower_scoring', 'daemon', '--socket', socket_path, '--workers', str(args.workers)
+        ])
+
+        try:
+            wait_for(socket_path)
+            cold = timed(lambda: subprocess.run(
+                [sys.executable, '-m', 'borrower_scoring', 'score', applications, '-o', output], check=True
+            ), args.repeat)
+            client = timed(lambda: subprocess.run(
+                [sys.executable, 'daemon_client.py', applications, '-o', output, '--socket', socket_path], check=True
+            ), args.repeat)
+
+            with open(applications, 'rb') as stream:
+                data = stream.read()
+
+            with DaemonClient(socket_path) as connection:
+                in_process = timed(lambda: connection.score_text(data), args.repeat)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print('%d rows, median of %d' % (args.rows, args.repeat))
+    print('%-12s %10s %10s' % ('path', 'median_ms', 'min_ms'))
+
+    for name, seconds in (('cold', cold), ('client', client), ('in-process', in_process)):
+        print('%-12s %10.1f %10.1f' % (name, statistics.median(seconds) * 1e3, min(seconds) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Integer fixed-point scoring against the float engine, scalar and batch.
+
+Run from the repository root: python -m benchmarks.bench_fixedpoint
+Batch columns are converted to kopecks before timing, as a ledger would
+store them.
+"""
+import argparse
+import fixedpoint
+from borrower_scoring import BorrowerRecord, Scorer
+from batch_scoring import decision_batch
+from benchmarks.bench_scoring import SCALAR_ROWS, batch_columns, best_of, scalar_rows
+
+
+BATCH_ROWS = 10 ** 6
+
+
+def decide(scorer, records):
+    for record in records:
+        scorer.decide(record)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_fixedpoint')
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    records = [BorrowerRecord(*row) for row in scalar_rows(SCALAR_ROWS)]
+    columns = batch_columns(BATCH_ROWS)
+    minor_columns = list(columns)
+
+    for field in (1, 3):
+        minor_columns[field] = fixedpoint.to_minor(columns[field])
+
+    print('%-20s %-10s %10s' % ('metric', 'engine', 'time'))
+
+    for engine, scorer, batch, arguments in (
+        ('float', Scorer(), decision_batch, columns),
+        ('fixed', fixedpoint.FixedPointScorer(), fixedpoint.decision_batch, minor_columns)
+    ):
+        print('%-20s %-10s %10.4f' % ('decide_us', engine, best_of(args.repeat, decide, scorer, records) / SCALAR_ROWS * 1e6))
+        print('%-20s %-10s %10.4f' % ('batch_ns_per_row', engine, best_of(args.repeat, batch, *arguments) / BATCH_ROWS * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Cost of the metrics instrumentation, disabled and enabled, on the scalar and batch paths.
+
+Run from the repository root: python -m benchmarks.bench_metrics
+The disabled rows are what every caller pays, score() against a subclass
+without the metrics.active check shows the cost of the check.
+"""
+import argparse
+import metrics
+from borrower_scoring import BorrowerScoring, Scorer
+from batch_scoring import decide_batch, validate_batch
+from benchmarks.bench_scoring import SCALAR_ROWS, batch_columns, best_of, scalar_rows
+
+
+BATCH_ROWS = 10 ** 6
+
+
+def construct(rows):
+    for row in rows:
+        BorrowerScoring(*row)
+
+
+def score(records):
+    for record in records:
+        record.score()
+
+
+class UninstrumentedScoring(BorrowerScoring):
+    """score() as it was before the metrics.active check."""
+
+    __slots__ = ()
+    __scorer = Scorer()
+
+    def score(self):
+        return self.__scorer.score(self)
+
+
+def batch(columns):
+    decide_batch(*columns, errors=validate_batch(*columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_metrics')
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rows = scalar_rows(SCALAR_ROWS)
+    records = [BorrowerScoring(*row) for row in rows]
+    columns = batch_columns(BATCH_ROWS)
+    results = []
+
+    for state in ('disabled', 'enabled'):
+        if state == 'enabled':
+            metrics.enable()
+
+        results.append(('construct_us', state, best_of(args.repeat, construct, rows) / SCALAR_ROWS * 1e6))
+        results.append(('score_us', state, best_of(args.repeat, score, records) / SCALAR_ROWS * 1e6))
+        results.append(('batch_ns_per_row', state, best_of(args.repeat, batch, columns) / BATCH_ROWS * 1e9))
+
+    metrics.disable()
+    records = [UninstrumentedScoring(*row) for row in rows]
+    results.append(('score_us', 'no check', best_of(args.repeat, score, records) / SCALAR_ROWS * 1e6))
+
+    print('%-20s %-10s %10s' % ('metric', 'metrics', 'time'))
+
+    for name, state, value in sorted(results, key=lambda result: result[0]):
+        print('%-20s %-10s %10.4f' % (name, state, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Scaling of ParallelScorer from 1 to N worker processes.
+
+Run from the repository root: python -m benchmarks.bench_parallel --rows 10000000
+"""
+import argparse
+import os
+import time
+from generator import PortfolioGenerator
+from parallel import ParallelScorer, DEFAULT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10 ** 7)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = PortfolioGenerator().columns(args.rows)
+    counts = [2 ** power for power in range(args.max_workers.bit_length()) if 2 ** power < args.max_workers]
+    single = None
+
+    print('%7s %9s %12s %8s %10s' % ('workers', 'seconds', 'rows/s', 'speedup', 'efficiency'))
+
+    for workers in counts + [args.max_workers]:
+        with ParallelScorer(workers, args.chunk_size) as scorer:
+            scorer.score(**data)
+            seconds = []
+
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                scorer.score(**data)
+                seconds.append(time.perf_counter() - start)
+
+        best = min(seconds)
+        single = single or best
+        speedup = single / best
+
+        print('%7d %9.3f %12.0f %8.2f %9.0f%%' % (workers, best, args.rows / best, speedup, 100 * speedup / workers))
+
+
+if __name__ == '__main__':
+    main()
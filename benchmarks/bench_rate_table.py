@@ -0,0 +1,62 @@
+"""Per-call cost of the rate lookup table against the former enum arithmetic.
+
+Run from the repository root: python -m benchmarks.bench_rate_table
+"""
+import math
+import timeit
+from enums import *
+from rate_table import BASE_RATE, FIXED_RATE, AVAILABLE_LOAN_AMOUNT, rate_index
+from borrower_scoring import BorrowerScoring
+
+
+NUMBER = 200000
+
+loan_amount = 3
+loan_rating = LoanRating.HIGH
+income_source = IncomeSource.EMPLOYEE
+purpose = Purpose.MORTGAGE
+index = rate_index(purpose, loan_rating, income_source)
+
+
+def enum_rate():
+    rate = BASE_RATE
+    rate += sum([purpose.value, loan_rating.percent, income_source.percent])
+    rate -= math.log10(loan_amount)
+
+    return rate, min(income_source.amount, loan_rating.amount)
+
+
+def table_rate():
+    return FIXED_RATE[index] - math.log10(loan_amount), AVAILABLE_LOAN_AMOUNT[index]
+
+
+def score():
+    return BorrowerScoring(
+        age=35,
+        income_amount=10,
+        loan_rating=loan_rating,
+        loan_amount=loan_amount,
+        credit_term=10,
+        sex=Sex.MALE,
+        income_source=income_source,
+        purpose=purpose
+    ).score()
+
+
+def per_call(function):
+    return min(timeit.repeat(function, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def main():
+    assert enum_rate() == table_rate()
+
+    enum_ns = per_call(enum_rate)
+    table_ns = per_call(table_rate)
+
+    print('enum properties: %.1f ns/call' % enum_ns)
+    print('rate table:      %.1f ns/call (%.1fx)' % (table_ns, enum_ns / table_ns))
+    print('score():         %.1f ns/call' % per_call(score))
+
+
+if __name__ == '__main__':
+    main()
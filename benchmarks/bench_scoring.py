@@ -0,0 +1,208 @@
+"""Scoring engine benchmark suite with regression tracking against a stored baseline.
+
+Run from the repository root: python -m benchmarks.bench_scoring
+Results are written to bench_output.txt as JSON. Every metric is the median
+of --rounds best-of---repeat timings, taken in turn, so one noisy round does
+not fail the check. The exit status is 1 when a metric is slower than the
+baseline by more than --threshold, and --update-baseline stores the current
+results as the new baseline.
+Metrics are timings, lower is better. The speedup of score_batch over
+constructing and scoring BorrowerScoring objects is printed against
+SPEEDUP_TARGET.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import numpy as np
+from enums import *
+from borrower_scoring import BorrowerScoring
+from batch_scoring import score_batch
+from codegen import score as compiled_score
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+OUTPUT = 'bench_output.txt'
+BATCH_SIZES = (10 ** 3, 10 ** 6, 10 ** 7)
+SCALAR_ROWS = 20000
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_ROUNDS = 5
+SPEEDUP_TARGET = 100
+
+COMBINATIONS = tuple(itertools.product(LoanRating, Sex, IncomeSource, Purpose))
+
+
+def scalar_rows(count, seed=0):
+    """Argument tuples cycling through every enum combination, numbers drawn at random."""
+    generator = random.Random(seed)
+    rows = []
+
+    for i in range(count):
+        loan_rating, sex, income_source, purpose = COMBINATIONS[i % len(COMBINATIONS)]
+        rows.append((
+            generator.randint(18, 69),
+            generator.randint(1, 20),
+            loan_rating,
+            generator.uniform(0.1, 10),
+            generator.randint(1, 20),
+            sex,
+            income_source,
+            purpose
+        ))
+
+    return rows
+
+
+def batch_columns(count, seed=0):
+    """Same workload as scalar_rows as score_batch columns."""
+    generator = np.random.default_rng(seed)
+    combination = np.arange(count) % len(COMBINATIONS)
+    codes = np.array([[member.code for member in members] for members in COMBINATIONS], dtype=np.int8)
+
+    return (
+        generator.integers(18, 70, count),
+        generator.integers(1, 21, count).astype(np.float64),
+        codes[combination, 0],
+        generator.uniform(0.1, 10, count),
+        generator.integers(1, 21, count),
+        codes[combination, 1],
+        codes[combination, 2],
+        codes[combination, 3]
+    )
+
+
+def best_of(repeat, function, *args):
+    function(*args)
+    seconds = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        seconds.append(time.perf_counter() - start)
+
+    return min(seconds)
+
+
+def construct(rows):
+    for row in rows:
+        BorrowerScoring(*row)
+
+
+def construct_and_compiled_score(rows):
+    for row in rows:
+        compiled_score(*row)
+
+
+def score(borrowers):
+    for borrower in borrowers:
+        borrower.score()
+
+
+def run(repeat=5, batch_sizes=BATCH_SIZES, seed=0, rounds=DEFAULT_ROUNDS):
+    rows = scalar_rows(SCALAR_ROWS, seed)
+    borrowers = [BorrowerScoring(*row) for row in rows]
+    approved = [borrower for borrower in borrowers if borrower.score() is not None]
+    rejected = [borrower for borrower in borrowers if borrower.score() is None]
+    timings = [_round(repeat, batch_sizes, seed, rows, borrowers, approved, rejected) for _ in range(rounds)]
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'approved_share': len(approved) / len(borrowers),
+        'rounds': rounds,
+        'metrics': {name: statistics.median(timing[name] for timing in timings) for name in timings[0]}
+    }
+
+
+def _round(repeat, batch_sizes, seed, rows, borrowers, approved, rejected):
+    metrics = {
+        'construct_us': best_of(repeat, construct, rows) / len(rows) * 1e6,
+        'compiled_us': best_of(repeat, construct_and_compiled_score, rows) / len(rows) * 1e6,
+        'score_us': best_of(repeat, score, borrowers) / len(borrowers) * 1e6,
+        'score_approved_us': best_of(repeat, score, approved) / len(approved) * 1e6,
+        'score_rejected_us': best_of(repeat, score, rejected) / len(rejected) * 1e6
+    }
+
+    for size in batch_sizes:
+        columns = batch_columns(size, seed)
+        metrics['batch_%d_ns_per_row' % size] = best_of(repeat, score_batch, *columns) / size * 1e9
+        del columns
+
+    return metrics
+
+
+def speedups(metrics, batch_sizes):
+    """(size, per-row speedup of score_batch over BorrowerScoring(...).score()) per batch size."""
+    object_ns = (metrics['construct_us'] + metrics['score_us']) * 1e3
+
+    return [(size, object_ns / metrics['batch_%d_ns_per_row' % size]) for size in batch_sizes]
+
+
+def regressions(metrics, baseline, threshold):
+    """Names of the metrics slower than the baseline by more than threshold."""
+    return [
+        name for name, value in metrics.items()
+        if name in baseline and value > baseline[name] * (1 + threshold)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=OUTPUT)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed relative slowdown')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--repeat', type=int, default=5, help='timings per round, the best one counts')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help='rounds per metric, the median counts')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.batch_sizes, args.seed, args.rounds)
+    metrics = results['metrics']
+
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+    baseline = {}
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as stored:
+            baseline = json.load(stored)['metrics']
+
+    print('%-26s %12s %12s %8s' % ('metric', 'baseline', 'current', 'change'))
+
+    for name, value in metrics.items():
+        if name in baseline:
+            print('%-26s %12.4f %12.4f %+7.1f%%' % (name, baseline[name], value, 100 * (value / baseline[name] - 1)))
+        else:
+            print('%-26s %12s %12.4f' % (name, '-', value))
+
+    for size, speedup in speedups(metrics, args.batch_sizes):
+        shortfall = '' if speedup >= SPEEDUP_TARGET else ', short by %.0f%%' % (100 - 100 * speedup / SPEEDUP_TARGET)
+        print('batch_%d speedup over construct + score(): %.0fx, target %dx%s' % (size, speedup, SPEEDUP_TARGET, shortfall))
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as stored:
+            json.dump(results, stored, indent=2)
+            stored.write('\n')
+
+        return 0
+
+    slower = regressions(metrics, baseline, args.threshold)
+
+    if slower:
+        print('regressed by more than %.0f%%: %s' % (100 * args.threshold, ', '.join(slower)), file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Throughput and latency of the scoring service under concurrent clients.
+
+Run from the repository root: python -m benchmarks.bench_service --clients 64
+Each client keeps one connection open and posts single applications back to back.
+"""
+import argparse
+import asyncio
+import json
+import time
+from service import ScoringService
+
+
+APPLICATION = json.dumps({
+    'age': 35,
+    'income_amount': 10,
+    'loan_rating': 'HIGH',
+    'loan_amount': 3,
+    'credit_term': 10,
+    'sex': 'MALE',
+    'income_source': 'EMPLOYEE',
+    'purpose': 'MORTGAGE'
+}).encode()
+
+REQUEST = b'POST /score HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(APPLICATION), APPLICATION)
+
+
+async def client(port, requests, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    for _ in range(requests):
+        start = time.perf_counter()
+        writer.write(REQUEST)
+        length = 0
+
+        while True:
+            line = await reader.readline()
+
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+
+            if line == b'\r\n':
+                break
+
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+
+    writer.close()
+
+
+async def run(clients, requests, max_batch_size, max_wait):
+    service = ScoringService(max_batch_size, max_wait)
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    latencies = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, requests, latencies) for _ in range(clients)))
+    seconds = time.perf_counter() - start
+
+    await service.stop(server)
+    latencies.sort()
+
+    return len(latencies) / seconds, latencies[int(len(latencies) * 0.99)], service.batcher.batch_size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=200, help='per client')
+    parser.add_argument('--max-wait-ms', type=float, default=2)
+    args = parser.parse_args()
+
+    print('%14s %10s %10s %10s' % ('max batch size', 'req/s', 'p99 ms', 'mean batch'))
+
+    for max_batch_size in (1, 16, 64, 256):
+        throughput, p99, batch_size = asyncio.run(
+            run(args.clients, args.requests, max_batch_size, args.max_wait_ms / 1000)
+        )
+        print('%14d %10.0f %10.2f %10.1f' % (max_batch_size, throughput, p99 * 1000, batch_size.sum / batch_size.count))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,42 @@
 import math
+import sys
+import time
+from collections import namedtuple
+import metrics
 from exceptions import *
 from enums import *
+from rate_table import current_policy, rate_index
 
 
-class BorrowerScoring:
+# reason is a Reason, payment and rate are None unless the rules before the
+# half-income cap pass, payment is also None unless reason is APPROVED.
+Decision = namedtuple('Decision', ('reason', 'payment', 'rate'))
 
-    __age = None
-    __income_amount = None
-    __loan_rating = None
-    __loan_amount = None
-    __credit_term = None
-    __sex = None
-    __income_source = None
-    __purpose = None
-    __base_rate = 10
+# Decisions of the rules before the rate is known, shared as they never change.
+_DECISIONS = tuple(Decision(reason, None, None) for reason in Reason)
+
+
+class BorrowerRecord:
+    """Validated scoring arguments of one borrower."""
+
+    __slots__ = (
+        'age',
+        'income_amount',
+        'loan_rating',
+        'loan_amount',
+        'credit_term',
+        'sex',
+        'income_source',
+        'purpose',
+        'rate_index'
+    )
 
     def __init__(self, age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose):
+        instruments = metrics.active
+
+        if instruments is not None:
+            started = time.perf_counter()
+
         if age < 0 or type(age) is not int:
             raise InvalidAgeException
 
@@ -40,65 +61,132 @@ class BorrowerScoring:
         if not isinstance(purpose, Purpose):
             raise InvalidPurposeException
 
-        self.__age = age
-        self.__income_amount = income_amount
-        self.__loan_rating = loan_rating
-        self.__loan_amount = loan_amount
-        self.__credit_term = credit_term
-        self.__sex = sex
-        self.__income_source = income_source
-        self.__purpose = purpose
+        self.age = age
+        self.income_amount = income_amount
+        self.loan_rating = loan_rating
+        self.loan_amount = loan_amount
+        self.credit_term = credit_term
+        self.sex = sex
+        self.income_source = income_source
+        self.purpose = purpose
+        self.rate_index = rate_index(purpose, loan_rating, income_source)
 
-    def score(self):
-        if self.__is_unreliable_borrower():
+        if instruments is not None:
+            instruments.observe_validation('scalar', time.perf_counter() - started)
+
+
+class Scorer:
+    """Stateless, so one instance can score any records from any thread."""
+
+    __slots__ = ()
+
+    def score(self, record, policy=None):
+        """Year payment or None, under policy or the policy current at the call."""
+        if policy is None:
+            policy = current_policy()
+
+        if record.income_source is IncomeSource.UNEMPLOYED:
             return None
 
-        if self.__is_loan_rating_prohibited():
+        if record.loan_rating is LoanRating.PROHIBITED:
             return None
 
-        if self.__is_last_payment_date_more_than_retirement_age():
+        credit_term = record.credit_term
+
+        if (record.age + credit_term) > policy.retirement_age[record.sex.code]:
             return None
 
-        if self.__is_payment_less_than_third_of_income():
+        loan_amount = record.loan_amount
+
+        if loan_amount / credit_term > record.income_amount / 3:
             return None
 
-        if self.__is_available_loan_amount_less_than_desired():
+        if policy.available_loan_amount[record.rate_index] < loan_amount:
             return None
 
-        payment = self.__get_payment()
+        payment = (loan_amount * (1 + credit_term * (self.__get_rate(record, policy) / 100))) / credit_term
 
-        if payment > (self.__income_amount / 2):
+        if payment > (record.income_amount / 2):
             return None
 
         return payment
 
-    def __is_unreliable_borrower(self):
-        return self.__income_source == IncomeSource.UNEMPLOYED
+    def decide(self, record, policy=None):
+        """Decision of score(): the rule deciding it and, past the eligibility rules, the rate."""
+        if policy is None:
+            policy = current_policy()
+
+        if record.income_source is IncomeSource.UNEMPLOYED:
+            return _DECISIONS[Reason.UNRELIABLE_BORROWER]
+
+        if record.loan_rating is LoanRating.PROHIBITED:
+            return _DECISIONS[Reason.LOAN_RATING_PROHIBITED]
+
+        credit_term = record.credit_term
+
+        if (record.age + credit_term) > policy.retirement_age[record.sex.code]:
+            return _DECISIONS[Reason.RETIREMENT_AGE]
+
+        loan_amount = record.loan_amount
+
+        if loan_amount / credit_term > record.income_amount / 3:
+            return _DECISIONS[Reason.THIRD_OF_INCOME]
+
+        if policy.available_loan_amount[record.rate_index] < loan_amount:
+            return _DECISIONS[Reason.AVAILABLE_LOAN_AMOUNT]
+
+        rate = self.__get_rate(record, policy)
+        payment = (loan_amount * (1 + credit_term * (rate / 100))) / credit_term
+
+        if payment > (record.income_amount / 2):
+            return Decision(Reason.HALF_OF_INCOME, None, rate)
+
+        return Decision(Reason.APPROVED, payment, rate)
+
+    def __get_rate(self, record, policy):
+        return policy.fixed_rate[record.rate_index] - math.log10(record.loan_amount)
+
+
+class BorrowerScoring(BorrowerRecord):
+    """Record that scores itself, kept for existing callers."""
+
+    __slots__ = ()
+    __scorer = Scorer()
+
+    def score(self):
+        instruments = metrics.active
+        log = _audit_log()
+
+        if log is not None:
+            return log.score(self.__scorer, self, instruments)
+
+        if instruments is not None:
+            return instruments.score(self.__scorer, self)
+
+        return self.__scorer.score(self)
+
+    def decide(self):
+        instruments = metrics.active
+        log = _audit_log()
 
-    def __is_loan_rating_prohibited(self):
-        return self.__loan_rating == LoanRating.PROHIBITED
+        if log is not None:
+            return log.decide(self.__scorer, self, instruments)
 
-    def __is_last_payment_date_more_than_retirement_age(self):
-        return (self.__age + self.__credit_term) > self.__sex.value
+        if instruments is not None:
+            return instruments.decide(self.__scorer, self)
 
-    def __get_available_loan_amount(self):
-        return min(self.__income_source.amount, self.__loan_rating.amount)
+        return self.__scorer.decide(self)
 
-    def __is_payment_less_than_third_of_income(self):
-        return self.__loan_amount / self.__credit_term > self.__income_amount / 3
 
-    def __is_available_loan_amount_less_than_desired(self):
-        return self.__get_available_loan_amount() < self.__loan_amount
+def _audit_log():
+    # audit needs numpy, the scalar path does not import it. A log can only
+    # be active once something else has.
+    audit = sys.modules.get('audit')
 
-    def __get_loan_amount_rate(self):
-        return math.log10(self.__loan_amount)
+    return None if audit is None else audit.active
 
-    def __get_rate(self):
-        rate = self.__base_rate
-        rate += sum([self.__purpose.value, self.__loan_rating.percent, self.__income_source.percent])
-        rate -= self.__get_loan_amount_rate()
 
-        return rate
+if __name__ == '__main__':
+    from cli import main
 
-    def __get_payment(self):
-        return (self.__loan_amount * (1 + self.__credit_term * (self.__get_rate() / 100))) / self.__credit_term
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+import rate_table
+from enums import *
+from borrower_scoring import BorrowerRecord, Scorer
+
+
+DEFAULT_MAX_ENTRIES = 65536
+
+
+class ScoringCache:
+    """Bounded LRU memo of Scorer.score() results keyed on the scoring arguments.
+
+    With loan_amount_digits set, loan_amount is rounded to that many decimals
+    before scoring, so near-duplicate quotes share an entry. The cache clears
+    itself on rate_table.tables_changed(), e.g. when a policy is installed.
+    Decisions are neither audited nor counted by metrics, a hit makes none.
+    """
+
+    __scorer = None
+    __max_entries = None
+    __loan_amount_scale = None
+    __loan_amount_units = None
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, loan_amount_digits=None, scorer=None):
+        if max_entries < 1:
+            raise ValueError('max_entries must be positive')
+
+        self.__scorer = scorer or Scorer()
+        self.__max_entries = max_entries
+
+        if loan_amount_digits is not None:
+            # Amounts are kept as integer units, units / scale is the float
+            # closest to the rounded decimal and is cheaper than round(x, n).
+            self.__loan_amount_scale = scale = 10 ** loan_amount_digits
+            self.__loan_amount_units = (-(-scale // 10), 10 * scale)
+
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        rate_table.add_listener(self.invalidate)
+
+    def score(self, age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose):
+        """Same as BorrowerScoring(...).score(), invalid arguments raise the same exceptions."""
+        # Only arguments BorrowerRecord accepts may reach the lookup, otherwise
+        # 30.0 or an out of range amount rounded into range would hit an entry.
+        # Keys hold enum codes, hashing the members themselves is much slower.
+        if (type(age) is not int or type(income_amount) is not int or not 0.1 <= loan_amount <= 10
+                or type(loan_rating) is not LoanRating or type(sex) is not Sex
+                or type(income_source) is not IncomeSource or type(purpose) is not Purpose):
+            return self.__scorer.score(BorrowerRecord(
+                age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+            ))
+
+        if self.__loan_amount_scale is not None:
+            scale = self.__loan_amount_scale
+            lowest, highest = self.__loan_amount_units
+            loan_amount = min(max(round(loan_amount * scale), lowest), highest) / scale
+
+        key = (age, income_amount, loan_rating.code, loan_amount, credit_term, sex.code, income_source.code, purpose.code)
+
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+
+                return self.__entries[key]
+
+        policy = rate_table.current_policy()
+        payment = self.__scorer.score(BorrowerRecord(
+            age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+        ), policy)
+
+        with self.__lock:
+            self.misses += 1
+
+            # A policy installed meanwhile has already cleared the entries.
+            if policy is not rate_table.current_policy():
+                return payment
+
+            self.__entries[key] = payment
+
+            if len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+        return payment
+
+    def invalidate(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self.__entries)
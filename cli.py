@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import re
+import sys
+import audit
+import metrics
+from enums import *
+from rate_table import current_policy, install_policy, load_policy
+from batch_scoring import FIELDS, decide_batch, validate_batch, validation_errors, columns_from_rows
+
+
+OUTPUT_FIELDS = ('id', 'payment', 'reason', 'errors', 'policy_version')
+FORMATS = ('csv', 'jsonl', 'parquet', 'portfolio')
+DEFAULT_CHUNK_SIZE = 65536
+
+# A missing field reads as None, which validate_batch marks like any other bad value.
+_MISSING = dict.fromkeys(FIELDS)
+# What the surrogateescape error handler turns undecodable bytes into.
+_UNDECODABLE = re.compile('[\udc80-\udcff]')
+
+_REASON_NAMES = tuple(reason.name for reason in Reason)
+_ERROR_NAMES = tuple(
+    tuple(exception.__name__ for exception in validation_errors(errors)) for errors in range(2 ** 8)
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m borrower_scoring')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    score = commands.add_parser('score', help='score CSV or JSON Lines applications in chunks')
+    score.add_argument('input', nargs='?', default='-', help='input file, stdin by default')
+    score.add_argument('-o', '--output', default='-', help='output file, stdout by default')
+    score.add_argument('-f', '--format', choices=FORMATS, help='input format, guessed from the extension')
+    score.add_argument('--output-format', choices=FORMATS, help='output format, same as input by default')
+    score.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows scored per batch')
+    score.add_argument('--id-field', default='id', help='input field with the row id, row number if missing')
+    score.add_argument('--policy', help='policy JSON file, the built-in policy by default')
+    score.add_argument('--metrics-file', help='write scoring metrics in the Prometheus text format to this file')
+    score.add_argument('--audit-dir', help='record every decision in compressed segment files of this directory')
+    score.add_argument('--audit-format', choices=audit.FORMATS, default='jsonl', help='audit segment format')
+
+    convert = commands.add_parser('convert', help='convert CSV or JSON Lines applications to a portfolio file')
+    convert.add_argument('input', nargs='?', default='-', help='input file, stdin by default')
+    convert.add_argument('-o', '--output', required=True, help='portfolio file')
+    convert.add_argument('-f', '--format', choices=('csv', 'jsonl'), help='input format, guessed from the extension')
+    convert.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows converted per batch')
+
+    serve = commands.add_parser('serve', help='serve POST /score over HTTP with micro-batching')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--max-batch-size', type=int, default=256, help='applications per batch at most')
+    serve.add_argument('--max-wait-ms', type=float, default=2, help='how long a batch waits to fill up')
+    serve.add_argument('--policy', help='policy JSON file, reloaded on SIGHUP')
+    serve.add_argument('--metrics', action='store_true', help='record scoring metrics, served on GET /metrics')
+    serve.add_argument('--audit-dir', help='record every decision in compressed segment files of this directory')
+    serve.add_argument('--audit-format', choices=audit.FORMATS, default='jsonl', help='audit segment format')
+
+    daemon = commands.add_parser('daemon', help='serve pre-forked scoring workers on a Unix domain socket')
+    daemon.add_argument('--socket', default='/tmp/borrower_scoring.sock', help='socket path')
+    daemon.add_argument('--workers', type=int, help='worker processes, one per CPU by default')
+    daemon.add_argument('--max-requests', type=int, default=1000, help='requests a worker answers before it is replaced')
+    daemon.add_argument('--policy', help='policy JSON file, reloaded on SIGHUP')
+
+    conformance = commands.add_parser('conformance', help='check the fast engines against BorrowerScoring.score()')
+    conformance.add_argument('--rows', type=int, default=1000000, help='rows checked, half of them at rule bounds')
+    conformance.add_argument('--seed', type=int, default=0)
+    conformance.add_argument('--workers', type=int, help='worker processes, one per CPU by default')
+    conformance.add_argument('--engines', help='comma separated engines, all by default')
+    conformance.add_argument('--policy', help='policy JSON file, the built-in policy by default')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'conformance':
+        return _conformance(args)
+
+    if args.command == 'daemon':
+        return _daemon(args)
+
+    if args.command == 'convert':
+        return _convert(args)
+
+    if not args.audit_dir:
+        return _scored(args)
+
+    try:
+        # Scoring waits for the writer rather than leaving decisions out.
+        log = audit.enable(args.audit_dir, args.audit_format, when_full='block')
+    except OSError as error:
+        print('borrower_scoring: audit directory %s: %s' % (args.audit_dir, error), file=sys.stderr)
+        return 2
+
+    try:
+        status = _scored(args)
+    finally:
+        audit.disable()
+
+    if log.error is not None:
+        print('borrower_scoring: audit log: %s' % log.error, file=sys.stderr)
+        return 2
+
+    return status
+
+
+def _scored(args):
+    if args.command == 'serve':
+        return _serve(args)
+
+    if not args.metrics_file:
+        return _score(args)
+
+    instruments = metrics.enable()
+
+    try:
+        return _score(args)
+    finally:
+        metrics.disable()
+        instruments.write_prometheus(args.metrics_file)
+
+
+def _score(args):
+    if args.policy:
+        try:
+            install_policy(load_policy(args.policy))
+        except (OSError, ValueError) as error:
+            print('borrower_scoring: policy %s: %s' % (args.policy, error), file=sys.stderr)
+            return 2
+
+    input_format = args.format or _guess_format(args.input)
+
+    if 'parquet' in (input_format, args.output_format):
+        return _score_parquet(args, input_format)
+
+    if 'portfolio' in (input_format, args.output_format):
+        return _score_portfolio(args, input_format)
+
+    input_stream = output_stream = None
+
+    try:
+        input_stream = sys.stdin if args.input == '-' else open(args.input, newline='')
+        output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+        score_stream(
+            input_stream, output_stream, input_format, args.output_format or input_format,
+            chunk_size=args.chunk_size, id_field=args.id_field
+        )
+    except (OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+    finally:
+        if input_stream not in (None, sys.stdin):
+            input_stream.close()
+
+        if output_stream not in (None, sys.stdout):
+            output_stream.close()
+
+    return 0
+
+
+def _score_parquet(args, input_format):
+    import arrow_io
+
+    if (input_format, args.output_format or input_format) != ('parquet', 'parquet') or '-' in (args.input, args.output):
+        print('borrower_scoring: parquet is only scored from a file to a file', file=sys.stderr)
+        return 2
+
+    try:
+        arrow_io.score_parquet(args.input, args.output, batch_size=args.chunk_size, id_field=args.id_field)
+    except (ImportError, OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+
+    return 0
+
+
+def _score_portfolio(args, input_format):
+    import portfolio
+
+    if (input_format, args.output_format or input_format) != ('portfolio', 'portfolio') or args.input == '-':
+        print('borrower_scoring: a portfolio file is only scored to a scores file', file=sys.stderr)
+        return 2
+
+    try:
+        portfolio.score_portfolio(args.input, None if args.output == '-' else args.output, window=args.chunk_size)
+    except (OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+
+    return 0
+
+
+def _convert(args):
+    import portfolio
+
+    input_format = args.format or _guess_format(args.input)
+    input_stream = None
+
+    try:
+        input_stream = sys.stdin if args.input == '-' else open(args.input, newline='')
+        portfolio.write_portfolio(_read(input_stream, input_format), args.output, chunk_size=args.chunk_size)
+    except (OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+    finally:
+        if input_stream not in (None, sys.stdin):
+            input_stream.close()
+
+    return 0
+
+
+def _conformance(args):
+    import conformance
+
+    try:
+        policy = load_policy(args.policy) if args.policy else None
+        report = conformance.run(
+            args.rows, args.engines.split(',') if args.engines else tuple(conformance.ENGINES), seed=args.seed,
+            workers=args.workers, policy=policy
+        )
+    except (OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+
+    print(conformance.format_report(report))
+
+    return 1 if any(engine.mismatches for engine in report.engines.values()) else 0
+
+
+def _daemon(args):
+    from daemon import ScoringDaemon
+
+    try:
+        ScoringDaemon(args.socket, args.workers, args.max_requests, args.policy).serve_forever()
+    except (OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+
+    return 0
+
+
+def _serve(args):
+    from service import ScoringService
+
+    service = ScoringService(args.max_batch_size, args.max_wait_ms / 1000, args.policy)
+
+    if args.metrics:
+        metrics.enable()
+
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+def score_stream(input_stream, output_stream, input_format='csv', output_format='csv',
+                 chunk_size=DEFAULT_CHUNK_SIZE, id_field='id'):
+    """Scores rows chunk by chunk, writing each chunk before reading the next.
+
+    Rows missing a field and JSON lines that are not objects are scored
+    INVALID, the rest of their chunk is scored as usual.
+    """
+    rows = _read(input_stream, input_format)
+    write = _writer(output_stream, output_format)
+    row_number = 0
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+
+        if not chunk:
+            break
+
+        ids = [row.get(id_field, row_number + i + 1) for i, row in enumerate(chunk)]
+
+        columns = columns_from_rows(chunk)
+        policy = current_policy()
+        errors = validate_batch(**columns)
+        payment, reason = decide_batch(**columns, errors=errors, policy=policy)
+
+        write(ids, payment.tolist(), reason.tolist(), errors.tolist(), policy.version)
+        output_stream.flush()
+        row_number += len(chunk)
+
+
+def _guess_format(path):
+    if path.endswith('.parquet'):
+        return 'parquet'
+
+    if path.endswith('.portfolio'):
+        return 'portfolio'
+
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def _read(stream, input_format):
+    lines = _lines(stream)
+    rows = _csv_rows(lines) if input_format == 'csv' else _jsonl_rows(lines)
+
+    return ({**_MISSING, **row} for row in rows)
+
+
+def _lines(stream):
+    """Lines of stream, a ValueError naming the first one that is not valid text.
+
+    The stream decodes in large blocks, so its own decoding error cannot
+    tell the line; undecodable bytes are escaped instead and looked for per line.
+    """
+    if hasattr(stream, 'reconfigure'):
+        stream.reconfigure(errors='surrogateescape')
+
+    for line_number, line in enumerate(stream, 1):
+        if not line.isascii() and _UNDECODABLE.search(line):
+            raise ValueError('line %d: not valid %s text' % (line_number, getattr(stream, 'encoding', None) or 'utf-8'))
+
+        yield line
+
+
+def _csv_rows(lines):
+    reader = csv.DictReader(lines)
+
+    try:
+        yield from reader
+    except csv.Error as error:
+        raise ValueError('line %d: %s' % (reader.line_num, error))
+
+
+def _jsonl_rows(lines):
+    return (_json_object(line) for line in lines if line.strip())
+
+
+def _json_object(line):
+    """The object on line, {} when the line is not one, so its row is INVALID instead of ending the stream."""
+    try:
+        row = json.loads(line)
+    except (RecursionError, ValueError):
+        return {}
+
+    return row if isinstance(row, dict) else {}
+
+
+def _writer(stream, output_format):
+    if output_format == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(OUTPUT_FIELDS)
+
+        def write(ids, payments, reasons, errors, policy_version):
+            writer.writerows(
+                (row_id, '' if reason else payment, _REASON_NAMES[reason], ' '.join(_ERROR_NAMES[row_errors]),
+                 policy_version)
+                for row_id, payment, reason, row_errors in zip(ids, payments, reasons, errors)
+            )
+
+        return write
+
+    def write(ids, payments, reasons, errors, policy_version):
+        stream.writelines(
+            json.dumps({
+                'id': row_id,
+                'payment': None if reason else payment,
+                'reason': _REASON_NAMES[reason],
+                'errors': _ERROR_NAMES[row_errors],
+                'policy_version': policy_version
+            }) + '\n'
+            for row_id, payment, reason, row_errors in zip(ids, payments, reasons, errors)
+        )
+
+    return write
@@ -0,0 +1,405 @@
+import math
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+import numpy as np
+from enums import *
+from rate_table import current_policy, install_policy
+from borrower_scoring import BorrowerRecord, BorrowerScoring
+from batch_scoring import FIELDS, decision_batch
+from generator import PortfolioGenerator
+
+
+DEFAULT_CHUNK_SIZE = 65536
+DEFAULT_EXAMPLES = 10
+
+# Payments of float engines may differ from the reference in the last bits only.
+FLOAT_TOLERANCE = 1e-12
+
+_ENUMS = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+_MEMBERS = {field: tuple(enum) for field, enum in _ENUMS.items()}
+_BOUNDARY_KINDS = ('limits', 'retirement_age', 'third_of_income', 'available_loan_amount', 'half_of_income')
+
+# Rules comparing amounts, a row at their bound may be decided either way.
+_AMOUNT_RULES = (Reason.THIRD_OF_INCOME, Reason.AVAILABLE_LOAN_AMOUNT, Reason.HALF_OF_INCOME)
+
+EngineReport = namedtuple('EngineReport', ('rows', 'mismatches', 'seconds', 'examples', 'minimal'))
+ConformanceReport = namedtuple('ConformanceReport', ('rows', 'seed', 'reference_seconds', 'engines'))
+
+
+def _float_tolerance(loan_amount):
+    return np.full(np.shape(loan_amount), FLOAT_TOLERANCE)
+
+
+def _fixedpoint_tolerance(loan_amount):
+    # The rate is rounded to half a basis point of the loan, the payment to a kopeck.
+    return np.asarray(loan_amount) / 20000 + 1e-8
+
+
+# Engines checked against BorrowerScoring with their payment tolerance for loan amounts.
+ENGINES = {
+    'batch': _float_tolerance,
+    'codegen': _float_tolerance,
+    'cached': _float_tolerance,
+    'adaptive': _float_tolerance,
+    'fixedpoint': _fixedpoint_tolerance,
+    'fixedpoint_batch': _fixedpoint_tolerance
+}
+
+
+def run(rows, engines=tuple(ENGINES), seed=0, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+        examples=DEFAULT_EXAMPLES, policy=None):
+    """Scores rows seeded inputs, half random and half at rule bounds, with BorrowerScoring and every engine.
+
+    Chunks are checked in worker processes. A row mismatches when the
+    decisions differ or the payments differ by more than the engine's
+    tolerance. Decisions flipping at the bound of a rule comparing amounts
+    are accepted if the row is within the tolerance of that bound. The
+    first mismatch of each engine is shrunk to a minimal reproducing input.
+
+    Seconds are scoring time summed over the workers. Scalar engines get
+    validated records, except codegen and cached, which validate their
+    arguments themselves.
+    """
+    unknown = set(engines).difference(ENGINES)
+
+    if unknown:
+        raise ValueError('unknown engines %s' % ', '.join(sorted(unknown)))
+
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive')
+
+    policy = policy or current_policy()
+    tasks = [
+        (seed, chunk_index, min(chunk_size, rows - start), tuple(engines), examples)
+        for chunk_index, start in enumerate(range(0, rows, chunk_size))
+    ]
+
+    with multiprocessing.Pool(workers or os.cpu_count(), initializer=_use_policy, initargs=(policy,)) as pool:
+        results = pool.map(_check_chunk, tasks, chunksize=1)
+
+    reference_seconds = sum(result[0] for result in results)
+    reports = {}
+
+    for name in engines:
+        mismatches = sum(result[1][name][0] for result in results)
+        seconds = sum(result[1][name][1] for result in results)
+        found = [example for result in results for example in result[1][name][2]][:examples]
+        minimal = _shrink(name, found[0], policy) if found else None
+        reports[name] = EngineReport(rows, mismatches, seconds, found, minimal)
+
+    return ConformanceReport(rows, seed, reference_seconds, reports)
+
+
+def format_report(report):
+    lines = ['%d rows, seed %d, reference %.0f rows/s' % (
+        report.rows, report.seed, report.rows / report.reference_seconds if report.reference_seconds else math.inf
+    )]
+    lines.append('%-18s %14s %12s' % ('engine', 'rows/s', 'mismatches'))
+
+    for name, engine in report.engines.items():
+        lines.append('%-18s %14.0f %12d' % (
+            name, engine.rows / engine.seconds if engine.seconds else math.inf, engine.mismatches
+        ))
+
+    for name, engine in report.engines.items():
+        if engine.minimal is not None:
+            lines.append('%s minimal input: %s' % (name, _format_row(engine.minimal)))
+
+    return '\n'.join(lines)
+
+
+def boundary_columns(rows, seed=0, chunk_index=0):
+    """Valid score_batch columns at the bounds of the rules, kinds in turn.
+
+    Kinds are loan amounts of 0.1 and 10 and terms of 1 and 20, age plus
+    term at the retirement age, loans at a third of the income times the
+    term, at the available amount and, solved for, a payment at half the
+    income; amount bounds come with their neighbouring floats.
+    """
+    random = np.random.default_rng([seed, chunk_index, 1])
+    columns = PortfolioGenerator(seed=seed).columns(rows, chunk_index)
+    policy = current_policy()
+    kind = np.arange(rows) % len(_BOUNDARY_KINDS)
+    nudge = random.integers(-1, 2, rows)
+
+    limits = kind == _BOUNDARY_KINDS.index('limits')
+    columns['loan_amount'][limits] = random.choice([0.1, 10], limits.sum())
+    columns['credit_term'][limits] = random.choice([1, 20], limits.sum())
+
+    retirement = kind == _BOUNDARY_KINDS.index('retirement_age')
+    retirement_age = np.array(policy.retirement_age).take(columns['sex'][retirement])
+    columns['age'][retirement] = retirement_age - columns['credit_term'][retirement] + nudge[retirement]
+
+    # The rules before these pass, so the bound decides.
+    amounts = kind >= _BOUNDARY_KINDS.index('third_of_income')
+    third = kind == _BOUNDARY_KINDS.index('third_of_income')
+    available = kind == _BOUNDARY_KINDS.index('available_loan_amount')
+    half = kind == _BOUNDARY_KINDS.index('half_of_income')
+    columns['age'][amounts] = 18
+    columns['loan_rating'][amounts] = random.integers(1, len(LoanRating), amounts.sum())
+    columns['income_source'][amounts] = random.integers(0, len(IncomeSource) - 1, amounts.sum())
+
+    # Loan limits of 10 for the income bounds, small incomes to keep the loans below 10.
+    columns['loan_rating'][third | half] = random.choice([LoanRating.NORMAL.code, LoanRating.HIGH.code], (third | half).sum())
+    columns['income_source'][third | half] = IncomeSource.BUSINESSMAN.code
+    columns['income_amount'][third | half] = random.integers(1, 4, (third | half).sum())
+    columns['credit_term'][third] = random.integers(1, 11, third.sum())
+    columns['credit_term'][half] = random.integers(10, 21, half.sum())
+
+    # Incomes high enough for the third-of-income rule to pass.
+    columns['income_amount'][available] = 20
+    columns['credit_term'][available] = random.integers(5, 21, available.sum())
+
+    income = columns['income_amount'].astype(np.float64)
+    term = columns['credit_term'].astype(np.float64)
+    index = (columns['purpose'].astype(np.intp) * len(LoanRating) + columns['loan_rating']) * len(IncomeSource) \
+        + columns['income_source']
+
+    columns['loan_amount'][third] = income[third] * term[third] / 3
+    columns['loan_amount'][available] = np.array(policy.available_loan_amount).take(index[available])
+    columns['loan_amount'][half] = _half_income_loan(
+        np.array(policy.fixed_rate).take(index[half]), term[half], income[half] / 2
+    )
+
+    loan_amount = columns['loan_amount']
+    loan_amount[amounts] = np.nextafter(loan_amount[amounts], loan_amount[amounts] + nudge[amounts])
+    np.clip(loan_amount, 0.1, 10, out=loan_amount)
+
+    return columns
+
+
+def _half_income_loan(fixed_rate, term, half_income):
+    """Loan amounts from 0.1 to 10 whose payment is closest to half_income, by bisection."""
+    low = np.full(len(term), 0.1)
+    high = np.full(len(term), 10.0)
+
+    for _ in range(64):
+        middle = (low + high) / 2
+        rate = fixed_rate - np.log10(middle)
+        above = (middle * (1 + term * (rate / 100))) / term > half_income
+        high = np.where(above, middle, high)
+        low = np.where(above, low, middle)
+
+    return high
+
+
+def _use_policy(policy):
+    if current_policy() is not policy:
+        install_policy(policy)
+
+
+def _check_chunk(task):
+    seed, chunk_index, rows, engines, examples = task
+    random = PortfolioGenerator(seed=seed).columns(rows - rows // 2, chunk_index)
+    boundary = boundary_columns(rows // 2, seed, chunk_index)
+    columns = {field: np.concatenate([random[field], boundary[field]]) for field in FIELDS}
+    records = _records(columns)
+
+    started = time.perf_counter()
+    payments = [record.score() for record in records]
+    reference_seconds = time.perf_counter() - started
+    reference = list(zip(payments, (record.decide() for record in records)))
+
+    results = {}
+
+    for name in engines:
+        started = time.perf_counter()
+        reason, payment = _score(name, columns, records)
+        seconds = time.perf_counter() - started
+        mismatched = np.flatnonzero(_mismatches(name, columns, reference, reason, payment))
+        results[name] = (
+            len(mismatched), seconds, [_row(columns, i) for i in mismatched[:examples].tolist()]
+        )
+
+    return reference_seconds, results
+
+
+def _records(columns):
+    rows = zip(*(
+        [_MEMBERS[field][code] for code in columns[field].tolist()] if field in _MEMBERS else columns[field].tolist()
+        for field in FIELDS
+    ))
+
+    return [BorrowerScoring(*row) for row in rows]
+
+
+def _row(columns, i):
+    return tuple(
+        _MEMBERS[field][int(columns[field][i])] if field in _MEMBERS else columns[field][i].item() for field in FIELDS
+    )
+
+
+def _score(name, columns, records):
+    """Reasons, None for engines without them, and payments with NaN for None."""
+    if name == 'batch':
+        return decision_batch(**columns)[:2]
+
+    if name == 'fixedpoint_batch':
+        import fixedpoint
+
+        minor = dict(columns)
+        minor['income_amount'] = columns['income_amount'].astype(np.int64) * fixedpoint.MINOR_UNITS
+        minor['loan_amount'] = fixedpoint.to_minor(columns['loan_amount'])
+        reason, payment, _ = fixedpoint.decision_batch(**minor)
+
+        return reason, np.where(payment == fixedpoint.MISSING, np.nan, payment / fixedpoint.MINOR_UNITS)
+
+    if name in ('adaptive', 'fixedpoint'):
+        if name == 'adaptive':
+            from adaptive import AdaptiveScorer
+
+            decide = AdaptiveScorer().decide
+            units = 1
+        else:
+            import fixedpoint
+
+            decide = fixedpoint.FixedPointScorer().decide
+            units = fixedpoint.MINOR_UNITS
+
+        decisions = [decide(record) for record in records]
+
+        return (
+            np.array([decision.reason for decision in decisions], dtype=np.int8),
+            np.array([np.nan if decision.payment is None else decision.payment / units for decision in decisions])
+        )
+
+    if name == 'codegen':
+        import codegen
+
+        score = codegen.score
+    else:
+        from cache import ScoringCache
+
+        score = ScoringCache().score
+
+    payments = [
+        score(record.age, record.income_amount, record.loan_rating, record.loan_amount, record.credit_term,
+              record.sex, record.income_source, record.purpose)
+        for record in records
+    ]
+
+    return None, np.array([np.nan if payment is None else payment for payment in payments])
+
+
+def _mismatches(name, columns, reference, reason, payment):
+    """Rows where the engine differs from the reference beyond its tolerance."""
+    policy = current_policy()
+    tolerance = ENGINES[name](columns['loan_amount'])
+    reference_payment = np.array([np.nan if score is None else score for score, _ in reference])
+    reference_reason = np.array([decision.reason for _, decision in reference], dtype=np.int8)
+
+    approved = ~np.isnan(reference_payment)
+    mismatched = approved != ~np.isnan(payment)
+    mismatched |= approved & ~(np.abs(payment - reference_payment) <= tolerance)
+
+    if reason is None:
+        return mismatched
+
+    flipped = reason != reference_reason
+    mismatched |= flipped
+
+    if not flipped.any():
+        return mismatched
+
+    # The earlier rule of the two decided one of them, it flipped if the row is at its bound.
+    rule = np.where(reason == Reason.APPROVED, reference_reason, np.where(
+        reference_reason == Reason.APPROVED, reason, np.minimum(reason, reference_reason)
+    ))
+    loan_amount = columns['loan_amount']
+    term = columns['credit_term'].astype(np.float64)
+    income = columns['income_amount'].astype(np.float64)
+    index = (columns['purpose'].astype(np.intp) * len(LoanRating) + columns['loan_rating']) * len(IncomeSource) \
+        + columns['income_source']
+    rate = np.array([np.nan if decision.rate is None else decision.rate for _, decision in reference])
+    distance = np.select(
+        [rule == Reason.THIRD_OF_INCOME, rule == Reason.AVAILABLE_LOAN_AMOUNT, rule == Reason.HALF_OF_INCOME],
+        [
+            np.abs(loan_amount / term - income / 3),
+            np.abs(loan_amount - np.array(policy.available_loan_amount).take(index)),
+            np.abs((loan_amount * (1 + term * (rate / 100))) / term - income / 2)
+        ],
+        np.inf
+    )
+    # At the bound either decision may be right.
+    return mismatched & ~(flipped & np.isin(rule, _AMOUNT_RULES) & (distance <= tolerance))
+
+
+def _fails(name, row):
+    columns = {
+        field: np.array([value.code if field in _MEMBERS else value], dtype=np.int8 if field in _MEMBERS else None)
+        for field, value in zip(FIELDS, row)
+    }
+    records = [BorrowerScoring(*row)]
+    reference = [(records[0].score(), records[0].decide())]
+    reason, payment = _score(name, columns, records)
+
+    return bool(_mismatches(name, columns, reference, reason, payment)[0])
+
+
+def _simpler(field, value):
+    """Candidate values simpler than value, simplest first."""
+    if field in _MEMBERS:
+        return _MEMBERS[field][:value.code]
+
+    if field == 'loan_amount':
+        # Fewer decimals, then smaller, is a total order, so shrinking ends.
+        candidates = {0.1, 1, 10}.union(round(value, digits) for digits in range(16))
+
+        return sorted(
+            (
+                candidate for candidate in candidates
+                if 0.1 <= candidate <= 10 and _amount_order(candidate) < _amount_order(value)
+            ),
+            key=_amount_order
+        )
+
+    lowest = {'age': 0, 'income_amount': 1, 'credit_term': 1}[field]
+
+    return [lowest, (lowest + value) // 2, value - 1]
+
+
+def _amount_order(amount):
+    decimals = next((digits for digits in range(17) if round(amount, digits) == amount), 17)
+
+    return decimals, amount
+
+
+def _shrink(name, row, policy):
+    """row made simpler field by field for as long as the engine still mismatches on it."""
+    # BorrowerScoring and some engines only score with the installed policy.
+    previous = current_policy()
+    _use_policy(policy)
+
+    try:
+        row = list(row)
+        changed = True
+
+        while changed:
+            changed = False
+
+            for position, field in enumerate(FIELDS):
+                for candidate in _simpler(field, row[position]):
+                    if candidate == row[position]:
+                        continue
+
+                    trial = row[:position] + [candidate] + row[position + 1:]
+
+                    try:
+                        BorrowerRecord(*trial)
+                    except ValueError:
+                        continue
+
+                    if _fails(name, trial):
+                        row = trial
+                        changed = True
+                        break
+    finally:
+        _use_policy(previous)
+
+    return tuple(row)
+
+
+def _format_row(row):
+    return ', '.join('%s=%s' % (field, value.name if field in _MEMBERS else repr(value)) for field, value in zip(FIELDS, row))
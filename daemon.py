@@ -0,0 +1,329 @@
+import io
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import numpy as np
+from rate_table import current_policy, install_policy, load_policy
+from batch_scoring import FIELDS, columns_from_rows, validate_batch
+from cli import score_stream
+from portfolio import RECORD_DTYPE, SCORE_DTYPE, decide_records, records_from_columns
+from daemon_client import (
+    DEFAULT_SOCKET, DECIDE, SCORE_TEXT, OK, BAD_REQUEST, TEXT_FORMATS, receive_frame, response_body, send_frame
+)
+
+
+DEFAULT_MAX_REQUESTS = 1000
+
+# A DECIDE response body is the policy version, prefixed by its length, and
+# SCORE_DTYPE scores of the RECORD_DTYPE records of the request.
+_VERSION_LENGTH = struct.Struct('>H')
+
+_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+
+
+class ScoringDaemon:
+    """Pre-forked scoring workers answering daemon_client frames on a Unix domain socket.
+
+    Modules, the policy and its tables are loaded once in the parent and
+    shared by the forked workers. A worker exits after max_requests
+    requests, once its client disconnects or right after the response
+    if the client keeps the connection, and the parent forks a fresh one.
+    SIGHUP reloads policy_path and replaces the workers, SIGTERM and SIGINT
+    stop the daemon; workers stop between requests.
+    """
+
+    __listener = None
+    __running = False
+
+    def __init__(self, path=DEFAULT_SOCKET, workers=None, max_requests=DEFAULT_MAX_REQUESTS, policy_path=None):
+        if max_requests < 1:
+            raise ValueError('max_requests must be positive')
+
+        self.__path = path
+        self.__worker_count = workers or os.cpu_count()
+        self.__max_requests = max_requests
+        self.__policy_path = policy_path
+        self.__workers = set()
+        self.forked = 0
+
+    def serve_forever(self):
+        if self.__policy_path:
+            install_policy(load_policy(self.__policy_path))
+
+        # Clients may signal the daemon as soon as the socket exists.
+        self.__running = True
+        handlers = {
+            signum: signal.signal(signum, handler)
+            for signum, handler in zip(_SIGNALS, (self.__stop, self.__stop, self.__reload))
+        }
+
+        try:
+            self.__listen()
+            _warm_up()
+
+            while self.__running:
+                while len(self.__workers) < self.__worker_count:
+                    self.__fork()
+
+                pid, _ = os.wait()
+                self.__workers.discard(pid)
+        finally:
+            self.__running = False
+            self.__signal_workers(signal.SIGTERM)
+
+            while self.__workers:
+                try:
+                    pid, _ = os.wait()
+                except ChildProcessError:
+                    break
+
+                self.__workers.discard(pid)
+
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+            if self.__listener is not None:
+                self.__listener.close()
+                os.unlink(self.__path)
+
+    def reload_policy(self):
+        """Installs policy_path again and replaces the workers, a broken file keeps the current policy."""
+        try:
+            install_policy(load_policy(self.__policy_path))
+        except (OSError, ValueError) as error:
+            print('policy %s not reloaded: %s' % (self.__policy_path, error), file=sys.stderr)
+            return
+
+        self.__signal_workers(signal.SIGTERM)
+
+    def __listen(self):
+        if os.path.exists(self.__path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                if probe.connect_ex(self.__path) == 0:
+                    raise OSError('a daemon is already listening on %s' % self.__path)
+
+            os.unlink(self.__path)
+
+        self.__listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__listener.bind(self.__path)
+        self.__listener.listen(128)
+        self.__listener.setblocking(False)
+
+    def __fork(self):
+        # Signals wait until the worker has replaced the daemon's handlers.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _SIGNALS)
+        pid = os.fork()
+
+        if pid:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+            self.__workers.add(pid)
+            self.forked += 1
+            return
+
+        status = 1
+
+        try:
+            _Worker(self.__listener, self.__max_requests).run()
+            status = 0
+        finally:
+            os._exit(status)
+
+    def __signal_workers(self, signum):
+        for pid in self.__workers:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def __stop(self, signum, frame):
+        self.__running = False
+        self.__signal_workers(signal.SIGTERM)
+
+    def __reload(self, signum, frame):
+        if self.__policy_path:
+            self.reload_policy()
+
+
+class DaemonClient:
+    """Connection to a ScoringDaemon for numpy callers, reconnecting after a worker is recycled."""
+
+    __connection = None
+
+    def __init__(self, path=DEFAULT_SOCKET):
+        self.__path = path
+
+    def decide(self, columns):
+        """(payment, reason, policy version) of score_batch keyword columns, as decide_batch() with validate_batch()."""
+        payload = self.__request(bytes((DECIDE,)) + records_from_columns(columns).tobytes())
+        length, = _VERSION_LENGTH.unpack_from(payload)
+        scores = np.frombuffer(payload, dtype=SCORE_DTYPE, offset=_VERSION_LENGTH.size + length)
+
+        return (
+            scores['payment'].copy(), scores['reason'].copy(),
+            payload[_VERSION_LENGTH.size:_VERSION_LENGTH.size + length].decode()
+        )
+
+    def score_text(self, data, input_format='csv'):
+        """Output of cli.score_stream() for the bytes of a CSV or JSON Lines file."""
+        return self.__request(bytes((SCORE_TEXT, TEXT_FORMATS.index(input_format))) + data)
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __request(self, payload):
+        for attempt in (1, 2):
+            if self.__connection is None:
+                self.__connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.__connection.connect(self.__path)
+
+            try:
+                send_frame(self.__connection, payload)
+                response = receive_frame(self.__connection)
+            except ConnectionError:
+                response = None
+
+            if response is not None:
+                return response_body(response)
+
+            # The worker was recycled, scoring is idempotent so the request is sent again.
+            self.close()
+
+        raise ConnectionError('daemon closed the connection')
+
+
+class _Worker:
+
+    __stopping = False
+
+    def __init__(self, listener, max_requests):
+        self.__listener = listener
+        self.__max_requests = max_requests
+        self.__requests = 0
+
+    def run(self):
+        # SIGTERM only sets a flag and wakes select(), so a worker never drops
+        # a connection it has accepted; it stops between requests.
+        self.__wakeup, wakeup = os.pipe()
+        os.set_blocking(wakeup, False)
+        signal.set_wakeup_fd(wakeup)
+        signal.signal(signal.SIGTERM, self.__stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+
+        while self.__requests < self.__max_requests and self.__ready(self.__listener):
+            try:
+                # The listener is non-blocking, another worker may have taken the client.
+                connection, _ = self.__listener.accept()
+            except BlockingIOError:
+                continue
+
+            connection.setblocking(True)
+
+            with connection:
+                try:
+                    self.__serve(connection)
+                except (ConnectionError, ValueError):
+                    pass
+
+    def __serve(self, connection):
+        # A new client is answered at least once, even when the worker is stopping.
+        payload = receive_frame(connection)
+
+        while payload is not None:
+            try:
+                send_frame(connection, _answer(payload))
+            finally:
+                self.__requests += 1
+
+            if self.__requests >= self.__max_requests or not self.__ready(connection):
+                return
+
+            payload = receive_frame(connection)
+
+    def __ready(self, readable):
+        """Waits until readable can be read, False once the worker is stopping."""
+        while not self.__stopping:
+            ready, _, _ = select.select((readable, self.__wakeup), (), ())
+
+            if self.__wakeup in ready:
+                os.read(self.__wakeup, 64)
+            elif ready:
+                return True
+
+        return False
+
+    def __stop(self, signum, frame):
+        self.__stopping = True
+
+
+def _answer(payload):
+    try:
+        if payload[0] == DECIDE:
+            body = _decide(payload)
+        elif payload[0] == SCORE_TEXT:
+            body = _score_text(payload)
+        else:
+            raise ValueError('unknown operation %d' % payload[0])
+    except (IndexError, OverflowError, TypeError, ValueError) as error:
+        return bytes((BAD_REQUEST,)) + str(error).encode()
+
+    return bytes((OK,)) + body
+
+
+def _decide(payload):
+    if (len(payload) - 1) % RECORD_DTYPE.itemsize:
+        raise ValueError('records must be %d bytes each' % RECORD_DTYPE.itemsize)
+
+    policy = current_policy()
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, offset=1).copy()
+    # The client's errors are not trusted, a NaN amount or an unknown code must not be scored.
+    records['errors'] |= validate_batch(**{field: records[field] for field in FIELDS})
+    payment, reason = decide_records(records, policy)
+    scores = np.empty(len(payment), dtype=SCORE_DTYPE)
+    scores['payment'] = payment
+    scores['reason'] = reason
+    version = policy.version.encode()
+
+    return _VERSION_LENGTH.pack(len(version)) + version + scores.tobytes()
+
+
+def _score_text(payload):
+    input_format = TEXT_FORMATS[payload[1]]
+    text = payload[2:]
+
+    try:
+        text = text.decode()
+    except UnicodeDecodeError as error:
+        raise ValueError('line %d: %s' % (text.count(b'\n', 0, error.start) + 1, error))
+
+    output = io.StringIO(newline='')
+    score_stream(io.StringIO(text, newline=''), output, input_format, input_format)
+
+    return output.getvalue().encode()
+
+
+def _warm_up():
+    """Runs every operation once, so lazily built tables and caches are inherited by the workers."""
+    row = {
+        'age': 35, 'income_amount': 10, 'loan_rating': 'HIGH', 'loan_amount': 3, 'credit_term': 10,
+        'sex': 'MALE', 'income_source': 'EMPLOYEE', 'purpose': 'MORTGAGE'
+    }
+
+    _answer(bytes((DECIDE,)) + records_from_columns(columns_from_rows([row])).tobytes())
+    _answer(bytes((SCORE_TEXT, TEXT_FORMATS.index('jsonl'))) + json.dumps(row).encode() + b'\n')
+    _answer(bytes((SCORE_TEXT, TEXT_FORMATS.index('csv'))) + (
+        ','.join(row) + '\n' + ','.join(str(value) for value in row.values()) + '\n'
+    ).encode())
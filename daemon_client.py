@@ -0,0 +1,118 @@
+"""Pipes a CSV or JSON Lines file through a running scoring daemon.
+
+python daemon_client.py applications.csv -o decisions.csv --socket /tmp/borrower_scoring.sock
+Output is the same as python -m borrower_scoring score gives. Only the
+standard library is imported, so the client starts in a few milliseconds.
+"""
+import argparse
+import socket
+import struct
+import sys
+
+
+DEFAULT_SOCKET = '/tmp/borrower_scoring.sock'
+
+# A frame is a big-endian uint32 payload length and the payload. Request
+# payloads start with an operation, response payloads with a status.
+FRAME = struct.Struct('>I')
+MAX_FRAME_SIZE = 2 ** 31
+
+DECIDE = 1
+SCORE_TEXT = 2
+
+OK = 0
+BAD_REQUEST = 1
+
+TEXT_FORMATS = ('csv', 'jsonl')
+
+
+def send_frame(connection, payload):
+    connection.sendall(FRAME.pack(len(payload)) + payload)
+
+
+def receive_frame(connection):
+    """Payload of the next frame, None if the peer closed the connection before it."""
+    header = _receive_exactly(connection, FRAME.size, True)
+
+    if header is None:
+        return None
+
+    size, = FRAME.unpack(header)
+
+    if size > MAX_FRAME_SIZE:
+        raise ValueError('frame of %d bytes is too large' % size)
+
+    return _receive_exactly(connection, size)
+
+
+def response_body(payload):
+    """Body of a response payload, ValueError with the daemon's message for a failed request."""
+    if payload is None:
+        raise ConnectionError('daemon closed the connection')
+
+    if payload[0] != OK:
+        raise ValueError(payload[1:].decode('utf-8', 'replace'))
+
+    return payload[1:]
+
+
+def score_text(data, input_format='csv', path=DEFAULT_SOCKET):
+    """Daemon output for the bytes of a CSV or JSON Lines file, in the same format."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        send_frame(connection, bytes((SCORE_TEXT, TEXT_FORMATS.index(input_format))) + data)
+
+        return response_body(receive_frame(connection))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='daemon_client.py')
+    parser.add_argument('input', nargs='?', default='-', help='input file, stdin by default')
+    parser.add_argument('-o', '--output', default='-', help='output file, stdout by default')
+    parser.add_argument('-f', '--format', choices=TEXT_FORMATS, help='input format, guessed from the extension')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='daemon socket, %s by default' % DEFAULT_SOCKET)
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ('jsonl' if args.input.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+
+    try:
+        if args.input == '-':
+            data = sys.stdin.buffer.read()
+        else:
+            with open(args.input, 'rb') as stream:
+                data = stream.read()
+
+        output = score_text(data, input_format, args.socket)
+    except (OSError, ValueError) as error:
+        print('borrower_scoring: %s' % error, file=sys.stderr)
+        return 2
+
+    if args.output == '-':
+        sys.stdout.buffer.write(output)
+    else:
+        with open(args.output, 'wb') as stream:
+            stream.write(output)
+
+    return 0
+
+
+def _receive_exactly(connection, size, eof_allowed=False):
+    chunks = []
+
+    while size:
+        chunk = connection.recv(min(size, 1048576))
+
+        if not chunk:
+            if eof_allowed and not chunks:
+                return None
+
+            raise ConnectionError('connection closed inside a frame')
+
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b''.join(chunks)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
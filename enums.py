@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 
 class LoanRating(Enum):
@@ -46,3 +46,28 @@ class Sex(Enum):
     """Retirement age according sex."""
     MALE = 65
     FEMALE = 60
+
+
+class Reason(IntEnum):
+    """Scoring outcome, rejection reasons are in the order score() checks them.
+
+    INVALID is used by the batch paths for rows that fail validation.
+    """
+    APPROVED = 0
+    UNRELIABLE_BORROWER = 1
+    LOAN_RATING_PROHIBITED = 2
+    RETIREMENT_AGE = 3
+    THIRD_OF_INCOME = 4
+    AVAILABLE_LOAN_AMOUNT = 5
+    HALF_OF_INCOME = 6
+    INVALID = 7
+
+
+def _set_codes(*enum_classes):
+    """Integer code of each member is its position in the enum definition."""
+    for enum_class in enum_classes:
+        for code, member in enumerate(enum_class):
+            member.code = code
+
+
+_set_codes(LoanRating, Purpose, IncomeSource, Sex)
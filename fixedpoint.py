@@ -0,0 +1,222 @@
+import decimal
+import functools
+import math
+import numpy as np
+from enums import *
+from rate_table import current_policy
+from borrower_scoring import Decision
+from batch_scoring import BatchDecision
+
+
+# Kopecks in one unit of the amount arguments, a million roubles.
+MINOR_UNITS = 10 ** 8
+BASIS_POINTS = 10000
+
+# Integer payment or rate of rows decision_batch has none for.
+MISSING = np.iinfo(np.int64).min
+
+# Valid loan amounts are 0.1 to 10 millions, their log10 is -1 to 1 percent.
+# The log10 term is rounded to the nearest basis point: a float log gives a
+# candidate, which is then moved to the integer bounds in kopecks worked out
+# once with 40 digits. So no libm can change a result. No bound is a whole
+# kopeck, so there are no ties.
+_LOG_BASIS_POINTS = range(-100, 101)
+
+
+def _log_bounds():
+    """Smallest loan in kopecks whose log10 term rounds to each basis point, open ended at both ends."""
+    context = decimal.Context(prec=40, rounding=decimal.ROUND_CEILING)
+    ten = decimal.Decimal(10)
+    bounds = [
+        int(context.multiply(MINOR_UNITS, context.power(ten, (decimal.Decimal(points) - decimal.Decimal('0.5')) / 100))
+            .to_integral_value(rounding=decimal.ROUND_CEILING))
+        for points in _LOG_BASIS_POINTS[1:]
+    ]
+
+    return tuple([np.iinfo(np.int64).min] + bounds + [np.iinfo(np.int64).max])
+
+
+_LOG_BOUNDS = _log_bounds()
+_LOG_BOUNDS_ARRAY = np.array(_LOG_BOUNDS, dtype=np.int64)
+_REJECTED = tuple(Decision(reason, None, None) for reason in Reason)
+
+
+def to_minor(amount):
+    """Kopecks of an amount in millions, a number or an array, to the nearest kopeck, ties to even."""
+    if isinstance(amount, np.ndarray):
+        return np.rint(amount * MINOR_UNITS).astype(np.int64)
+
+    return round(amount * MINOR_UNITS)
+
+
+def log_basis_points(loan_amount):
+    """log10 of a loan in millions, given in kopecks, as rounded basis points of a percent, -100 to 100."""
+    first = _LOG_BASIS_POINTS[0]
+
+    if isinstance(loan_amount, np.ndarray):
+        index = np.log10(loan_amount)
+        index -= 8
+        index *= 100
+        np.rint(index, out=index)
+        index = index.astype(np.intp)
+        index -= first
+        np.clip(index, 0, len(_LOG_BASIS_POINTS) - 1, out=index)
+        index += _LOG_BOUNDS_ARRAY.take(index + 1) <= loan_amount
+        index -= _LOG_BOUNDS_ARRAY.take(index) > loan_amount
+        index += first
+
+        return index
+
+    index = min(max(round((math.log10(loan_amount) - 8) * 100) - first, 0), len(_LOG_BASIS_POINTS) - 1)
+
+    if _LOG_BOUNDS[index + 1] <= loan_amount:
+        index += 1
+    elif _LOG_BOUNDS[index] > loan_amount:
+        index -= 1
+
+    return index + first
+
+
+@functools.lru_cache(maxsize=4)
+def policy_minor_tables(policy):
+    """Fixed rates in basis points, available loan amounts in kopecks and retirement ages of policy."""
+    return (
+        tuple(round(rate * 100) for rate in policy.fixed_rate),
+        tuple(to_minor(amount) for amount in policy.available_loan_amount),
+        policy.retirement_age
+    )
+
+
+class FixedPointScorer:
+    """Scorer of BorrowerRecords with integer money: payments in kopecks, rates in basis points.
+
+    Amounts are converted with to_minor() and rates of the policy rounded
+    to basis points, ties to even. The payment is computed exactly and
+    rounded once to a kopeck, ties to even. The rules compare integers,
+    3 * loan > income * term and 2 * payment > income, so a decision right
+    at a bound can differ from Scorer's float one.
+    """
+
+    # The last policy and its policy_minor_tables(), replaced together.
+    __tables = (None, None)
+
+    def score(self, record, policy=None):
+        """Year payment in kopecks or None."""
+        return self.decide(record, policy).payment
+
+    def decide(self, record, policy=None):
+        """Decision of score() with the payment in kopecks and the rate in basis points."""
+        if policy is None:
+            policy = current_policy()
+
+        if record.income_source is IncomeSource.UNEMPLOYED:
+            return _REJECTED[Reason.UNRELIABLE_BORROWER]
+
+        if record.loan_rating is LoanRating.PROHIBITED:
+            return _REJECTED[Reason.LOAN_RATING_PROHIBITED]
+
+        credit_term = record.credit_term
+
+        if (record.age + credit_term) > policy.retirement_age[record.sex.code]:
+            return _REJECTED[Reason.RETIREMENT_AGE]
+
+        loan_amount = round(record.loan_amount * MINOR_UNITS)
+        income_amount = record.income_amount * MINOR_UNITS
+
+        if 3 * loan_amount > income_amount * credit_term:
+            return _REJECTED[Reason.THIRD_OF_INCOME]
+
+        tables_policy, tables = self.__tables
+
+        if tables_policy is not policy:
+            tables = policy_minor_tables(policy)
+            self.__tables = policy, tables
+
+        rate_index = record.rate_index
+
+        if tables[1][rate_index] < loan_amount:
+            return _REJECTED[Reason.AVAILABLE_LOAN_AMOUNT]
+
+        rate = tables[0][rate_index] - log_basis_points(loan_amount)
+        payment = _divide_half_even(loan_amount * (BASIS_POINTS + credit_term * rate), BASIS_POINTS * credit_term)
+
+        if 2 * payment > income_amount:
+            return Decision(Reason.HALF_OF_INCOME, None, rate)
+
+        return Decision(Reason.APPROVED, payment, rate)
+
+
+def decision_batch(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose,
+                   errors=None, policy=None):
+    """BatchDecision of int8 Reason codes, int64 payments in kopecks and int64 rates in basis points.
+
+    income_amount and loan_amount are int64 kopecks, see to_minor(), the
+    other columns are as for batch_scoring.decision_batch(). Payments are
+    MISSING unless approved, rates unless the rules before the half-income
+    cap pass. Rows with non-zero errors get Reason.INVALID. Every row
+    matches FixedPointScorer.decide(); products stay within int64 for
+    incomes below 10 ** 16 kopecks.
+    """
+    fixed_rates, available_loan_amounts, retirement_ages = (
+        np.array(table, dtype=np.int64) for table in policy_minor_tables(policy or current_policy())
+    )
+    age, income_amount, loan_amount, credit_term = (
+        np.asarray(column, dtype=np.int64) for column in (age, income_amount, loan_amount, credit_term)
+    )
+    loan_rating, sex, income_source, purpose = (
+        np.asarray(column) for column in (loan_rating, sex, income_source, purpose)
+    )
+    invalid = None if errors is None else np.asarray(errors) != 0
+
+    if invalid is not None and invalid.any():
+        # Placeholder values keep the lookups in range, the rows end up INVALID.
+        loan_rating, sex, income_source, purpose = (
+            np.where(invalid, 0, column) for column in (loan_rating, sex, income_source, purpose)
+        )
+        loan_amount = np.where(invalid, MINOR_UNITS, loan_amount)
+        credit_term = np.where(invalid, 1, credit_term)
+
+    index = (purpose.astype(np.intp) * len(LoanRating) + loan_rating) * len(IncomeSource) + income_source
+
+    rate = fixed_rates.take(index)
+    rate -= log_basis_points(loan_amount)
+    payment = _divide_half_even(loan_amount * (BASIS_POINTS + credit_term * rate), BASIS_POINTS * credit_term)
+
+    reason = np.full(age.shape, Reason.APPROVED, dtype=np.int8)
+    np.copyto(reason, Reason.HALF_OF_INCOME, where=2 * payment > income_amount)
+    ineligible = np.zeros(age.shape, dtype=bool)
+
+    for rule, rejected in (
+        (Reason.AVAILABLE_LOAN_AMOUNT, available_loan_amounts.take(index) < loan_amount),
+        (Reason.THIRD_OF_INCOME, 3 * loan_amount > income_amount * credit_term),
+        (Reason.RETIREMENT_AGE, age + credit_term > retirement_ages.take(sex)),
+        (Reason.LOAN_RATING_PROHIBITED, loan_rating == LoanRating.PROHIBITED.code),
+        (Reason.UNRELIABLE_BORROWER, income_source == IncomeSource.UNEMPLOYED.code)
+    ):
+        # Later rules in score() order are written first, earlier ones overwrite them.
+        np.copyto(reason, rule, where=rejected)
+        ineligible |= rejected
+
+    if invalid is not None:
+        np.copyto(reason, Reason.INVALID, where=invalid)
+        ineligible |= invalid
+
+    np.copyto(payment, MISSING, where=reason != Reason.APPROVED)
+    np.copyto(rate, MISSING, where=ineligible)
+
+    return BatchDecision(reason, payment, rate)
+
+
+def _divide_half_even(numerator, denominator):
+    """numerator / denominator rounded to the nearest integer, ties to even, for positive denominators."""
+    quotient, remainder = divmod(numerator, denominator)
+    remainder *= 2
+
+    if isinstance(quotient, np.ndarray):
+        up = remainder > denominator
+        up |= (remainder == denominator) & (quotient & 1).astype(bool)
+        quotient += up
+
+        return quotient
+
+    return quotient + (remainder > denominator or (remainder == denominator and quotient & 1))
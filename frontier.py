@@ -0,0 +1,306 @@
+import math
+import numpy as np
+from enums import *
+from rate_table import current_policy, rate_index
+from borrower_scoring import BorrowerRecord, Scorer
+from batch_scoring import score_batch, policy_tables
+
+
+MIN_LOAN_AMOUNT = 0.1
+MAX_LOAN_AMOUNT = 10
+MIN_INCOME_AMOUNT = 1
+
+_NEWTON_STEPS = 12
+_ULP_STEPS = 64
+
+_scorer = Scorer()
+
+
+def max_loan_amount(age, income_amount, loan_rating, credit_term, sex, income_source, purpose, policy=None):
+    """Largest loan_amount score() approves and the rule that caps it.
+
+    Returns (None, reason) when no amount from 0.1 to 10 is approved.
+    Reason.APPROVED means only the upper limit of 10 caps the amount.
+    """
+    policy = policy or current_policy()
+    reason = _rejection_before_loan_amount(policy, age, loan_rating, credit_term, sex, income_source)
+
+    if reason:
+        return None, reason
+
+    index = rate_index(purpose, loan_rating, income_source)
+    fixed_rate = policy.fixed_rate[index]
+
+    upper, reason = min(
+        (income_amount * credit_term / 3, Reason.THIRD_OF_INCOME),
+        (policy.available_loan_amount[index], Reason.AVAILABLE_LOAN_AMOUNT),
+        (MAX_LOAN_AMOUNT, Reason.APPROVED),
+        key=lambda candidate: candidate[0]
+    )
+
+    if upper < MIN_LOAN_AMOUNT:
+        return None, reason
+
+    if _payment(upper, credit_term, fixed_rate) > income_amount / 2:
+        reason = Reason.HALF_OF_INCOME
+
+        if _payment(MIN_LOAN_AMOUNT, credit_term, fixed_rate) > income_amount / 2:
+            return None, reason
+
+        upper = _half_income_loan_amount(income_amount, credit_term, fixed_rate, upper)
+
+    def approved(loan_amount):
+        return _scorer.score(BorrowerRecord(
+            age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+        ), policy) is not None
+
+    loan_amount = float(min(upper, MAX_LOAN_AMOUNT))
+
+    for _ in range(_ULP_STEPS):
+        if loan_amount < MIN_LOAN_AMOUNT:
+            return None, reason
+
+        if approved(loan_amount):
+            break
+
+        loan_amount = float(np.nextafter(loan_amount, 0))
+    else:
+        return None, reason
+
+    for _ in range(_ULP_STEPS):
+        candidate = float(np.nextafter(loan_amount, math.inf))
+
+        if candidate > MAX_LOAN_AMOUNT or not approved(candidate):
+            break
+
+        loan_amount = candidate
+
+    return loan_amount, reason
+
+
+def min_income_amount(age, loan_rating, loan_amount, credit_term, sex, income_source, purpose, policy=None):
+    """Smallest income_amount score() approves and the rule that requires it.
+
+    Returns (None, reason) when no income gets the loan approved.
+    Reason.APPROVED means the minimal valid income of 1 is enough.
+    """
+    policy = policy or current_policy()
+    reason = _rejection_before_loan_amount(policy, age, loan_rating, credit_term, sex, income_source)
+
+    if reason:
+        return None, reason
+
+    index = rate_index(purpose, loan_rating, income_source)
+
+    if policy.available_loan_amount[index] < loan_amount:
+        return None, Reason.AVAILABLE_LOAN_AMOUNT
+
+    payment = _payment(loan_amount, credit_term, policy.fixed_rate[index])
+
+    income_amount, reason = max(
+        (MIN_INCOME_AMOUNT, Reason.APPROVED),
+        (math.ceil(3 * loan_amount / credit_term), Reason.THIRD_OF_INCOME),
+        (math.ceil(2 * payment), Reason.HALF_OF_INCOME),
+        key=lambda candidate: candidate[0]
+    )
+
+    def approved(income_amount):
+        return _scorer.score(BorrowerRecord(
+            age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+        ), policy) is not None
+
+    while not approved(income_amount):
+        income_amount += 1
+
+    while income_amount > MIN_INCOME_AMOUNT and approved(income_amount - 1):
+        income_amount -= 1
+
+    return income_amount, reason
+
+
+def max_loan_amount_batch(age, income_amount, loan_rating, credit_term, sex, income_source, purpose, policy=None):
+    """Vectorized max_loan_amount over integer-coded columns.
+
+    Returns loan amounts (NaN where none is approved) and int8 Reason codes.
+    """
+    policy = policy or current_policy()
+    fixed_rates, available_loan_amounts, retirement_ages = policy_tables(policy)
+    columns = _columns(age, income_amount, loan_rating, credit_term, sex, income_source, purpose)
+    age, income_amount, loan_rating, credit_term, sex, income_source, purpose = columns
+
+    reason = _rejections_before_loan_amount_batch(retirement_ages, age, loan_rating, credit_term, sex, income_source)
+    index = _rate_index_batch(purpose, loan_rating, income_source)
+    fixed_rate = fixed_rates.take(index)
+
+    eligible = reason == Reason.APPROVED
+    upper = np.full(len(age), float(MAX_LOAN_AMOUNT))
+    caps = (
+        (available_loan_amounts.take(index), Reason.AVAILABLE_LOAN_AMOUNT),
+        (income_amount * credit_term / 3, Reason.THIRD_OF_INCOME)
+    )
+
+    for cap, cap_reason in caps:
+        binding = eligible & (cap <= upper)
+        upper[binding] = cap[binding]
+        reason[binding] = cap_reason
+
+    feasible = eligible & (upper >= MIN_LOAN_AMOUNT)
+
+    half_income = income_amount / 2
+    capped = feasible & (_payment(upper, credit_term, fixed_rate) > half_income)
+    reason[capped] = Reason.HALF_OF_INCOME
+    feasible &= ~(capped & (_payment(MIN_LOAN_AMOUNT, credit_term, fixed_rate) > half_income))
+
+    solved = np.flatnonzero(capped & feasible)
+    upper[solved] = _half_income_loan_amount(
+        income_amount[solved], credit_term[solved], fixed_rate[solved], upper[solved]
+    )
+
+    loan_amount = np.full(len(age), np.nan)
+    rows = np.flatnonzero(feasible)
+    loan_amount[rows] = _last_approved_batch(policy, columns, rows, np.minimum(upper[rows], MAX_LOAN_AMOUNT))
+
+    return loan_amount, reason
+
+
+def min_income_amount_batch(age, loan_rating, loan_amount, credit_term, sex, income_source, purpose, policy=None):
+    """Vectorized min_income_amount over integer-coded columns.
+
+    Returns incomes as floats (NaN where no income helps) and int8 Reason codes.
+    """
+    policy = policy or current_policy()
+    fixed_rates, available_loan_amounts, retirement_ages = policy_tables(policy)
+    age, loan_rating, loan_amount, credit_term, sex, income_source, purpose = _columns(
+        age, loan_rating, loan_amount, credit_term, sex, income_source, purpose
+    )
+
+    reason = _rejections_before_loan_amount_batch(retirement_ages, age, loan_rating, credit_term, sex, income_source)
+    index = _rate_index_batch(purpose, loan_rating, income_source)
+    reason[(reason == Reason.APPROVED) & (available_loan_amounts.take(index) < loan_amount)] = Reason.AVAILABLE_LOAN_AMOUNT
+
+    payment = _payment(loan_amount, credit_term, fixed_rates.take(index))
+    income_amount = np.full(len(age), float(MIN_INCOME_AMOUNT))
+    requirements = (
+        (np.ceil(3 * loan_amount / credit_term), Reason.THIRD_OF_INCOME),
+        (np.ceil(2 * payment), Reason.HALF_OF_INCOME)
+    )
+
+    feasible = reason == Reason.APPROVED
+
+    for requirement, requirement_reason in requirements:
+        binding = feasible & (requirement > income_amount)
+        income_amount[binding] = requirement[binding]
+        reason[binding] = requirement_reason
+
+    def approved(rows, income):
+        return ~np.isnan(score_batch(
+            age[rows], income, loan_rating[rows], loan_amount[rows],
+            credit_term[rows], sex[rows], income_source[rows], purpose[rows], policy=policy
+        ))
+
+    rows = np.flatnonzero(feasible)
+
+    while len(rows):
+        rejected = ~approved(rows, income_amount[rows])
+        rows = rows[rejected]
+        income_amount[rows] += 1
+
+    rows = np.flatnonzero(feasible & (income_amount > MIN_INCOME_AMOUNT))
+
+    while len(rows):
+        lower = approved(rows, income_amount[rows] - 1)
+        rows = rows[lower]
+        income_amount[rows] -= 1
+        rows = rows[income_amount[rows] > MIN_INCOME_AMOUNT]
+
+    income_amount[~feasible] = np.nan
+
+    return income_amount, reason
+
+
+def _rejection_before_loan_amount(policy, age, loan_rating, credit_term, sex, income_source):
+    if income_source == IncomeSource.UNEMPLOYED:
+        return Reason.UNRELIABLE_BORROWER
+
+    if loan_rating == LoanRating.PROHIBITED:
+        return Reason.LOAN_RATING_PROHIBITED
+
+    if (age + credit_term) > policy.retirement_age[sex.code]:
+        return Reason.RETIREMENT_AGE
+
+    return Reason.APPROVED
+
+
+def _rejections_before_loan_amount_batch(retirement_ages, age, loan_rating, credit_term, sex, income_source):
+    reason = np.zeros(len(age), dtype=np.int8)
+    reason[(age + credit_term) > retirement_ages.take(sex)] = Reason.RETIREMENT_AGE
+    reason[loan_rating == LoanRating.PROHIBITED.code] = Reason.LOAN_RATING_PROHIBITED
+    reason[income_source == IncomeSource.UNEMPLOYED.code] = Reason.UNRELIABLE_BORROWER
+
+    return reason
+
+
+def _rate_index_batch(purpose, loan_rating, income_source):
+    return (purpose.astype(np.intp) * len(LoanRating) + loan_rating) * len(IncomeSource) + income_source
+
+
+def _payment(loan_amount, credit_term, fixed_rate):
+    rate = fixed_rate - np.log10(loan_amount)
+
+    return (loan_amount * (1 + credit_term * (rate / 100))) / credit_term
+
+
+def _half_income_loan_amount(income_amount, credit_term, fixed_rate, loan_amount):
+    """Newton's method for payment(loan_amount) == income_amount / 2.
+
+    The payment is increasing and concave in loan_amount, so starting above
+    the root every step after the first approaches it from below.
+    """
+    for _ in range(_NEWTON_STEPS):
+        rate = fixed_rate - np.log10(loan_amount)
+        excess = loan_amount / credit_term + loan_amount * rate / 100 - income_amount / 2
+        slope = 1 / credit_term + (rate - math.log10(math.e)) / 100
+        loan_amount = np.maximum(loan_amount - excess / slope, MIN_LOAN_AMOUNT)
+
+    return loan_amount
+
+
+def _last_approved_batch(policy, columns, rows, loan_amount):
+    age, income_amount, loan_rating, credit_term, sex, income_source, purpose = (column[rows] for column in columns)
+
+    def approved(selected, amount):
+        return ~np.isnan(score_batch(
+            age[selected], income_amount[selected], loan_rating[selected], amount,
+            credit_term[selected], sex[selected], income_source[selected], purpose[selected], policy=policy
+        ))
+
+    pending = np.arange(len(rows))
+
+    for _ in range(_ULP_STEPS):
+        pending = pending[loan_amount[pending] >= MIN_LOAN_AMOUNT]
+        pending = pending[~approved(pending, loan_amount[pending])]
+
+        if not len(pending):
+            break
+
+        loan_amount[pending] = np.nextafter(loan_amount[pending], 0)
+
+    loan_amount[pending] = np.nan
+    loan_amount[loan_amount < MIN_LOAN_AMOUNT] = np.nan
+    pending = np.flatnonzero(~np.isnan(loan_amount))
+
+    for _ in range(_ULP_STEPS):
+        candidate = np.nextafter(loan_amount[pending], math.inf)
+        raised = (candidate <= MAX_LOAN_AMOUNT) & approved(pending, candidate)
+        pending = pending[raised]
+
+        if not len(pending):
+            break
+
+        loan_amount[pending] = candidate[raised]
+
+    return loan_amount
+
+
+def _columns(*columns):
+    return tuple(np.asarray(column) for column in columns)
@@ -0,0 +1,112 @@
+import numpy as np
+from enums import *
+from batch_scoring import FIELDS
+
+
+DEFAULT_CHUNK_SIZE = 1048576
+
+_ENUMS = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+_NUMBERS = {'age': (18, 70), 'income_amount': (1, 21), 'loan_amount': (0.1, 10), 'credit_term': (1, 21)}
+_INTEGERS = ('age', 'income_amount', 'credit_term')
+
+
+class PortfolioGenerator:
+    """Seeded synthetic score_batch columns, valid for BorrowerScoring unless told otherwise.
+
+    Numbers are drawn uniformly from a (low, high) range, high excluded, or
+    by a callable(random, size) returning an array. Enums take {member: weight}
+    mappings and are uniform by default. invalid maps field names to the
+    fraction of rows that fail that field's validation.
+
+    Chunk i only depends on the seed and i, so the same seed and chunk size
+    always give the same rows.
+    """
+
+    __seed = None
+    __distributions = None
+    __invalid = None
+
+    def __init__(self, seed=0, invalid=None, **distributions):
+        unknown = set(distributions).union(invalid or ()).difference(FIELDS)
+
+        if unknown:
+            raise ValueError('unknown fields %s' % ', '.join(sorted(unknown)))
+
+        self.__seed = seed
+        self.__distributions = {}
+        self.__invalid = {}
+
+        for field in FIELDS:
+            distribution = distributions.get(field)
+
+            if field in _ENUMS:
+                self.__distributions[field] = _enum_distribution(_ENUMS[field], distribution)
+            elif callable(distribution):
+                self.__distributions[field] = distribution
+            else:
+                self.__distributions[field] = _number_distribution(field, *(distribution or _NUMBERS[field]))
+
+        for field, fraction in (invalid or {}).items():
+            if not 0 <= fraction <= 1:
+                raise ValueError('invalid fraction of %s must be from 0 to 1' % field)
+
+            self.__invalid[field] = fraction
+
+    def columns(self, rows, chunk_index=0):
+        """Keyword columns for score_batch with the given number of rows."""
+        random = np.random.default_rng([self.__seed, chunk_index])
+        columns = {field: self.__distributions[field](random, rows) for field in FIELDS}
+
+        for field, fraction in self.__invalid.items():
+            invalid = random.choice(rows, round(rows * fraction), replace=False)
+            columns[field][invalid] = _invalid_values(field, random, len(invalid))
+
+        return columns
+
+    def chunks(self, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yields columns of chunk_size rows, the last chunk may be shorter."""
+        for chunk_index, start in enumerate(range(0, rows, chunk_size)):
+            yield self.columns(min(chunk_size, rows - start), chunk_index)
+
+
+def _number_distribution(field, low, high):
+    if field in _INTEGERS:
+        return lambda random, size: random.integers(low, high, size)
+
+    return lambda random, size: random.uniform(low, high, size)
+
+
+def _enum_distribution(enum, weights):
+    if weights is None:
+        return lambda random, size: random.integers(0, len(enum), size, dtype=np.int8)
+
+    unknown = set(weights).difference(enum)
+
+    if unknown:
+        raise ValueError('%s weights have unknown members %s' % (enum.__name__, unknown))
+
+    cumulative = np.cumsum([weights.get(member, 0) for member in enum], dtype=np.float64)
+
+    if cumulative[-1] <= 0:
+        raise ValueError('%s weights must have a positive sum' % enum.__name__)
+
+    cumulative /= cumulative[-1]
+
+    # The last bound is 1 exactly, so every draw from [0, 1) finds a member.
+    return lambda random, size: cumulative.searchsorted(random.random(size), side='right').astype(np.int8)
+
+
+def _invalid_values(field, random, size):
+    if field in _ENUMS:
+        return random.integers(len(_ENUMS[field]), len(_ENUMS[field]) + 4, size)
+
+    if field == 'age':
+        return random.integers(-10, 0, size)
+
+    if field == 'income_amount':
+        return random.integers(-10, 1, size)
+
+    if field == 'loan_amount':
+        return 20 - random.uniform(0, 10, size)
+
+    return random.integers(21, 31, size)
@@ -0,0 +1,153 @@
+import json
+from collections import namedtuple
+import numpy as np
+from enums import *
+from rate_table import Policy, current_policy
+from batch_scoring import FIELDS, decide_rules, payment_batch, policy_tables, reason_of_rules, validate_batch
+
+
+RescoreReport = namedtuple('RescoreReport', ('rows', 'rescored', 'decisions_changed', 'payments_changed'))
+
+# decide_rules bits of the rules a policy can change and of all rules before
+# the half-income cap, the only one that reads the rate.
+_RETIREMENT_AGE_BIT = np.uint8(1 << (Reason.RETIREMENT_AGE - 1))
+_AVAILABLE_LOAN_AMOUNT_BIT = np.uint8(1 << (Reason.AVAILABLE_LOAN_AMOUNT - 1))
+_HALF_OF_INCOME_BIT = np.uint8(1 << (Reason.HALF_OF_INCOME - 1))
+_ELIGIBILITY_BITS = np.uint8(_HALF_OF_INCOME_BIT - 1)
+
+_ARRAYS = (
+    'age', 'income_amount', 'loan_amount', 'credit_term', 'sex', 'rate_index', 'log_loan_amount', 'errors', 'rules',
+    'payment'
+)
+
+
+class ScoringState:
+    """Decisions on a portfolio kept with the rule outcomes and rate inputs of every row.
+
+    rescore() moves the state to another policy recomputing only what the
+    policy difference touches: retirement ages only for rows of the sexes
+    whose age changed, loan limits only for rows of the rate_table.rate_index
+    combinations whose limit changed, and payments only for rows passing the
+    other rules whose fixed rate changed. A row's payment is NaN while it is
+    rejected before the half-income cap and was not rescored.
+    """
+
+    __policy = None
+
+    def __init__(self, policy, arrays):
+        self.__policy = policy
+        self.__arrays = arrays
+
+    @classmethod
+    def from_columns(cls, columns, policy=None):
+        """State of score_batch keyword columns scored with policy, the current one by default."""
+        policy = policy or current_policy()
+        columns = {field: np.asarray(columns[field]) for field in FIELDS}
+        errors = validate_batch(**columns)
+        payment, rules = decide_rules(**columns, errors=errors, policy=policy)
+        valid = errors == 0
+
+        rate_index = (
+            (columns['purpose'].astype(np.intp) * len(LoanRating) + columns['loan_rating']) * len(IncomeSource)
+            + columns['income_source']
+        )
+        loan_amount = np.where(valid, columns['loan_amount'], 1).astype(np.float64)
+
+        return cls(policy, {
+            'age': np.where(valid, columns['age'], 0).astype(np.float64),
+            'income_amount': np.where(valid, columns['income_amount'], 1).astype(np.float64),
+            'loan_amount': loan_amount,
+            'credit_term': np.where(valid, columns['credit_term'], 1).astype(np.float64),
+            'sex': np.where(valid, columns['sex'], 0).astype(np.int8),
+            'rate_index': np.where(valid, rate_index, 0).astype(np.int16),
+            'log_loan_amount': np.log10(loan_amount),
+            'errors': errors,
+            'rules': rules,
+            'payment': payment
+        })
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in _ARRAYS}
+            policy = Policy.from_dict(json.loads(str(data['policy'])))
+
+        return cls(policy, arrays)
+
+    def save(self, path):
+        """Writes the state to an .npz file, load() reads it back."""
+        with open(path, 'wb') as stream:
+            np.savez(stream, policy=np.array(json.dumps(self.__policy.as_dict())), **self.__arrays)
+
+    @property
+    def policy(self):
+        return self.__policy
+
+    def decisions(self):
+        """Year payment (NaN when rejected) and int8 Reason code per row, as decide_batch returns them."""
+        reason = self.__reason()
+        payment = np.where(reason == Reason.APPROVED, self.__arrays['payment'], np.nan)
+
+        return payment, reason
+
+    def rescore(self, policy):
+        """Moves the state to policy and returns a RescoreReport of what changed."""
+        arrays = self.__arrays
+        old_rules = arrays['rules'].copy()
+        old_payment = arrays['payment'].copy()
+        old_fixed_rate, old_available_loan_amount, old_retirement_age = policy_tables(self.__policy)
+        fixed_rate, available_loan_amount, retirement_age = policy_tables(policy)
+        valid = arrays['errors'] == 0
+        rules = arrays['rules']
+        rescored = np.zeros(len(rules), dtype=bool)
+
+        sexes = old_retirement_age != retirement_age
+
+        if sexes.any():
+            rows = np.flatnonzero(valid & sexes.take(arrays['sex']))
+            rejected = arrays['age'][rows] + arrays['credit_term'][rows] > retirement_age.take(arrays['sex'][rows])
+            rules[rows] = rules[rows] & ~_RETIREMENT_AGE_BIT | rejected.view(np.uint8) * _RETIREMENT_AGE_BIT
+            rescored[rows] = True
+
+        indices = old_available_loan_amount != available_loan_amount
+
+        if indices.any():
+            rows = np.flatnonzero(valid & indices.take(arrays['rate_index']))
+            rejected = available_loan_amount.take(arrays['rate_index'][rows]) < arrays['loan_amount'][rows]
+            rules[rows] = rules[rows] & ~_AVAILABLE_LOAN_AMOUNT_BIT | rejected.view(np.uint8) * _AVAILABLE_LOAN_AMOUNT_BIT
+            rescored[rows] = True
+
+        rate_changed = (old_fixed_rate != fixed_rate).take(arrays['rate_index'])
+        eligible = valid & (rules & _ELIGIBILITY_BITS == 0)
+
+        # Payments of rows rejected earlier anyway are only marked stale.
+        arrays['payment'][rate_changed & ~eligible] = np.nan
+
+        rows = np.flatnonzero(eligible & (rate_changed | np.isnan(arrays['payment'])))
+        payment = payment_batch(
+            arrays['rate_index'][rows], arrays['loan_amount'][rows], arrays['credit_term'][rows],
+            arrays['income_amount'][rows], arrays['log_loan_amount'][rows], policy
+        )
+        rejected = payment > arrays['income_amount'][rows] / 2
+        arrays['payment'][rows] = payment
+        rules[rows] = rules[rows] & ~_HALF_OF_INCOME_BIT | rejected.view(np.uint8) * _HALF_OF_INCOME_BIT
+        rescored[rows] = True
+
+        self.__policy = policy
+
+        # Only rows rescored can have changed, the others keep their decision.
+        rows = np.flatnonzero(rescored)
+        reason = reason_of_rules(rules[rows])
+        changed = reason != reason_of_rules(old_rules[rows])
+        repriced = ~changed & (reason == Reason.APPROVED) & (arrays['payment'][rows] != old_payment[rows])
+
+        return RescoreReport(len(rules), len(rows), int(changed.sum()), int(repriced.sum()))
+
+    def __len__(self):
+        return len(self.__arrays['rules'])
+
+    def __reason(self):
+        reason = reason_of_rules(self.__arrays['rules'])
+        np.copyto(reason, Reason.INVALID, where=self.__arrays['errors'] != 0)
+
+        return reason
@@ -0,0 +1,146 @@
+import bisect
+import os
+import threading
+import time
+from enums import *
+
+
+PATHS = ('scalar', 'batch')
+
+# Seconds; a scalar call takes microseconds, a batch up to seconds.
+LATENCY_BUCKETS = (1e-06, 2.5e-06, 5e-06, 1e-05, 2.5e-05, 0.0001, 0.001, 0.01, 0.1, 1, 10)
+
+# ScoringMetrics installed by enable(). Instrumented code only compares it
+# with None while disabled.
+active = None
+
+
+class Histogram:
+    """Cumulative bucket counts with inclusive upper bounds, like Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = {}
+
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+    def prometheus(self, name, labels):
+        """Sample lines of the histogram, labels being the inner part of {...}."""
+        data = self.as_dict()
+        lines = [
+            '%s_bucket{%s,le="%s"} %d' % (name, labels, bound, count) for bound, count in data['buckets'].items()
+        ]
+        lines.append('%s_sum{%s} %r' % (name, labels, data['sum']))
+        lines.append('%s_count{%s} %d' % (name, labels, data['count']))
+
+        return lines
+
+
+class ScoringMetrics:
+    """Decisions by Reason and validation and scoring latencies, per scalar or batch path.
+
+    Scalar validation is timed for records passing it, invalid arguments
+    raise before there is a decision to count. ParallelScorer.score() is
+    counted by the parent process as one batch call.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.__lock = threading.Lock()
+        self.decisions = {path: [0] * len(Reason) for path in PATHS}
+        self.validation_seconds = {path: Histogram(buckets) for path in PATHS}
+        self.scoring_seconds = {path: Histogram(buckets) for path in PATHS}
+
+    def score(self, scorer, record, policy=None):
+        """scorer.score(record, policy), worked out by scorer.decide() to count it under its reason."""
+        return self.decide(scorer, record, policy).payment
+
+    def decide(self, scorer, record, policy=None):
+        started = time.perf_counter()
+        decision = scorer.decide(record, policy)
+        elapsed = time.perf_counter() - started
+
+        with self.__lock:
+            self.decisions['scalar'][decision.reason] += 1
+            self.scoring_seconds['scalar'].observe(elapsed)
+
+        return decision
+
+    def observe_validation(self, path, seconds):
+        with self.__lock:
+            self.validation_seconds[path].observe(seconds)
+
+    def observe_batch(self, seconds, counts):
+        """Adds a decide_batch call, counts being the number of rows per Reason code."""
+        with self.__lock:
+            decisions = self.decisions['batch']
+
+            for reason, count in enumerate(counts):
+                decisions[reason] += int(count)
+
+            self.scoring_seconds['batch'].observe(seconds)
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP borrower_scoring_decisions_total Scoring decisions by the rule deciding them.',
+            '# TYPE borrower_scoring_decisions_total counter'
+        ]
+
+        with self.__lock:
+            for path in PATHS:
+                for reason in Reason:
+                    lines.append('borrower_scoring_decisions_total{path="%s",reason="%s"} %d' % (
+                        path, reason.name, self.decisions[path][reason]
+                    ))
+
+            for name, help_text, histograms in (
+                ('borrower_scoring_validation_seconds', 'Validation latency per call.', self.validation_seconds),
+                ('borrower_scoring_scoring_seconds', 'Scoring latency per call.', self.scoring_seconds)
+            ):
+                lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s histogram' % name)
+
+                for path in PATHS:
+                    lines.extend(histograms[path].prometheus(name, 'path="%s"' % path))
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Replaces path with prometheus() at once, e.g. for the node_exporter textfile collector."""
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+
+        with open(temporary, 'w') as stream:
+            stream.write(self.prometheus())
+
+        os.replace(temporary, path)
+
+
+def enable(buckets=LATENCY_BUCKETS):
+    """Starts recording into a new ScoringMetrics and returns it."""
+    global active
+
+    active = ScoringMetrics(buckets)
+
+    return active
+
+
+def disable():
+    global active
+
+    active = None
+
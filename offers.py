@@ -0,0 +1,131 @@
+import math
+import time
+from collections import namedtuple
+import numpy as np
+from exceptions import *
+from enums import *
+from rate_table import current_policy
+from borrower_scoring import BorrowerRecord, Scorer
+from frontier import max_loan_amount
+
+
+TERMS = range(1, 21)
+ORDERS = ('closest', 'payment')
+DEFAULT_BUDGET = 0.005
+
+Offer = namedtuple('Offer', ('loan_amount', 'credit_term', 'payment'))
+
+_scorer = Scorer()
+
+
+def offer_matrix(borrower, amounts, terms=TERMS, policy=None):
+    """Payments and Reason codes of a borrower over a terms x amounts grid.
+
+    borrower is a BorrowerRecord, its own loan_amount and credit_term are
+    ignored. Row i, column j is what score() gives for terms[i] and
+    amounts[j]: payment[i, j] is NaN unless reason[i, j] is Reason.APPROVED.
+    """
+    policy = policy or current_policy()
+    amounts = np.asarray(amounts, dtype=np.float64)
+    terms = np.asarray(terms)
+
+    if not ((amounts >= 0.1) & (amounts <= 10)).all():
+        raise InvalidLoanAmountException
+
+    if not (np.isin(terms, TERMS)).all():
+        raise InvalidCreditTermException
+
+    # Same float operations in the same order as Scorer.score(), just
+    # broadcast, so every cell matches the scalar path to the last bit.
+    rate = policy.fixed_rate[borrower.rate_index] - np.array([math.log10(amount) for amount in amounts.tolist()])
+    column_terms = terms.astype(np.float64)[:, np.newaxis]
+    payment = (amounts * (1 + column_terms * (rate / 100))) / column_terms
+
+    reason = np.full(payment.shape, Reason.APPROVED, dtype=np.int8)
+    reason[payment > borrower.income_amount / 2] = Reason.HALF_OF_INCOME
+    reason[:, policy.available_loan_amount[borrower.rate_index] < amounts] = Reason.AVAILABLE_LOAN_AMOUNT
+    reason[amounts / column_terms > borrower.income_amount / 3] = Reason.THIRD_OF_INCOME
+    reason[borrower.age + terms > policy.retirement_age[borrower.sex.code]] = Reason.RETIREMENT_AGE
+
+    if borrower.loan_rating is LoanRating.PROHIBITED:
+        reason[:] = Reason.LOAN_RATING_PROHIBITED
+
+    if borrower.income_source is IncomeSource.UNEMPLOYED:
+        reason[:] = Reason.UNRELIABLE_BORROWER
+
+    payment[reason != Reason.APPROVED] = np.nan
+
+    return payment, reason
+
+
+def counter_offers(borrower, k=3, order='closest', budget=DEFAULT_BUDGET, policy=None):
+    """Up to k approvable (loan_amount, credit_term) alternatives to a request.
+
+    For each term the offer is the requested amount or, if that is rejected,
+    the largest approved amount below it. Approved amounts of a term form an
+    interval from 0.1 up, since every rule after the retirement age only
+    tightens with the amount, so frontier.max_loan_amount gives its end.
+    order='closest' ranks by the relative change of amount plus the relative
+    change of term, 'payment' by the lowest year payment.
+
+    Terms are tried nearest to the requested one first and the search stops
+    after budget seconds, returning the offers found so far.
+    """
+    if order not in ORDERS:
+        raise ValueError('order must be one of %s' % ', '.join(ORDERS))
+
+    deadline = time.perf_counter() + budget
+    policy = policy or current_policy()
+
+    if order == 'closest':
+        rank = lambda offer: _distance(borrower, offer)
+    else:
+        rank = lambda offer: offer.payment
+
+    if borrower.income_source is IncomeSource.UNEMPLOYED or borrower.loan_rating is LoanRating.PROHIBITED:
+        return []
+
+    # Terms past retirement age are rejected whatever the amount. A policy
+    # file may give a float age, the integer terms within it stop at its floor.
+    terms = sorted(
+        range(1, min(TERMS[-1], math.floor(policy.retirement_age[borrower.sex.code] - borrower.age)) + 1),
+        key=lambda term: (abs(term - borrower.credit_term), term)
+    )
+
+    offers = []
+
+    for term in terms:
+        if order == 'closest' and len(offers) >= k:
+            # The remaining terms are further away, even at the full amount.
+            if abs(term - borrower.credit_term) / borrower.credit_term >= _distance(borrower, offers[k - 1]):
+                break
+
+        if time.perf_counter() > deadline:
+            break
+
+        loan_amount, _ = max_loan_amount(
+            borrower.age, borrower.income_amount, borrower.loan_rating, term,
+            borrower.sex, borrower.income_source, borrower.purpose, policy
+        )
+
+        if loan_amount is None:
+            continue
+
+        loan_amount = min(loan_amount, borrower.loan_amount)
+        payment = _scorer.score(BorrowerRecord(
+            borrower.age, borrower.income_amount, borrower.loan_rating, loan_amount, term,
+            borrower.sex, borrower.income_source, borrower.purpose
+        ), policy)
+
+        if payment is not None:
+            offers.append(Offer(loan_amount, term, payment))
+            offers.sort(key=rank)
+
+    return offers[:k]
+
+
+def _distance(borrower, offer):
+    return (
+        (borrower.loan_amount - offer.loan_amount) / borrower.loan_amount
+        + abs(offer.credit_term - borrower.credit_term) / borrower.credit_term
+    )
@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import audit
+import metrics
+from enums import *
+from rate_table import current_policy
+from batch_scoring import FIELDS, decide_batch, score_batch
+
+
+DEFAULT_CHUNK_SIZE = 262144
+
+# Column layout of the shared block, the output column comes last. Numbers
+# are kept as floats and codes as intp, the way score_batch reads them, so
+# no input is truncated or wrapped on the way.
+COLUMNS = (
+    ('age', np.float64),
+    ('income_amount', np.float64),
+    ('loan_rating', np.intp),
+    ('loan_amount', np.float64),
+    ('credit_term', np.float64),
+    ('sex', np.intp),
+    ('income_source', np.intp),
+    ('purpose', np.intp),
+    ('errors', np.uint8),
+    ('reason', np.int8),
+    ('payment', np.float64)
+)
+
+
+class ParallelScorer:
+    """score_batch over a persistent process pool.
+
+    Columns are copied once into a shared memory block, workers score shards
+    of it in place, so no rows are pickled and the output keeps input order.
+    Metrics and the audit log of the parent count and record each call
+    once, workers only send back the reasons.
+    """
+
+    __pool = None
+    __workers = None
+    __chunk_size = None
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be positive')
+
+        self.__chunk_size = chunk_size
+        self.__workers = workers or os.cpu_count()
+
+        # Workers must share the parent's tracker, otherwise each of them
+        # reports the blocks it attached to as leaked when it exits.
+        resource_tracker.ensure_running()
+        self.__pool = multiprocessing.Pool(self.__workers, _without_hooks)
+
+    @property
+    def workers(self):
+        return self.__workers
+
+    def score(self, age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose,
+              errors=None, policy=None):
+        """Same result as score_batch on the whole columns."""
+        # Workers are forked once, so the policy is sent with every shard.
+        policy = policy or current_policy()
+        instruments = metrics.active
+        log = audit.active
+        decided = instruments is not None or log is not None
+        columns = (age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source, purpose, errors)
+        rows = len(age)
+        offsets, size = _layout(rows)
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        if instruments is not None:
+            started = time.perf_counter()
+
+        try:
+            views = _views(block, offsets, rows)
+
+            for view, column in zip(views, columns):
+                if column is not None:
+                    view[:] = column
+
+            shards = [
+                (block.name, rows, start, min(start + self.__chunk_size, rows), errors is not None, decided, policy)
+                for start in range(0, rows, self.__chunk_size)
+            ]
+            self.__pool.map(_score_shard, shards, chunksize=1)
+
+            payment = views[-1].copy()
+
+            if instruments is not None:
+                instruments.observe_batch(
+                    time.perf_counter() - started, np.bincount(views[-2], minlength=len(Reason)).tolist()
+                )
+
+            if log is not None:
+                log.append_batch(views[:len(FIELDS)], views[-2], payment, None, policy)
+
+            del views
+        finally:
+            block.close()
+            block.unlink()
+
+        return payment
+
+    def close(self):
+        self.__pool.close()
+        self.__pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _layout(rows):
+    offsets = []
+    size = 0
+
+    for _, dtype in COLUMNS:
+        offsets.append(size)
+        size += -(-rows * np.dtype(dtype).itemsize // 8) * 8
+
+    return offsets, size
+
+
+def _views(block, offsets, rows):
+    return [
+        np.ndarray(rows, dtype=dtype, buffer=block.buf, offset=offset)
+        for (_, dtype), offset in zip(COLUMNS, offsets)
+    ]
+
+
+def _without_hooks():
+    # A forked worker inherits the parent's log without its writer thread,
+    # what it appended would never be written.
+    audit.active = None
+    metrics.active = None
+
+
+def _score_shard(shard):
+    name, rows, start, stop, has_errors, decided, policy = shard
+    block = shared_memory.SharedMemory(name=name)
+
+    try:
+        views = _views(block, _layout(rows)[0], rows)
+        *columns, errors, reason, payment = (view[start:stop] for view in views)
+        errors = errors if has_errors else None
+
+        if decided:
+            payment[:], reason[:] = decide_batch(*columns, errors=errors, policy=policy)
+        else:
+            payment[:] = score_batch(*columns, errors=errors, policy=policy)
+
+        del views, columns, errors, reason, payment
+    finally:
+        block.close()
@@ -0,0 +1,212 @@
+import itertools
+import json
+import numpy as np
+from enums import *
+from rate_table import current_policy
+from batch_scoring import FIELDS, decide_batch, validate_batch, columns_from_rows
+
+
+DEFAULT_CHUNK_SIZE = 65536
+DEFAULT_WINDOW = 1048576
+
+# Fixed-width little-endian records. Rows failing validation on conversion
+# keep their bit set in errors, their fields are zeroed, since values such
+# as age 30.5 or 70000 do not fit the narrow types.
+RECORD_DTYPE = np.dtype([
+    ('age', '<i2'),
+    ('income_amount', '<f8'),
+    ('loan_rating', 'i1'),
+    ('loan_amount', '<f8'),
+    ('credit_term', '<i2'),
+    ('sex', 'i1'),
+    ('income_source', 'i1'),
+    ('purpose', 'i1'),
+    ('errors', 'u1')
+])
+
+SCORE_DTYPE = np.dtype([('payment', '<f8'), ('reason', 'i1')])
+
+PORTFOLIO_MAGIC = b'BSPORTF1'
+SCORES_MAGIC = b'BSSCORE1'
+
+# Magic, then a JSON header padded with spaces; records start page aligned.
+HEADER_SIZE = 4096
+
+_ENUMS = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+
+
+def write_portfolio(rows, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Converts mappings with enum names, e.g. parsed CSV or JSON Lines, to a portfolio file.
+
+    Returns the number of rows written.
+    """
+    return write_portfolio_columns(_column_chunks(iter(rows), chunk_size), path)
+
+
+def write_portfolio_columns(chunks, path):
+    """Writes chunks of score_batch keyword columns, e.g. PortfolioGenerator.chunks(), to a portfolio file.
+
+    Returns the number of rows written.
+    """
+    count = 0
+
+    with open(path, 'wb') as stream:
+        stream.write(bytes(HEADER_SIZE))
+
+        for columns in chunks:
+            records = records_from_columns(columns)
+            stream.write(records.tobytes())
+            count += len(records)
+
+        stream.seek(0)
+        stream.write(_header(PORTFOLIO_MAGIC, {
+            'rows': count,
+            'enums': {field: [member.name for member in enum] for field, enum in _ENUMS.items()},
+            'dtype': RECORD_DTYPE.descr
+        }))
+
+    return count
+
+
+def records_from_columns(columns):
+    """RECORD_DTYPE array of score_batch keyword columns, errors set by validate_batch."""
+    errors = validate_batch(**columns)
+    records = np.zeros(len(errors), dtype=RECORD_DTYPE)
+    valid = errors == 0
+
+    for field in FIELDS:
+        records[field][valid] = np.asarray(columns[field])[valid]
+
+    # A valid age above the int16 range is past retirement either way.
+    records['age'][valid] = np.minimum(np.asarray(columns['age'])[valid], np.iinfo(np.int16).max)
+
+    records['errors'] = errors
+
+    return records
+
+
+def decide_records(records, policy=None, remap=None):
+    """decide_batch (payment, reason) of RECORD_DTYPE records, remap being _code_remaps() of their enums."""
+    columns = {field: records[field] for field in FIELDS}
+
+    # age + credit_term must not wrap around in int16.
+    columns['age'] = columns['age'].astype(np.int64)
+    columns['credit_term'] = columns['credit_term'].astype(np.int64)
+
+    errors = records['errors']
+
+    for field, codes in (remap or {}).items():
+        columns[field] = codes.take(columns[field])
+        # Members gone from the enum map to -1, the row fails that field's validation.
+        errors = errors | ((columns[field] < 0).view(np.uint8) << FIELDS.index(field))
+
+    return decide_batch(**columns, errors=errors, policy=policy)
+
+
+def read_portfolio(path):
+    """(header, read-only memmap of the records) of a portfolio file."""
+    header = _read_header(path, PORTFOLIO_MAGIC, RECORD_DTYPE)
+
+    if not header['rows']:
+        return header, np.zeros(0, dtype=RECORD_DTYPE)
+
+    return header, np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(header['rows'],))
+
+
+def read_scores(path):
+    """(header, read-only memmap of payment and reason) of a score_portfolio result."""
+    header = _read_header(path, SCORES_MAGIC, SCORE_DTYPE)
+
+    if not header['rows']:
+        return header, np.zeros(0, dtype=SCORE_DTYPE)
+
+    return header, np.memmap(path, dtype=SCORE_DTYPE, mode='r', offset=HEADER_SIZE, shape=(header['rows'],))
+
+
+def score_portfolio(path, output_path=None, window=DEFAULT_WINDOW, policy=None):
+    """Scores a portfolio file window by window into a memory-mapped scores file.
+
+    The output defaults to path + '.scores'. Only one window of input and
+    output is touched at a time, so files larger than memory are read once,
+    sequentially. Returns the output path.
+    """
+    policy = policy or current_policy()
+    output_path = output_path or path + '.scores'
+    header, records = read_portfolio(path)
+    rows = header['rows']
+    remap = _code_remaps(header['enums'])
+
+    with open(output_path, 'wb') as stream:
+        stream.write(_header(SCORES_MAGIC, {'rows': rows, 'policy_version': policy.version, 'dtype': SCORE_DTYPE.descr}))
+        stream.truncate(HEADER_SIZE + rows * SCORE_DTYPE.itemsize)
+
+    if not rows:
+        return output_path
+
+    scores = np.memmap(output_path, dtype=SCORE_DTYPE, mode='r+', offset=HEADER_SIZE, shape=(rows,))
+
+    for start in range(0, rows, window):
+        payment, reason = decide_records(np.array(records[start:start + window]), policy, remap)
+        scores['payment'][start:start + window] = payment
+        scores['reason'][start:start + window] = reason
+
+    scores.flush()
+    del scores
+
+    return output_path
+
+
+def _column_chunks(rows, chunk_size):
+    count = 0
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+
+        if not chunk:
+            return
+
+        try:
+            columns = columns_from_rows(chunk)
+        except ValueError as error:
+            raise ValueError('rows %d-%d: %s' % (count + 1, count + len(chunk), error))
+
+        yield columns
+        count += len(chunk)
+
+
+def _header(magic, data):
+    encoded = magic + json.dumps(data).encode()
+
+    if len(encoded) > HEADER_SIZE:
+        raise ValueError('header does not fit in %d bytes' % HEADER_SIZE)
+
+    return encoded.ljust(HEADER_SIZE, b' ')
+
+
+def _read_header(path, magic, dtype):
+    with open(path, 'rb') as stream:
+        encoded = stream.read(HEADER_SIZE)
+
+    if len(encoded) < HEADER_SIZE or not encoded.startswith(magic):
+        raise ValueError('%s is not a %s file' % (path, magic.decode()))
+
+    header = json.loads(encoded[len(magic):].decode())
+
+    if np.dtype([tuple(field) for field in header['dtype']]) != dtype:
+        raise ValueError('%s has records of another layout' % path)
+
+    return header
+
+
+def _code_remaps(enums):
+    """Lookup arrays from file codes to current codes for the enums whose members changed."""
+    remap = {}
+
+    for field, names in enums.items():
+        members = _ENUMS[field].__members__
+
+        if names != list(members):
+            # Names that are gone get an invalid code and the row is INVALID.
+            remap[field] = np.array([members[name].code if name in members else -1 for name in names], dtype=np.int8)
+
+    return remap
@@ -0,0 +1,151 @@
+import json
+import math
+import weakref
+from enums import *
+
+
+BASE_RATE = 10
+
+POLICY_ENUMS = (LoanRating, Purpose, IncomeSource, Sex)
+
+_listeners = []
+
+
+def rate_index(purpose, loan_rating, income_source):
+    """Position of the enum combination in the flat tables below."""
+    return (purpose.code * len(LoanRating) + loan_rating.code) * len(IncomeSource) + income_source.code
+
+
+class Policy:
+    """Rates and limits of one policy version compiled into lookup tables.
+
+    values maps each of POLICY_ENUMS to {member: value}, the values having
+    the shape of the enum values in enums.py. A policy is never modified,
+    a new one is installed instead.
+    """
+
+    __slots__ = ('version', 'base_rate', 'values', 'fixed_rate', 'available_loan_amount', 'retirement_age')
+
+    def __init__(self, version, base_rate, values):
+        self.version = version
+        self.base_rate = base_rate
+        self.values = {enum: dict(values[enum]) for enum in POLICY_ENUMS}
+        self.fixed_rate, self.available_loan_amount = self.__build_tables()
+        self.retirement_age = tuple(self.values[Sex][sex] for sex in Sex)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Policy from a parsed policy file, see as_dict() for its layout."""
+        try:
+            version = str(data['version'])
+            base_rate = _number(data['base_rate'])
+            values = {}
+
+            for enum in POLICY_ENUMS:
+                names = data[enum.__name__]
+                unknown = set(names).difference(enum.__members__)
+
+                if unknown:
+                    raise ValueError('unknown %s %s' % (enum.__name__, ', '.join(sorted(unknown))))
+
+                values[enum] = {member: _policy_value(enum, names[member.name]) for member in enum}
+        except KeyError as error:
+            raise ValueError('policy has no %s' % error)
+        except TypeError:
+            raise ValueError('policy values have a wrong shape')
+
+        return cls(version, base_rate, values)
+
+    def as_dict(self):
+        data = {'version': self.version, 'base_rate': self.base_rate}
+
+        for enum in POLICY_ENUMS:
+            data[enum.__name__] = {
+                member.name: list(value) if isinstance(value, tuple) else value
+                for member, value in self.values[enum].items()
+            }
+
+        return data
+
+    def __build_tables(self):
+        fixed_rates = []
+        available_loan_amounts = []
+
+        for purpose in Purpose:
+            for loan_rating in LoanRating:
+                for income_source in IncomeSource:
+                    loan_rating_amount, loan_rating_percent = self.values[LoanRating][loan_rating]
+                    income_source_amount, income_source_percent = self.values[IncomeSource][income_source]
+
+                    rate = self.base_rate
+                    rate += sum([self.values[Purpose][purpose], loan_rating_percent, income_source_percent])
+
+                    fixed_rates.append(rate)
+                    available_loan_amounts.append(min(income_source_amount, loan_rating_amount))
+
+        return tuple(fixed_rates), tuple(available_loan_amounts)
+
+
+DEFAULT_POLICY = Policy('builtin', BASE_RATE, {enum: {member: member.value for member in enum} for enum in POLICY_ENUMS})
+
+# Tables of the built-in policy, scoring itself reads current_policy().
+FIXED_RATE = DEFAULT_POLICY.fixed_rate
+AVAILABLE_LOAN_AMOUNT = DEFAULT_POLICY.available_loan_amount
+
+_policy = DEFAULT_POLICY
+
+
+def current_policy():
+    """Installed policy, callers keep the result to score a whole request with one version."""
+    return _policy
+
+
+def install_policy(policy):
+    """Makes policy current; scoring already running finishes with the policy it started with."""
+    global _policy
+
+    _policy = policy
+    tables_changed()
+
+
+def load_policy(path):
+    with open(path) as stream:
+        return Policy.from_dict(json.load(stream))
+
+
+def add_listener(callback):
+    """Calls callback() from tables_changed(); bound methods are held weakly."""
+    _listeners.append(weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback))
+
+
+def tables_changed():
+    """Tells listeners, such as ScoringCache, that scores computed so far are stale."""
+    for reference in list(_listeners):
+        callback = reference()
+
+        if callback is None:
+            _listeners.remove(reference)
+        else:
+            callback()
+
+
+def _policy_value(enum, value):
+    shape = next(iter(enum)).value
+
+    if isinstance(shape, tuple):
+        if not isinstance(value, list) or len(value) != len(shape):
+            raise TypeError
+
+        return tuple(_number(item) for item in value)
+
+    return _number(value)
+
+
+def _number(value):
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise TypeError
+
+    if not math.isfinite(value):
+        raise ValueError('policy values must be finite, got %r' % value)
+
+    return value
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import signal
+import sys
+import time
+import metrics
+from enums import *
+from rate_table import current_policy, install_policy, load_policy
+from batch_scoring import decide_batch, validate_batch, validation_errors, columns_from_rows
+from metrics import Histogram
+
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT = 0.002
+
+_STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+_PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+class MicroBatcher:
+    """Coalesces concurrent applications into one decide_batch call.
+
+    A batch is flushed when it reaches max_batch_size or max_wait seconds
+    after its first application. While batches stay at a single application
+    there is no concurrency to wait for, so they are flushed immediately.
+    """
+
+    __queue = None
+    __max_batch_size = None
+    __max_wait = None
+    __waiting = False
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT):
+        if max_batch_size < 1 or max_wait < 0:
+            raise ValueError('max_batch_size must be positive and max_wait not negative')
+
+        self.__max_batch_size = max_batch_size
+        self.__max_wait = max_wait
+        self.batch_size = Histogram(_powers_of_two(max_batch_size))
+        self.queue_depth = Histogram(_powers_of_two(max_batch_size * 4))
+        self.latency = Histogram((0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+
+    async def submit(self, row):
+        """(payment, Reason, policy version) for one application mapping with enum names."""
+        if not isinstance(row, dict):
+            raise TypeError('application must be an object, not %s' % type(row).__name__)
+
+        if self.__queue is None:
+            self.__queue = asyncio.Queue()
+
+        future = asyncio.get_running_loop().create_future()
+        self.__queue.put_nowait((row, future, time.perf_counter()))
+
+        return await future
+
+    async def run(self):
+        if self.__queue is None:
+            self.__queue = asyncio.Queue()
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.__queue.get()]
+            deadline = loop.time() + (self.__max_wait if self.__waiting else 0)
+
+            while len(batch) < self.__max_batch_size:
+                if not self.__queue.empty():
+                    batch.append(self.__queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self.__queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.queue_depth.observe(self.__queue.qsize())
+            self.batch_size.observe(len(batch))
+            self.__waiting = len(batch) > 1
+
+            try:
+                self.__flush(batch)
+            except Exception as error:
+                # Only this batch fails, a dead batcher would leave every later submit waiting.
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def stats(self):
+        return {
+            'batch_size': self.batch_size.as_dict(),
+            'queue_depth': self.queue_depth.as_dict(),
+            'latency_seconds': self.latency.as_dict()
+        }
+
+    def __flush(self, batch):
+        policy = current_policy()
+
+        try:
+            columns = columns_from_rows([row for row, _, _ in batch])
+        except (TypeError, ValueError):
+            for row, future, _ in batch:
+                self.__flush_one(row, future, policy)
+        else:
+            errors = validate_batch(**columns)
+            payment, reason = decide_batch(**columns, errors=errors, policy=policy)
+
+            for (_, future, _), row_payment, row_reason, row_errors in zip(
+                    batch, payment.tolist(), reason.tolist(), errors.tolist()):
+                self.__resolve(future, row_payment, row_reason, row_errors, policy.version)
+
+        now = time.perf_counter()
+
+        for _, _, submitted in batch:
+            self.latency.observe(now - submitted)
+
+    def __flush_one(self, row, future, policy):
+        try:
+            columns = columns_from_rows([row])
+        except (TypeError, ValueError) as error:
+            if not future.done():
+                future.set_exception(error)
+        else:
+            errors = validate_batch(**columns)
+            payment, reason = decide_batch(**columns, errors=errors, policy=policy)
+            self.__resolve(future, payment.item(0), reason.item(0), errors.item(0), policy.version)
+
+    def __resolve(self, future, payment, reason, errors, policy_version):
+        if future.done():
+            return
+
+        if errors:
+            future.set_exception(ValueError('invalid %s' % ', '.join(
+                exception.__name__ for exception in validation_errors(errors)
+            )))
+        else:
+            future.set_result((None if reason else payment, Reason(reason), policy_version))
+
+
+class ScoringService:
+    """Local HTTP/1.1 JSON endpoint in front of a MicroBatcher.
+
+    POST /score takes one application object or a list of them,
+    GET /stats returns the batcher histograms and GET /metrics the scoring
+    metrics in the Prometheus text format, if metrics.enable() was called.
+    A policy_path is loaded on
+    start and reloaded on SIGHUP without stopping the batcher.
+    """
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, policy_path=None):
+        self.batcher = MicroBatcher(max_batch_size, max_wait)
+        self.__batcher_task = None
+        self.__policy_path = policy_path
+
+    async def start(self, host='127.0.0.1', port=8080):
+        if self.__policy_path:
+            install_policy(load_policy(self.__policy_path))
+
+            if hasattr(signal, 'SIGHUP'):
+                asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.reload_policy)
+
+        self.__batcher_task = asyncio.ensure_future(self.batcher.run())
+
+        return await asyncio.start_server(self.__handle, host, port)
+
+    def reload_policy(self):
+        """Installs policy_path again, a broken file keeps the current policy."""
+        try:
+            install_policy(load_policy(self.__policy_path))
+        except (OSError, ValueError) as error:
+            print('policy %s not reloaded: %s' % (self.__policy_path, error), file=sys.stderr)
+
+    async def stop(self, server):
+        server.close()
+        await server.wait_closed()
+        self.__batcher_task.cancel()
+
+    async def serve_forever(self, host='127.0.0.1', port=8080):
+        server = await self.start(host, port)
+
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop(server)
+
+    async def __handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+
+                if not request_line.strip():
+                    break
+
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+
+                while True:
+                    line = await reader.readline()
+
+                    if not line.strip():
+                        break
+
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self.__route(method, path, body)
+
+                if isinstance(payload, str):
+                    content, content_type = payload.encode(), _PROMETHEUS_CONTENT_TYPE
+                else:
+                    content, content_type = json.dumps(payload).encode(), 'application/json'
+
+                writer.write(('HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n\r\n' % (
+                    status, _STATUS_TEXT[status], content_type, len(content)
+                )).encode('latin-1') + content)
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def __route(self, method, path, body):
+        if path == '/stats':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}
+
+            return 200, dict(self.batcher.stats(), policy_version=current_policy().version)
+
+        if path == '/metrics':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}
+
+            if metrics.active is None:
+                return 404, {'error': 'metrics are disabled'}
+
+            return 200, metrics.active.prometheus()
+
+        if path != '/score':
+            return 404, {'error': 'unknown path %s' % path}
+
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+
+        try:
+            applications = json.loads(body)
+            single = isinstance(applications, dict)
+            results = await asyncio.gather(*(
+                self.batcher.submit(application) for application in ([applications] if single else applications)
+            ))
+        except (TypeError, ValueError) as error:
+            return 400, {'error': str(error)}
+
+        decisions = [
+            {'payment': payment, 'reason': reason.name, 'policy_version': policy_version}
+            for payment, reason, policy_version in results
+        ]
+
+        return 200, decisions[0] if single else decisions
+
+
+def _powers_of_two(limit):
+    bounds = [1]
+
+    while bounds[-1] < limit:
+        bounds.append(bounds[-1] * 2)
+
+    return bounds
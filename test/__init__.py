@@ -0,0 +1,7 @@
+from enum import Enum
+import numpy as np
+
+
+def code_columns(rows):
+    """score_batch columns of BorrowerScoring argument tuples, enum members given as their codes."""
+    return [np.array([value.code if isinstance(value, Enum) else value for value in column]) for column in zip(*rows)]
@@ -0,0 +1,56 @@
+import itertools
+import pytest
+from enums import *
+from borrower_scoring import BorrowerRecord, Scorer
+from rate_table import DEFAULT_POLICY
+from adaptive import RULES, AdaptiveScorer, _compiled
+
+
+class TestAdaptiveScorer:
+
+    __records = [BorrowerRecord(*row) for row in itertools.product(
+        (25, 55), (1, 5, 16), LoanRating, (0.1, 1, 5, 10), (1, 10, 20), Sex, IncomeSource, (Purpose.MORTGAGE, Purpose.LOAN)
+    )]
+
+    @pytest.mark.parametrize('order', list(itertools.permutations(RULES)))
+    def test_every_order_gives_canonical_decisions(self, order):
+        score, decide = _compiled(order)
+        scorer = Scorer()
+
+        for record in self.__records:
+            assert score(record, DEFAULT_POLICY) == scorer.score(record)
+            assert decide(record, DEFAULT_POLICY) == scorer.decide(record)
+
+    def test_learns_the_most_rejecting_rule_first(self):
+        adaptive = AdaptiveScorer(sample_every=1, reorder_every=200)
+        # Only the loan limit of LOW ratings rejects these.
+        records = [
+            BorrowerRecord(25, 16, LoanRating.LOW, 5 if i % 10 else 0.5, 10, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.LOAN)
+            for i in range(400)
+        ]
+
+        assert adaptive.order == RULES
+
+        for record in records:
+            adaptive.decide(record)
+
+        share, nanoseconds = adaptive.statistics()[Reason.AVAILABLE_LOAN_AMOUNT]
+
+        assert adaptive.order[0] is Reason.AVAILABLE_LOAN_AMOUNT
+        assert adaptive.order[1:] == RULES[:-1]
+        assert share == pytest.approx(0.9)
+        assert nanoseconds > 0
+        assert [adaptive.score(record) for record in self.__records] == [Scorer().score(record) for record in self.__records]
+
+    @pytest.mark.parametrize('sample_every, reorder_every', [(0, 10), (10, 5)])
+    def test_arguments(self, sample_every, reorder_every):
+        with pytest.raises(ValueError):
+            AdaptiveScorer(sample_every, reorder_every)
+
+    def test_countdown_past_zero_still_samples(self):
+        adaptive = AdaptiveScorer(sample_every=2, reorder_every=2)
+        # Threads racing on the countdown can take it below zero.
+        adaptive._AdaptiveScorer__countdown = 0
+        adaptive.score(self.__records[0])
+
+        assert adaptive.statistics()[Reason.UNRELIABLE_BORROWER][1] > 0
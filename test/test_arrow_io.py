@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+from enums import *
+import audit
+import metrics
+from batch_scoring import FIELDS, decide_batch, decision_batch, validate_batch
+from generator import PortfolioGenerator
+from cli import main
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from arrow_io import decide_record_batch, score_parquet
+
+
+class TestArrowIo:
+
+    __enums = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+
+    @pytest.mark.parametrize('dictionary', [True, False])
+    def test_decisions_equal_decide_batch(self, dictionary):
+        columns = PortfolioGenerator(seed=5, invalid={'age': 0.01, 'loan_amount': 0.01}).columns(20000)
+        errors = validate_batch(**columns)
+        payment, reason = decide_batch(**columns, errors=errors)
+
+        decisions = decide_record_batch(self.__batch(columns, dictionary))
+
+        assert decisions.schema.names == ['id', 'payment', 'reason', 'errors', 'policy_version']
+        assert decisions.column('id').to_pylist() == list(range(20000))
+        assert np.array_equal(decisions.column('payment').to_numpy(zero_copy_only=False), payment, equal_nan=True)
+        assert decisions.column('payment').null_count == np.isnan(payment).sum()
+        assert decisions.column('reason').to_pylist() == [Reason(code).name for code in reason.tolist()]
+        assert np.array_equal(decisions.column('errors').to_numpy(), errors)
+        assert set(decisions.column('policy_version').to_pylist()) == {'builtin'}
+
+    def test_nulls_are_invalid(self):
+        batch = pa.RecordBatch.from_pydict({
+            'age': pa.array([30, None, 30], pa.int64()),
+            'income_amount': [10, 10, 10],
+            'loan_rating': ['LOW', 'LOW', None],
+            'loan_amount': [1.0, 1.0, 1.0],
+            'credit_term': [5, 5, 5],
+            'sex': ['FEMALE'] * 3,
+            'income_source': ['BUSINESSMAN'] * 3,
+            'purpose': ['MORTGAGE'] * 3
+        })
+
+        decisions = decide_record_batch(batch)
+
+        assert decisions.column('payment').to_pylist() == [0.2975, None, None]
+        assert decisions.column('reason').to_pylist() == ['APPROVED', 'INVALID', 'INVALID']
+        assert decisions.column('errors').to_pylist() == [0, 1, 4]
+
+    def test_prefiltered_rows_are_validated(self):
+        # Every row but the last is rejected by the prefilter, their numbers are still validated.
+        batch = pa.RecordBatch.from_pydict({
+            'age': pa.array([30, None, 30, 30, 30, 30, 30], pa.int64()),
+            'income_amount': [10.0, 10.0, 10.5, float('inf'), 10.0, 10.0, 10.0],
+            'loan_rating': ['PROHIBITED'] * 6 + ['LOW'],
+            'loan_amount': [1.0, 1.0, 1.0, 1.0, float('nan'), None, 1.0],
+            'credit_term': pa.array([5, 5, 5, 5, 5, 21, 5], pa.int8()),
+            'sex': ['FEMALE'] * 7,
+            'income_source': ['UNEMPLOYED', 'BUSINESSMAN', None, 'UNEMPLOYED', 'BUSINESSMAN', 'BUSINESSMAN', 'BUSINESSMAN'],
+            'purpose': ['MORTGAGE'] * 7
+        })
+
+        decisions = decide_record_batch(batch)
+
+        assert decisions.column('reason').to_pylist() == [
+            'UNRELIABLE_BORROWER', 'INVALID', 'INVALID', 'INVALID', 'INVALID', 'INVALID', 'APPROVED'
+        ]
+        assert decisions.column('errors').to_pylist() == [0, 1, 2 | 64, 2, 8, 8 | 16, 0]
+
+    def test_every_row_is_audited_and_counted(self, tmpdir):
+        columns = PortfolioGenerator(seed=7, invalid={'age': 0.05}).columns(1000)
+        errors = validate_batch(**columns)
+        log = audit.enable(str(tmpdir.join('audit')))
+        instruments = metrics.enable()
+
+        try:
+            decisions = decide_record_batch(self.__batch(columns, True))
+        finally:
+            metrics.disable()
+            audit.disable()
+
+        reason = np.array([Reason[name] for name in decisions.column('reason').to_pylist()])
+        rows = [row for path in log.paths for row in audit.read_segment(path)]
+        expected = decision_batch(**columns, errors=errors)
+
+        assert [row['reason'] for row in rows] == decisions.column('reason').to_pylist()
+        assert [row['rate'] for row in rows] == pytest.approx(
+            [None if np.isnan(rate) else rate for rate in expected.rate.tolist()], rel=1e-15
+        )
+        assert instruments.decisions['batch'] == np.bincount(reason, minlength=len(Reason)).tolist()
+
+    @pytest.mark.parametrize('dictionary', [True, False])
+    def test_unknown_enum_name_is_invalid(self, dictionary):
+        columns = PortfolioGenerator().columns(10)
+        batch = self.__batch(columns, False)
+        sex = pa.array(['OTHER'] + ['MALE'] * 9)
+        batch = batch.set_column(
+            batch.schema.get_field_index('sex'), 'sex', sex.dictionary_encode() if dictionary else sex
+        )
+
+        decisions = decide_record_batch(batch)
+
+        assert decisions.column('reason').to_pylist()[0] == 'INVALID'
+        assert decisions.column('errors').to_pylist()[0] == 1 << FIELDS.index('sex')
+        assert 'INVALID' not in decisions.column('reason').to_pylist()[1:]
+
+    def test_parquet_file_is_scored_in_batches(self, tmpdir):
+        columns = PortfolioGenerator(seed=9).columns(5000)
+        source, destination = str(tmpdir.join('in.parquet')), str(tmpdir.join('out.parquet'))
+        table = pa.Table.from_batches([self.__batch(columns, False)]).append_column('unused', pa.array(['x'] * 5000))
+        pq.write_table(table, source)
+
+        assert main(['score', source, '-o', destination, '--chunk-size', '1024']) == 0
+
+        decisions = pq.read_table(destination)
+        _, reason = decide_batch(**columns)
+
+        assert decisions.column_names == ['id', 'payment', 'reason', 'errors', 'policy_version']
+        assert decisions.column('reason').to_pylist() == [Reason(code).name for code in reason.tolist()]
+
+    def test_empty_parquet_file(self, tmpdir):
+        source, destination = str(tmpdir.join('in.parquet')), str(tmpdir.join('out.parquet'))
+        pq.write_table(pa.Table.from_batches([self.__batch(PortfolioGenerator().columns(0), False)]), source)
+
+        assert score_parquet(source, destination) == 0
+        assert pq.read_table(destination).num_rows == 0
+
+    def test_missing_or_unwritable_parquet_is_reported_not_raised(self, tmpdir, capsys):
+        source = str(tmpdir.join('in.parquet'))
+        pq.write_table(pa.Table.from_batches([self.__batch(PortfolioGenerator().columns(10), False)]), source)
+
+        assert main(['score', str(tmpdir.join('missing.parquet')), '-o', str(tmpdir.join('out.parquet'))]) == 2
+        assert main(['score', source, '-o', str(tmpdir.join('missing', 'out.parquet'))]) == 2
+        assert capsys.readouterr().err.count('borrower_scoring: ') == 2
+
+    def __batch(self, columns, dictionary):
+        arrays = []
+
+        for field in FIELDS:
+            if field in self.__enums:
+                names = [member.name for member in self.__enums[field]]
+
+                if dictionary:
+                    arrays.append(pa.DictionaryArray.from_arrays(columns[field], names))
+                else:
+                    arrays.append(pa.array(np.array(names)[columns[field]]))
+            else:
+                arrays.append(pa.array(columns[field]))
+
+        return pa.RecordBatch.from_arrays(arrays + [pa.array(np.arange(len(columns['age'])))], list(FIELDS) + ['id'])
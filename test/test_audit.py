@@ -0,0 +1,246 @@
+import math
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+import audit
+import metrics
+from enums import *
+from borrower_scoring import BorrowerScoring, Scorer
+from batch_scoring import decide_batch, decision_batch, validate_batch
+from generator import PortfolioGenerator
+from parallel import ParallelScorer
+from rate_table import DEFAULT_POLICY, Policy, install_policy
+from benchmarks.bench_scoring import scalar_rows
+from cli import main
+
+
+@pytest.fixture
+def audit_dir(tmpdir):
+    yield str(tmpdir.join('audit'))
+    audit.disable()
+
+
+class _StalledRecord:
+    """Record the writer waits for when it reads the age, so the buffer fills up."""
+
+    income_amount = 10
+    loan_rating = LoanRating.LOW
+    loan_amount = 1
+    credit_term = 5
+    sex = Sex.FEMALE
+    income_source = IncomeSource.UNEMPLOYED
+    purpose = Purpose.MORTGAGE
+
+    def __init__(self):
+        self.reached = threading.Event()
+        self.release = threading.Event()
+
+    @property
+    def age(self):
+        self.reached.set()
+        self.release.wait(30)
+
+        return 30
+
+
+class TestAudit:
+
+    __columns = PortfolioGenerator(seed=8, invalid={'age': 0.05, 'purpose': 0.05}).columns(2000)
+
+    @pytest.mark.parametrize('audit_format', audit.FORMATS)
+    def test_scalar_decisions(self, audit_dir, audit_format):
+        log = audit.enable(audit_dir, audit_format)
+        records = [BorrowerScoring(*row) for row in scalar_rows(500)]
+        payments = [record.score() for record in records]
+        decisions = [record.decide() for record in records]
+        audit.disable()
+        rows = _read(log)
+
+        assert log.written == 1000 and log.dropped == 0
+        assert [row['payment'] for row in rows] == payments + [decision.payment for decision in decisions]
+
+        for row, record in zip(rows, records + records):
+            decision = Scorer().decide(record)
+
+            assert row['reason'] == decision.reason.name
+            assert row['rate'] == decision.rate
+            assert row['policy_version'] == 'builtin'
+            assert [row[field] for field in audit.INPUT_FIELDS] == [
+                value.name if isinstance(value, Enum) else value
+                for value in (getattr(record, field) for field in audit.INPUT_FIELDS)
+            ]
+
+    def test_scalar_scoring_does_not_import_numpy(self):
+        code = (
+            'import sys\n'
+            'from borrower_scoring import BorrowerScoring\n'
+            'from enums import *\n'
+            'BorrowerScoring(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score()\n'
+            'print("numpy" in sys.modules)'
+        )
+
+        assert subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True).stdout.strip() == b'False'
+
+    @pytest.mark.parametrize('audit_format', audit.FORMATS)
+    def test_batch_rows_match_decision_batch(self, audit_dir, audit_format):
+        log = audit.enable(audit_dir, audit_format)
+        errors = validate_batch(**self.__columns)
+        decide_batch(**self.__columns, errors=errors)
+        decision = decision_batch(**self.__columns, errors=errors)
+        audit.disable()
+        rows = _read(log)
+
+        assert len(rows) == 4000
+        # The rate decide_batch leaves out is worked out by the writer.
+        for half in (rows[:2000], rows[2000:]):
+            assert [Reason[row['reason']] for row in half] == decision.reason.tolist()
+            assert [np.nan if row['payment'] is None else row['payment'] for row in half] == pytest.approx(
+                decision.payment.tolist(), nan_ok=True
+            )
+            assert [np.nan if row['rate'] is None else row['rate'] for row in half] == pytest.approx(
+                decision.rate.tolist(), nan_ok=True, rel=1e-15
+            )
+            assert [row['age'] for row in half] == pytest.approx(self.__columns['age'].tolist())
+
+        invalid = np.flatnonzero(errors != 0)[0]
+
+        assert rows[invalid]['reason'] == 'INVALID'
+        assert rows[invalid]['payment'] is None and rows[invalid]['rate'] is None
+
+    def test_parallel_rows_are_recorded_and_counted_by_the_parent(self, audit_dir):
+        columns = dict(self.__columns)
+        errors = validate_batch(**columns)
+        log = audit.enable(audit_dir, 'binary')
+        instruments = metrics.enable()
+
+        try:
+            # Workers forked while the log is enabled must not keep their own copy of it.
+            with ParallelScorer(workers=2, chunk_size=300) as scorer:
+                payment = scorer.score(**columns, errors=errors)
+        finally:
+            metrics.disable()
+            audit.disable()
+
+        _, reason = decide_batch(**columns, errors=errors)
+        rows = _read(log)
+
+        assert log.written == len(reason) and log.dropped == 0
+        assert [row['reason'] for row in rows] == [Reason(code).name for code in reason.tolist()]
+        assert [row['payment'] for row in rows] == [None if math.isnan(value) else value for value in payment.tolist()]
+        assert instruments.decisions['batch'] == np.bincount(reason, minlength=len(Reason)).tolist()
+
+    def test_policy_version(self, audit_dir):
+        log = audit.enable(audit_dir)
+        record = BorrowerScoring(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        record.score()
+        install_policy(Policy.from_dict(dict(DEFAULT_POLICY.as_dict(), version='v2', base_rate=11)))
+
+        try:
+            record.score()
+        finally:
+            install_policy(DEFAULT_POLICY)
+
+        audit.disable()
+        rows = _read(log)
+
+        assert [(row['policy_version'], row['rate']) for row in rows] == [('builtin', 9.75), ('v2', 10.75)]
+
+    def test_segments_rotate_in_order(self, audit_dir):
+        log = audit.enable(audit_dir, segment_size=1)
+        records = [BorrowerScoring(*row) for row in scalar_rows(5)]
+
+        for record in records:
+            record.score()
+            assert log.flush(30)
+
+        audit.disable()
+
+        assert len(log.paths) == 5
+        assert [row['age'] for row in _read(log)] == [record.age for record in records]
+
+    def test_flushed_rows_are_readable_before_the_segment_is_closed(self, audit_dir):
+        log = audit.enable(audit_dir)
+        BorrowerScoring(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score()
+
+        assert log.flush(30)
+        assert [row['payment'] for row in audit.read_segment(log.paths[0])] == [0.2975]
+
+    def test_full_buffer_drops_and_counts(self, audit_dir):
+        log = audit.enable(audit_dir, capacity=4)
+        stalled = _StalledRecord()
+        log.decide(Scorer(), stalled)
+        assert stalled.reached.wait(30)
+
+        for _ in range(6):
+            log.decide(Scorer(), stalled)
+
+        stalled.release.set()
+        audit.disable()
+
+        assert (log.written, log.dropped) == (5, 2)
+
+    def test_full_buffer_blocks(self, audit_dir):
+        log = audit.enable(audit_dir, capacity=1, when_full='block')
+        stalled = _StalledRecord()
+        log.decide(Scorer(), stalled)
+        assert stalled.reached.wait(30)
+        log.decide(Scorer(), stalled)
+        producer = threading.Thread(target=log.decide, args=(Scorer(), stalled))
+        producer.start()
+        time.sleep(0.2)
+
+        assert producer.is_alive()
+
+        stalled.release.set()
+        producer.join(30)
+        audit.disable()
+
+        assert (log.written, log.dropped) == (3, 0)
+
+    def test_metrics_still_count(self, audit_dir):
+        log = audit.enable(audit_dir)
+        instruments = metrics.enable()
+
+        try:
+            BorrowerScoring(60, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score()
+        finally:
+            metrics.disable()
+
+        audit.disable()
+
+        assert instruments.decisions['scalar'][Reason.RETIREMENT_AGE] == 1
+        assert [row['reason'] for row in _read(log)] == ['RETIREMENT_AGE']
+
+    def test_disabled_records_nothing(self):
+        assert audit.active is None
+        assert BorrowerScoring(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score() == 0.2975
+
+    @pytest.mark.parametrize('options', [{'format': 'xml'}, {'when_full': 'wait'}, {'capacity': 0}])
+    def test_bad_options(self, audit_dir, options):
+        with pytest.raises(ValueError):
+            audit.AuditLog(audit_dir, **options)
+
+    def test_cli(self, audit_dir, tmpdir):
+        applications = tmpdir.join('applications.csv')
+        applications.write(
+            'age,income_amount,loan_rating,loan_amount,credit_term,sex,income_source,purpose\n'
+            '30,10,LOW,1,5,FEMALE,BUSINESSMAN,MORTGAGE\n'
+            '-1,10,LOW,1,5,FEMALE,BUSINESSMAN,MORTGAGE\n'
+        )
+
+        assert main([
+            'score', str(applications), '-o', str(tmpdir.join('decisions.csv')), '--audit-dir', audit_dir,
+            '--audit-format', 'binary'
+        ]) == 0
+        assert audit.active is None
+
+        rows = [row for path in sorted(tmpdir.join('audit').listdir()) for row in audit.read_segment(str(path))]
+
+        assert [(row['age'], row['reason'], row['rate']) for row in rows] == [(30, 'APPROVED', 9.75), (-1, 'INVALID', None)]
+
+
+def _read(log):
+    return [row for path in log.paths for row in audit.read_segment(path)]
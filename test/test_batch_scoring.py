@@ -0,0 +1,162 @@
+import itertools
+import math
+import numpy as np
+import pytest
+from enums import *
+from borrower_scoring import BorrowerScoring
+from exceptions import *
+from batch_scoring import score_batch, decide_batch, decision_batch, validate_batch, validation_errors, VALIDATION_ERRORS
+from test import code_columns
+
+
+class TestBatchScoring:
+
+    __ages = (0, 25, 40, 45, 59, 60, 64)
+    __income_amounts = (1, 2, 5, 9, 16)
+    __loan_amounts = (0.1, 0.5, 1, 1.000001, 3, 5, 9, 10)
+    __credit_terms = (1, 2, 3, 10, 20)
+
+    def test_batch_equals_score_on_every_enum_combination(self):
+        rows = list(itertools.product(
+            self.__ages, self.__income_amounts, LoanRating, self.__loan_amounts,
+            self.__credit_terms, Sex, IncomeSource, Purpose
+        ))
+
+        expected = np.array([self.__exec_score(row) for row in rows], dtype=np.float64)
+        actual = score_batch(*code_columns(rows))
+
+        assert np.array_equal(np.isnan(actual), np.isnan(expected))
+        assert np.allclose(actual, expected, rtol=1e-15, atol=0, equal_nan=True)
+
+    @pytest.mark.parametrize(
+        ('row', 'expected'), [
+            ((30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE), 0.2975),
+            ((25, 9, LoanRating.HIGH, 9, 3, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE), 3.5891181741504607),
+            ((25, 9, LoanRating.HIGH, 9.000003, 3, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE), None),
+            ((30, 1, LoanRating.NORMAL, 1, 2, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.CAR_LOAN), None),
+            ((Sex.FEMALE.value, 5, LoanRating.HIGH, 5, 1, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE), None),
+            ((25, 5, LoanRating.PROHIBITED, 5, 20, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE), None),
+            ((25, 5, LoanRating.HIGH, 5, 20, Sex.FEMALE, IncomeSource.UNEMPLOYED, Purpose.MORTGAGE), None)
+        ]
+    )
+    def test_batch_known_payments(self, row, expected):
+        actual = score_batch(*code_columns([row]))[0]
+
+        if expected is None:
+            assert math.isnan(actual)
+        else:
+            assert actual == pytest.approx(expected, rel=1e-15)
+
+    @pytest.mark.parametrize(
+        ('row', 'expected'), [
+            ((30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE), Reason.APPROVED),
+            ((25, 5, LoanRating.PROHIBITED, 5, 20, Sex.FEMALE, IncomeSource.UNEMPLOYED, Purpose.MORTGAGE),
+             Reason.UNRELIABLE_BORROWER),
+            ((Sex.FEMALE.value, 5, LoanRating.PROHIBITED, 5, 1, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             Reason.LOAN_RATING_PROHIBITED),
+            ((Sex.FEMALE.value, 1, LoanRating.HIGH, 5, 1, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             Reason.RETIREMENT_AGE),
+            ((25, 9, LoanRating.LOW, 9.000003, 3, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+             Reason.THIRD_OF_INCOME),
+            ((25, 5, LoanRating.LOW, 1.000001, 20, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+             Reason.AVAILABLE_LOAN_AMOUNT),
+            ((30, 2, LoanRating.NORMAL, 7, 20, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.LOAN),
+             Reason.HALF_OF_INCOME)
+        ]
+    )
+    def test_decide_batch_reason(self, row, expected):
+        payment, reason = decide_batch(*code_columns([row]))
+
+        assert reason[0] == expected
+        assert math.isnan(payment[0]) == (expected != Reason.APPROVED)
+
+    def test_decide_batch_takes_errors_as_a_list(self):
+        row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        _, reason = decide_batch(*code_columns([row, row]), errors=[0, 1])
+
+        assert reason.tolist() == [Reason.APPROVED, Reason.INVALID]
+
+    def test_decision_batch_takes_errors_as_a_list(self):
+        row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        decisions = decision_batch(*code_columns([row, row]), errors=[0, 1])
+
+        assert decisions.reason.tolist() == [Reason.APPROVED, Reason.INVALID]
+        assert math.isnan(decisions.rate[1]) and not math.isnan(decisions.rate[0])
+
+    def test_decision_batch_equals_decide(self):
+        rows = list(itertools.product(
+            self.__ages, self.__income_amounts, LoanRating, (0.1, 1.000001, 9), (1, 20), Sex, IncomeSource, Purpose
+        ))
+        decisions = [BorrowerScoring(*row).decide() for row in rows]
+        columns = code_columns(rows)
+        columns[0][0] = -1
+        errors = validate_batch(*columns)
+
+        reason, payment, rate = decision_batch(*columns, errors=errors)
+
+        assert reason[0] == Reason.INVALID and math.isnan(payment[0]) and math.isnan(rate[0])
+        assert reason[1:].tolist() == [decision.reason for decision in decisions[1:]]
+
+        for actual, expected in ((payment, 'payment'), (rate, 'rate')):
+            expected = np.array([getattr(decision, expected) for decision in decisions[1:]], dtype=np.float64)
+
+            assert np.array_equal(np.isnan(actual[1:]), np.isnan(expected))
+            assert np.allclose(actual[1:], expected, rtol=1e-15, atol=0, equal_nan=True)
+
+        assert np.array_equal(decision_batch(*columns, errors=errors).payment, decide_batch(*columns, errors=errors)[0], equal_nan=True)
+
+    def test_batch_decision_at_half_income_cap(self):
+        row = (30, 10, LoanRating.HIGH, 5, 10, Sex.MALE, IncomeSource.EMPLOYEE, Purpose.CAR_LOAN)
+        payment = self.__exec_score(row)
+        income_amount = payment * 2
+
+        columns = code_columns([row])
+        columns[1] = np.array([income_amount, np.nextafter(income_amount, 0)])
+        columns = [column if i == 1 else np.repeat(column, 2) for i, column in enumerate(columns)]
+
+        actual = score_batch(*columns)
+
+        assert actual[0] == payment
+        assert math.isnan(actual[1])
+
+    @pytest.mark.parametrize(
+        ('column', 'value', 'expected'), [
+            (0, -1, (InvalidAgeException,)),
+            (0, 30.5, (InvalidAgeException,)),
+            (1, 0, (InvalidIncomeAmountException,)),
+            (1, math.inf, (InvalidIncomeAmountException,)),
+            (1, math.nan, (InvalidIncomeAmountException,)),
+            (2, len(LoanRating), (InvalidLoanRatingException,)),
+            (3, 10.5, (InvalidLoanAmountException,)),
+            (3, math.nan, (InvalidLoanAmountException,)),
+            (3, math.inf, (InvalidLoanAmountException,)),
+            (4, math.inf, (InvalidCreditTermException,)),
+            (4, 21, (InvalidCreditTermException,)),
+            (5, -1, (InvalidSexException,)),
+            (6, 1.5, (InvalidIncomeSourceException,)),
+            (7, len(Purpose), (InvalidPurposeException,))
+        ]
+    )
+    def test_validate_batch_flags_invalid_rows(self, column, value, expected):
+        row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        columns = [np.repeat(np.asarray(array, dtype=np.float64), 2) for array in code_columns([row])]
+        columns[column][1] = value
+
+        errors = validate_batch(*columns)
+        payment, reason = decide_batch(*columns, errors=errors)
+
+        assert errors[0] == 0
+        assert validation_errors(errors[1]) == expected
+        assert reason.tolist() == [Reason.APPROVED, Reason.INVALID]
+        assert payment[0] == score_batch(*columns, errors=errors)[0]
+        assert math.isnan(score_batch(*columns, errors=errors)[1])
+
+    def test_validate_batch_collects_every_error(self):
+        errors = validate_batch(*(np.array([-1]) for _ in range(8)))
+
+        assert validation_errors(errors[0]) == VALIDATION_ERRORS
+
+    def __exec_score(self, row):
+        result = BorrowerScoring(*row).score()
+
+        return math.nan if result is None else result
@@ -0,0 +1,76 @@
+import itertools
+import pytest
+import rate_table
+from enums import *
+from exceptions import *
+from borrower_scoring import BorrowerScoring
+from cache import ScoringCache
+
+
+class TestScoringCache:
+
+    __rows = list(itertools.product(
+        (25, 55), (1, 5, 16), LoanRating, (0.1, 1, 5, 10), (1, 10), Sex, IncomeSource, (Purpose.MORTGAGE, Purpose.LOAN)
+    ))
+
+    def test_cached_scores_equal_score(self):
+        cache = ScoringCache()
+
+        for _ in range(2):
+            for row in self.__rows:
+                assert cache.score(*row) == BorrowerScoring(*row).score()
+
+        assert cache.stats() == {
+            'entries': len(self.__rows), 'hits': len(self.__rows), 'misses': len(self.__rows), 'evictions': 0
+        }
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ScoringCache(max_entries=2)
+        first, second, third = self.__rows[:3]
+
+        cache.score(*first)
+        cache.score(*second)
+        cache.score(*first)
+        cache.score(*third)
+        cache.score(*first)
+        cache.score(*second)
+
+        assert (cache.hits, cache.misses, cache.evictions) == (2, 4, 2)
+        assert len(cache) == 2
+
+    def test_loan_amount_is_quantized(self):
+        cache = ScoringCache(loan_amount_digits=2)
+        row = (30, 10, LoanRating.LOW, 1.001, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        near_duplicate = row[:3] + (0.999,) + row[4:]
+        rounded = row[:3] + (1,) + row[4:]
+
+        assert cache.score(*row) == BorrowerScoring(*rounded).score()
+        assert cache.score(*near_duplicate) == BorrowerScoring(*rounded).score()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.parametrize(
+        ('row', 'exception'), [
+            ((30.0, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+             InvalidAgeException),
+            ((30, 10, LoanRating.LOW, 10.004, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+             InvalidLoanAmountException),
+            ((30, 10, 'LOW', 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE), InvalidLoanRatingException)
+        ]
+    )
+    def test_invalid_arguments_raise_after_valid_ones_are_cached(self, row, exception):
+        cache = ScoringCache(loan_amount_digits=2)
+        cache.score(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        cache.score(30, 10, LoanRating.LOW, 10, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+
+        with pytest.raises(exception):
+            cache.score(*row)
+
+    def test_tables_changed_invalidates(self):
+        cache = ScoringCache()
+        cache.score(*self.__rows[0])
+
+        rate_table.tables_changed()
+
+        assert len(cache) == 0
+        cache.score(*self.__rows[0])
+        assert cache.misses == 2
@@ -0,0 +1,118 @@
+import io
+import json
+import pytest
+from cli import main, score_stream
+
+
+class TestCli:
+
+    __csv = (
+        'id,age,income_amount,loan_rating,loan_amount,credit_term,sex,income_source,purpose\n'
+        'a1,30,10,LOW,1,5,FEMALE,BUSINESSMAN,MORTGAGE\n'
+        'a2,25,5,HIGH,5,20,FEMALE,UNEMPLOYED,MORTGAGE\n'
+        'a3,25,9,HIGH,9,3,FEMALE,BUSINESSMAN,MORTGAGE\n'
+    )
+
+    @pytest.mark.parametrize('chunk_size', [1, 2, 100])
+    def test_csv_rows_keep_order_and_ids(self, chunk_size):
+        output = io.StringIO()
+        score_stream(io.StringIO(self.__csv), output, 'csv', 'csv', chunk_size=chunk_size)
+
+        assert output.getvalue().splitlines() == [
+            'id,payment,reason,errors,policy_version',
+            'a1,0.2975,APPROVED,,builtin',
+            'a2,,UNRELIABLE_BORROWER,,builtin',
+            'a3,3.5891181741504607,APPROVED,,builtin'
+        ]
+
+    def test_jsonl_rows_without_id_are_numbered(self):
+        rows = [
+            {'age': 30, 'income_amount': 10, 'loan_rating': 'LOW', 'loan_amount': 1, 'credit_term': 5,
+             'sex': 'FEMALE', 'income_source': 'BUSINESSMAN', 'purpose': 'MORTGAGE'},
+            {'age': 60, 'income_amount': 5, 'loan_rating': 'HIGH', 'loan_amount': 5, 'credit_term': 1,
+             'sex': 'FEMALE', 'income_source': 'EMPLOYEE', 'purpose': 'MORTGAGE'}
+        ]
+        output = io.StringIO()
+        score_stream(io.StringIO(''.join(json.dumps(row) + '\n' for row in rows)), output, 'jsonl', 'jsonl')
+
+        assert [json.loads(line) for line in output.getvalue().splitlines()] == [
+            {'id': 1, 'payment': 0.2975, 'reason': 'APPROVED', 'errors': [], 'policy_version': 'builtin'},
+            {'id': 2, 'payment': None, 'reason': 'RETIREMENT_AGE', 'errors': [], 'policy_version': 'builtin'}
+        ]
+
+    def test_invalid_rows_are_reported_not_raised(self):
+        output = io.StringIO()
+        invalid = self.__csv.replace('a2,25,5,HIGH,5,20', 'a2,-1,5,HIGH,11,20.5')
+        score_stream(io.StringIO(invalid), output, 'csv', 'csv')
+
+        assert output.getvalue().splitlines()[2] == (
+            'a2,,INVALID,InvalidAgeException InvalidLoanAmountException InvalidCreditTermException,builtin'
+        )
+
+    def test_unparsable_rows_are_reported_not_raised(self):
+        output = io.StringIO()
+        invalid = self.__csv.replace('a1,30,10,LOW', 'a1,30,inf,LOWEST').replace('a2,25,5,HIGH,5', 'a2,,5,HIGH,x')
+        score_stream(io.StringIO(invalid), output, 'csv', 'csv')
+
+        assert output.getvalue().splitlines()[1:] == [
+            'a1,,INVALID,InvalidIncomeAmountException InvalidLoanRatingException,builtin',
+            'a2,,INVALID,InvalidAgeException InvalidLoanAmountException,builtin',
+            'a3,3.5891181741504607,APPROVED,,builtin'
+        ]
+
+    def test_bad_jsonl_lines_are_invalid_rows(self):
+        lines = [
+            '{"id": "a1", "age": 30, "income_amount": 10, "loan_rating": "LOW", "loan_amount": 1, "credit_term": 5, '
+            '"sex": "FEMALE", "income_source": "BUSINESSMAN", "purpose": "MORTGAGE"}',
+            '{"id": "a2", "age": 30}',
+            '{"id": ',
+            '[1]'
+        ]
+        output = io.StringIO()
+        score_stream(io.StringIO('\n'.join(lines * 2) + '\n'), output, 'jsonl', 'jsonl', chunk_size=3)
+
+        assert [(row['id'], row['reason'], len(row['errors'])) for row in map(json.loads, output.getvalue().splitlines())] == [
+            ('a1', 'APPROVED', 0), ('a2', 'INVALID', 7), (3, 'INVALID', 8), (4, 'INVALID', 8),
+            ('a1', 'APPROVED', 0), ('a2', 'INVALID', 7), (7, 'INVALID', 8), (8, 'INVALID', 8)
+        ]
+
+    @pytest.mark.parametrize('field, value, error', [
+        ('loan_rating', ['LOW'], 'InvalidLoanRatingException'),
+        ('sex', {}, 'InvalidSexException'),
+        ('age', 10 ** 400, 'InvalidAgeException'),
+        ('loan_amount', -10 ** 400, 'InvalidLoanAmountException')
+    ], ids=['list', 'object', 'huge', 'huge-negative'])
+    def test_json_values_of_the_wrong_kind_are_invalid_rows(self, field, value, error):
+        row = {
+            'age': 30, 'income_amount': 10, 'loan_rating': 'LOW', 'loan_amount': 1, 'credit_term': 5, 'sex': 'FEMALE',
+            'income_source': 'BUSINESSMAN', 'purpose': 'MORTGAGE'
+        }
+        output = io.StringIO()
+        score_stream(io.StringIO(json.dumps({**row, field: value}) + '\n' + json.dumps(row)), output, 'jsonl', 'jsonl')
+
+        assert [(row['reason'], row['errors']) for row in map(json.loads, output.getvalue().splitlines())] == [
+            ('INVALID', [error]), ('APPROVED', [])
+        ]
+
+    @pytest.mark.parametrize('input_format', ['csv', 'jsonl'])
+    def test_undecodable_line_is_reported_with_its_number(self, input_format):
+        text = self.__csv.encode().replace(b'a3', b'\xff')
+        # Past the decoder's first read, so the earlier lines are parsed before it fails.
+        stream = io.TextIOWrapper(io.BytesIO(b' ' * 10000 + b'\n' + text), encoding='utf-8', newline='')
+
+        with pytest.raises(ValueError, match='line 5'):
+            score_stream(stream, io.StringIO(), input_format, input_format)
+
+    @pytest.mark.parametrize('command', ['score', 'convert'])
+    def test_missing_input_is_reported_not_raised(self, tmp_path, capsys, command):
+        missing = str(tmp_path / 'missing.csv')
+
+        assert main([command, missing, '-o', str(tmp_path / 'output')]) == 2
+        assert capsys.readouterr().err.startswith('borrower_scoring: ')
+
+    def test_unwritable_output_is_reported_not_raised(self, tmp_path, capsys):
+        source = tmp_path / 'applications.csv'
+        source.write_text(self.__csv)
+
+        assert main(['score', str(source), '-o', str(tmp_path / 'missing' / 'decisions.csv')]) == 2
+        assert capsys.readouterr().err.startswith('borrower_scoring: ')
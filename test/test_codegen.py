@@ -0,0 +1,67 @@
+import itertools
+import pytest
+from enums import *
+from exceptions import *
+from rate_table import DEFAULT_POLICY, Policy, current_policy, install_policy
+from borrower_scoring import BorrowerRecord, BorrowerScoring, Scorer
+from codegen import compiled_scorer, score
+from test import test_borrower_scoring
+
+
+class TestCompiledScenarios(test_borrower_scoring.TestBorrowerScoring):
+    """The BorrowerScoring scenarios run against the compiled function."""
+
+    def _TestBorrowerScoring__exec_score(self, params):
+        return compiled_scorer(current_policy())(**params)
+
+
+class TestCodegen:
+
+    __rows = list(itertools.product(
+        (0, 25, 45, 59, 60, 64), (1, 2, 5, 16), LoanRating, (0.1, 0.5, 1, 1.000001, 5, 9, 10), (1, 3, 10, 20),
+        Sex, IncomeSource, Purpose
+    ))
+
+    def test_compiled_equals_score(self):
+        function = compiled_scorer(DEFAULT_POLICY)
+
+        for row in self.__rows:
+            assert function(*row) == BorrowerScoring(*row).score()
+
+    def test_compiled_for_other_policy(self):
+        data = DEFAULT_POLICY.as_dict()
+        data.update(version='v2', base_rate=13.5)
+        data['LoanRating']['LOW'] = [2, 1.25]
+        data['Sex']['FEMALE'] = 63
+        policy = Policy.from_dict(data)
+        function = compiled_scorer(policy)
+
+        assert compiled_scorer(policy) is function
+        assert compiled_scorer(DEFAULT_POLICY) is not function
+
+        for row in self.__rows:
+            assert function(*row) == Scorer().score(BorrowerRecord(*row), policy)
+
+    def test_score_follows_installed_policy(self):
+        row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        data = DEFAULT_POLICY.as_dict()
+        data.update(version='v2', base_rate=12)
+
+        assert score(*row) == 0.2975
+
+        try:
+            install_policy(Policy.from_dict(data))
+            assert score(*row) == BorrowerScoring(*row).score() != 0.2975
+        finally:
+            install_policy(DEFAULT_POLICY)
+
+    @pytest.mark.parametrize(
+        ('row', 'exception'), [
+            ((-1, 'x', 'x', 11, 0, 'x', 'x', 'x'), InvalidAgeException),
+            ((30, 10, LoanRating.LOW, 11, 0, 'x', 'x', 'x'), InvalidLoanAmountException),
+            ((30, 10, LoanRating.LOW, 1, 5, Sex.MALE, IncomeSource.EMPLOYEE, 'x'), InvalidPurposeException)
+        ]
+    )
+    def test_first_invalid_argument_raises(self, row, exception):
+        with pytest.raises(exception):
+            compiled_scorer(DEFAULT_POLICY)(*row)
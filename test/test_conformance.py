@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from enums import *
+from borrower_scoring import BorrowerRecord
+from batch_scoring import decision_batch, validate_batch
+import conformance
+from conformance import ENGINES, boundary_columns, format_report, run
+
+
+class TestConformance:
+
+    def test_engines_conform(self):
+        report = run(4000, workers=2, chunk_size=1000)
+
+        assert set(report.engines) == set(ENGINES)
+
+        for engine in report.engines.values():
+            assert (engine.rows, engine.mismatches, engine.examples, engine.minimal) == (4000, 0, [], None)
+            assert engine.seconds > 0
+
+        assert 'fixedpoint_batch' in format_report(report)
+
+    def test_boundary_rows_are_valid_and_reach_their_rules(self):
+        columns = boundary_columns(5000, seed=3)
+        reason = decision_batch(**columns).reason
+        kinds = np.arange(5000) % 5
+
+        assert not validate_batch(**columns).any()
+        assert set(columns['loan_amount'][kinds == 0].tolist()) == {0.1, 10}
+        assert set(columns['credit_term'][kinds == 0].tolist()) == {1, 20}
+
+        for kind, rule in ((1, Reason.RETIREMENT_AGE), (2, Reason.THIRD_OF_INCOME),
+                           (3, Reason.AVAILABLE_LOAN_AMOUNT), (4, Reason.HALF_OF_INCOME)):
+            decided = np.bincount(reason[kinds == kind], minlength=len(Reason))
+
+            assert decided[rule] > 0
+            assert decided[Reason.APPROVED if kind > 1 else rule - 1] > 0
+
+    def test_reports_and_shrinks_mismatches(self, monkeypatch):
+        score = conformance._score
+
+        def drifting(name, columns, records):
+            reason, payment = score(name, columns, records)
+
+            # Off by far more than the tolerance from 5 millions on.
+            return reason, np.where(columns['loan_amount'] >= 5, payment * 1.001, payment)
+
+        monkeypatch.setattr(conformance, '_score', drifting)
+        report = run(2000, engines=('batch',), workers=1)
+        engine = report.engines['batch']
+        minimal = BorrowerRecord(*engine.minimal)
+
+        assert 0 < engine.mismatches < 2000
+        assert len(engine.examples) == conformance.DEFAULT_EXAMPLES
+        assert minimal.loan_amount >= 5
+        assert (minimal.age, minimal.sex, minimal.purpose) == (0, Sex.MALE, Purpose.MORTGAGE)
+        assert conformance._fails('batch', engine.minimal)
+        assert 'batch minimal input: age=' in format_report(report)
+
+    def test_shrinks_mismatches_not_depending_on_the_amount(self, monkeypatch):
+        score = conformance._score
+
+        def drifting(name, columns, records):
+            reason, payment = score(name, columns, records)
+
+            return reason, payment * 1.001
+
+        monkeypatch.setattr(conformance, '_score', drifting)
+        row = (45, 17, LoanRating.HIGH, 3.2718, 7, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.CAR_LOAN)
+        minimal = BorrowerRecord(*conformance._shrink('batch', row, conformance.current_policy()))
+
+        assert minimal.loan_amount == 1
+        assert conformance._fails('batch', row)
+        # 1 and 0.1 used to be simpler than each other, so the shrinker could swap them forever.
+        assert conformance._simpler('loan_amount', 0.1) == [1, 10]
+        assert conformance._simpler('loan_amount', 1) == []
+
+    def test_arguments(self):
+        with pytest.raises(ValueError):
+            run(10, engines=('batch', 'decimal'))
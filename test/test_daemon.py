@@ -0,0 +1,174 @@
+import json
+import os
+import signal
+import struct
+import subprocess
+import sys
+import time
+import numpy as np
+import pytest
+from batch_scoring import decide_batch, validate_batch
+from generator import PortfolioGenerator
+from rate_table import DEFAULT_POLICY
+from portfolio import SCORE_DTYPE, records_from_columns
+from enums import *
+from daemon import DaemonClient
+import daemon_client
+
+
+CSV = (
+    b'age,income_amount,loan_rating,loan_amount,credit_term,sex,income_source,purpose\n'
+    b'35,10,HIGH,3,10,MALE,EMPLOYEE,MORTGAGE\n'
+    b'70,10,HIGH,3,10,MALE,EMPLOYEE,MORTGAGE\n'
+)
+
+JSONL = (
+    b'{"age": 35, "income_amount": 10, "loan_rating": "HIGH", "loan_amount": 3, "credit_term": 10, '
+    b'"sex": "MALE", "income_source": "EMPLOYEE", "purpose": "MORTGAGE"}\n'
+)
+
+
+@pytest.fixture
+def scoring_daemon(tmpdir):
+    """Starts a daemon of two workers answering three requests each, yields (socket path, policy path, process)."""
+    path = str(tmpdir.join('scoring.sock'))
+    policy_path = str(tmpdir.join('policy.json'))
+
+    with open(policy_path, 'w') as stream:
+        json.dump(DEFAULT_POLICY.as_dict(), stream)
+
+    process = subprocess.Popen([
+        sys.executable, '-m', 'borrower_scoring', 'daemon', '--socket', path, '--workers', '2',
+        '--max-requests', '3', '--policy', policy_path
+    ], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    deadline = time.monotonic() + 30
+
+    while not os.path.exists(path):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.01)
+
+    yield path, policy_path, process
+
+    if process.poll() is None:
+        process.terminate()
+        process.wait(30)
+
+
+class TestDaemon:
+
+    def test_decide_matches_decide_batch_across_recycled_workers(self, scoring_daemon):
+        path, _, _ = scoring_daemon
+        columns = PortfolioGenerator(seed=4, invalid={'age': 0.1, 'purpose': 0.1}).columns(1000)
+        expected_payment, expected_reason = decide_batch(**columns, errors=validate_batch(**columns))
+
+        with DaemonClient(path) as client:
+            # More requests than two workers answer before they are replaced.
+            for _ in range(10):
+                payment, reason, policy_version = client.decide(columns)
+
+                assert np.array_equal(payment, expected_payment, equal_nan=True)
+                assert np.array_equal(reason, expected_reason)
+                assert policy_version == 'builtin'
+
+    def test_text_matches_the_score_command(self, scoring_daemon, tmpdir):
+        path, _, _ = scoring_daemon
+        applications = tmpdir.join('applications.csv')
+        applications.write_binary(CSV)
+        output = tmpdir.join('decisions.csv')
+        expected = subprocess.run(
+            [sys.executable, '-m', 'borrower_scoring', 'score', str(applications)], stdout=subprocess.PIPE, check=True
+        ).stdout
+
+        assert daemon_client.main([str(applications), '-o', str(output), '--socket', path]) == 0
+        assert output.read_binary() == expected
+        assert daemon_client.score_text(JSONL, 'jsonl', path) == DaemonClient(path).score_text(JSONL, 'jsonl')
+        assert b'"reason": "APPROVED"' in daemon_client.score_text(JSONL, 'jsonl', path)
+
+    def test_bad_requests(self, scoring_daemon):
+        path, _, _ = scoring_daemon
+
+        with DaemonClient(path) as client:
+            with pytest.raises(ValueError, match='line 2'):
+                client.score_text(CSV.replace(b'35', b'\xff'))
+
+            # Incomplete rows and lines that are not objects are INVALID, not the end of the request.
+            assert client.score_text(b'age\nx\n') == b'id,payment,reason,errors,policy_version\r\n1,,INVALID,' + (
+                b'InvalidAgeException InvalidIncomeAmountException InvalidLoanRatingException InvalidLoanAmountException '
+                b'InvalidCreditTermException InvalidSexException InvalidIncomeSourceException InvalidPurposeException,'
+                b'builtin\r\n'
+            )
+            assert [json.loads(line)['reason'] for line in client.score_text(b'[1]\n' + JSONL, 'jsonl').splitlines()] == [
+                'INVALID', 'APPROVED'
+            ]
+            # Too large for a float, the row is INVALID and the worker lives on.
+            huge = JSONL.replace(b'"age": 35', b'"age": 1' + b'0' * 400)
+            assert json.loads(client.score_text(huge, 'jsonl'))['reason'] == 'INVALID'
+
+            # The connection stays usable.
+            assert client.score_text(CSV).count(b'\n') == 3
+
+        with pytest.raises(ValueError, match='records must be'):
+            daemon_client.response_body(_raw_request(path, bytes((daemon_client.DECIDE,)) + b'abc'))
+
+        records = records_from_columns(dict(
+            age=[30, 30], income_amount=[10, 10], loan_rating=[0, 0], loan_amount=[1, 1], credit_term=[5, 5],
+            sex=[1, 1], income_source=[2, 2], purpose=[0, 0]
+        ))
+        records['loan_amount'][0] = np.nan
+        records['loan_rating'][1] = -1
+        body = daemon_client.response_body(_raw_request(path, bytes((daemon_client.DECIDE,)) + records.tobytes()))
+
+        # Records the client marked valid are validated again.
+        version_length, = struct.unpack_from('>H', body)
+
+        assert np.frombuffer(body, dtype=SCORE_DTYPE, offset=2 + version_length)['reason'].tolist() == [
+            Reason.INVALID, Reason.INVALID
+        ]
+
+        with pytest.raises(ValueError, match='unknown operation'):
+            daemon_client.response_body(_raw_request(path, b'\x09'))
+
+    def test_overflow_is_a_bad_request(self, monkeypatch):
+        import daemon
+
+        def overflow(payload):
+            raise OverflowError('int too large to convert to float')
+
+        monkeypatch.setattr(daemon, '_score_text', overflow)
+
+        assert daemon._answer(bytes((daemon_client.SCORE_TEXT, 0)) + CSV)[0] == daemon_client.BAD_REQUEST
+
+    def test_client_reports_missing_input(self, tmpdir, capsys):
+        missing = str(tmpdir.join('missing.csv'))
+
+        assert daemon_client.main([missing, '--socket', str(tmpdir.join('scoring.sock'))]) == 2
+        assert capsys.readouterr().err.startswith('borrower_scoring: ')
+
+    def test_reloads_policy_on_sighup_and_stops_on_sigterm(self, scoring_daemon):
+        path, policy_path, process = scoring_daemon
+        data = dict(DEFAULT_POLICY.as_dict(), version='v2')
+
+        with open(policy_path, 'w') as stream:
+            json.dump(data, stream)
+
+        process.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 30
+
+        while b',v2\r\n' not in daemon_client.score_text(CSV, 'csv', path):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        process.send_signal(signal.SIGTERM)
+
+        assert process.wait(30) == 0
+        assert not os.path.exists(path)
+
+
+def _raw_request(path, payload):
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        daemon_client.send_frame(connection, payload)
+
+        return daemon_client.receive_frame(connection)
@@ -0,0 +1,105 @@
+import decimal
+import itertools
+import math
+import numpy as np
+import pytest
+from enums import *
+from borrower_scoring import BorrowerRecord, Scorer
+from rate_table import DEFAULT_POLICY
+from fixedpoint import MINOR_UNITS, MISSING, FixedPointScorer, decision_batch, log_basis_points, to_minor
+
+
+FIELDS = ('age', 'income_amount', 'loan_rating', 'loan_amount', 'credit_term', 'sex', 'income_source', 'purpose')
+
+
+def minor_columns(records):
+    columns = {field: [getattr(record, field) for record in records] for field in FIELDS}
+
+    for field in ('loan_rating', 'sex', 'income_source', 'purpose'):
+        columns[field] = np.array([member.code for member in columns[field]], dtype=np.int8)
+
+    columns['income_amount'] = np.array(columns['income_amount'], dtype=np.int64) * MINOR_UNITS
+    columns['loan_amount'] = to_minor(np.array(columns['loan_amount']))
+
+    return columns
+
+
+class TestFixedPoint:
+
+    __records = [BorrowerRecord(*row) for row in itertools.product(
+        (25, 55), (1, 5, 16), LoanRating, (0.1, 0.3, 1, 2.5, 10), (1, 10, 20), Sex, IncomeSource, (Purpose.MORTGAGE, Purpose.LOAN)
+    )]
+
+    def test_exact_payment(self):
+        record = BorrowerRecord(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+
+        assert FixedPointScorer().decide(record) == (Reason.APPROVED, 29750000, 975)
+        assert FixedPointScorer().score(record) == 29750000
+        assert Scorer().score(record) == pytest.approx(0.2975)
+
+    @pytest.mark.parametrize('amount, points', [
+        (10 ** 7, -100), (10 ** 8, 0), (10 ** 9, 100), (300000000, 48), (299999999, 48), (29000000, -54)
+    ])
+    def test_log_basis_points(self, amount, points):
+        assert log_basis_points(amount) == points
+        assert log_basis_points(np.array([amount])).tolist() == [points]
+
+    def test_log_basis_points_bounds(self):
+        context = decimal.Context(prec=40)
+
+        for points in range(-99, 101):
+            bound = context.multiply(MINOR_UNITS, context.power(10, (decimal.Decimal(points) - decimal.Decimal('0.5')) / 100))
+            below, above = math.floor(bound), math.ceil(bound)
+
+            assert log_basis_points(below) == points - 1
+            assert log_basis_points(above) == points
+            assert log_basis_points(np.array([below, above])).tolist() == [points - 1, points]
+
+    @pytest.mark.parametrize('amount, expected', [(0.295, 29500000), (0.29500000000000004, 29500000), (10, 10 ** 9)])
+    def test_to_minor(self, amount, expected):
+        assert to_minor(amount) == expected
+        assert to_minor(np.array([amount])).tolist() == [expected]
+
+    def test_decisions_match_the_float_engine(self):
+        scorer = Scorer()
+        fixed = FixedPointScorer()
+
+        for record in self.__records:
+            decision = scorer.decide(record)
+            fixed_decision = fixed.decide(record)
+
+            assert fixed_decision.reason == decision.reason
+
+            if decision.payment is not None:
+                # The rate differs by at most half a basis point of the loan.
+                assert abs(fixed_decision.payment - decision.payment * MINOR_UNITS) <= record.loan_amount * MINOR_UNITS / 20000 + 1
+
+    def test_batch_matches_scalar(self):
+        fixed = FixedPointScorer()
+        columns = minor_columns(self.__records)
+        errors = np.zeros(len(self.__records), dtype=np.uint8)
+        errors[::7] = 1
+        batch = decision_batch(**columns, errors=errors, policy=DEFAULT_POLICY)
+
+        assert batch.payment.dtype == batch.rate.dtype == np.int64
+
+        for i, record in enumerate(self.__records):
+            if errors[i]:
+                assert (batch.reason[i], batch.payment[i], batch.rate[i]) == (Reason.INVALID, MISSING, MISSING)
+                continue
+
+            decision = fixed.decide(record)
+
+            assert batch.reason[i] == decision.reason
+            assert batch.payment[i] == (MISSING if decision.payment is None else decision.payment)
+            assert batch.rate[i] == (MISSING if decision.rate is None else decision.rate)
+
+    def test_half_income_bound_is_exact(self):
+        # Payment 0.1975 millions: approved at exactly twice it as income in kopecks.
+        record = BorrowerRecord(30, 1, LoanRating.LOW, 1, 10, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        columns = minor_columns([record])
+
+        for income, reason in ((39500000, Reason.APPROVED), (39499999, Reason.HALF_OF_INCOME)):
+            columns['income_amount'] = np.array([income])
+
+            assert decision_batch(**columns).reason.tolist() == [reason]
@@ -0,0 +1,90 @@
+import itertools
+import math
+import numpy as np
+import pytest
+from enums import *
+from borrower_scoring import BorrowerScoring
+from frontier import *
+from test import code_columns
+
+
+class TestFrontier:
+
+    __ages = (20, 45, 58)
+    __credit_terms = (1, 3, 10, 20)
+
+    @pytest.mark.parametrize(
+        ('testdata', 'expected'), [
+            ((30, 10, LoanRating.HIGH, 5, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+             Reason.AVAILABLE_LOAN_AMOUNT),
+            ((30, 10, LoanRating.HIGH, 5, Sex.MALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             Reason.AVAILABLE_LOAN_AMOUNT),
+            ((30, 1, LoanRating.HIGH, 1, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE), Reason.THIRD_OF_INCOME),
+            ((30, 2, LoanRating.NORMAL, 20, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.LOAN), Reason.HALF_OF_INCOME)
+        ]
+    )
+    def test_max_loan_amount_is_approval_frontier(self, testdata, expected):
+        age, income_amount, loan_rating, credit_term, sex, income_source, purpose = testdata
+        loan_amount, reason = max_loan_amount(*testdata)
+
+        assert reason == expected
+        assert self.__exec_score(age, income_amount, loan_rating, loan_amount, credit_term, sex, income_source,
+                                 purpose) is not None
+
+        if loan_amount < MAX_LOAN_AMOUNT:
+            above = float(np.nextafter(loan_amount, math.inf))
+            assert self.__exec_score(age, income_amount, loan_rating, above, credit_term, sex, income_source,
+                                     purpose) is None
+
+    @pytest.mark.parametrize(
+        ('testdata', 'expected'), [
+            ((30, 10, LoanRating.HIGH, 5, Sex.MALE, IncomeSource.UNEMPLOYED, Purpose.MORTGAGE),
+             Reason.UNRELIABLE_BORROWER),
+            ((30, 10, LoanRating.PROHIBITED, 5, Sex.MALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             Reason.LOAN_RATING_PROHIBITED),
+            ((Sex.FEMALE.value, 10, LoanRating.HIGH, 1, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             Reason.RETIREMENT_AGE)
+        ]
+    )
+    def test_max_loan_amount_rejected_for_every_amount(self, testdata, expected):
+        assert max_loan_amount(*testdata) == (None, expected)
+
+    @pytest.mark.parametrize(
+        ('testdata', 'expected'), [
+            ((25, LoanRating.HIGH, 9, 3, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+             (9, Reason.THIRD_OF_INCOME)),
+            ((25, LoanRating.HIGH, 0.1, 20, Sex.FEMALE, IncomeSource.PASSIVE, Purpose.MORTGAGE), (1, Reason.APPROVED)),
+            ((25, LoanRating.HIGH, 5, 20, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             (2, Reason.HALF_OF_INCOME)),
+            ((25, LoanRating.LOW, 5, 20, Sex.FEMALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE),
+             (None, Reason.AVAILABLE_LOAN_AMOUNT))
+        ]
+    )
+    def test_min_income_amount(self, testdata, expected):
+        assert min_income_amount(*testdata) == expected
+
+    def test_batch_equals_scalar(self):
+        rows = list(itertools.product(
+            self.__ages, (1, 2, 5, 16), LoanRating, self.__credit_terms, Sex, IncomeSource, Purpose
+        ))
+        expected = [max_loan_amount(*row) for row in rows]
+
+        loan_amount, reason = max_loan_amount_batch(*code_columns(rows))
+
+        assert np.array_equal(loan_amount, [math.nan if amount is None else amount for amount, _ in expected],
+                              equal_nan=True)
+        assert reason.tolist() == [rule for _, rule in expected]
+
+        rows = list(itertools.product(
+            self.__ages, LoanRating, (0.1, 1, 4.5, 10), self.__credit_terms, Sex, IncomeSource, Purpose
+        ))
+        expected = [min_income_amount(*row) for row in rows]
+
+        income_amount, reason = min_income_amount_batch(*code_columns(rows))
+
+        assert np.array_equal(income_amount, [math.nan if amount is None else amount for amount, _ in expected],
+                              equal_nan=True)
+        assert reason.tolist() == [rule for _, rule in expected]
+
+    def __exec_score(self, *args):
+        return BorrowerScoring(*args).score()
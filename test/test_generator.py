@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from enums import *
+from batch_scoring import FIELDS, VALIDATION_ERRORS, validate_batch, validation_errors
+from generator import PortfolioGenerator
+
+
+class TestPortfolioGenerator:
+
+    def test_rows_are_valid_by_default(self):
+        columns = PortfolioGenerator(seed=1).columns(100000)
+
+        assert tuple(columns) == FIELDS
+        assert not validate_batch(**columns).any()
+        assert np.unique(columns['purpose']).tolist() == [purpose.code for purpose in Purpose]
+
+    def test_same_seed_and_chunk_size_give_same_rows(self):
+        first = list(PortfolioGenerator(seed=7).chunks(2500, chunk_size=1000))
+        second = list(PortfolioGenerator(seed=7).chunks(2500, chunk_size=1000))
+        other = list(PortfolioGenerator(seed=8).chunks(2500, chunk_size=1000))
+
+        assert [len(chunk['age']) for chunk in first] == [1000, 1000, 500]
+
+        for a, b, c in zip(first, second, other):
+            assert all(np.array_equal(a[field], b[field]) for field in FIELDS)
+            assert not np.array_equal(a['loan_amount'], c['loan_amount'])
+
+    def test_distributions(self):
+        columns = PortfolioGenerator(
+            age=(30, 31),
+            loan_amount=lambda random, size: np.full(size, 2.5),
+            sex={Sex.MALE: 1},
+            purpose={Purpose.MORTGAGE: 3, Purpose.LOAN: 1}
+        ).columns(40000)
+
+        assert (columns['age'] == 30).all()
+        assert (columns['loan_amount'] == 2.5).all()
+        assert (columns['sex'] == Sex.MALE.code).all()
+        assert np.isin(columns['purpose'], [Purpose.MORTGAGE.code, Purpose.LOAN.code]).all()
+        assert (columns['purpose'] == Purpose.MORTGAGE.code).mean() == pytest.approx(0.75, abs=0.01)
+
+    @pytest.mark.parametrize('bit, field', list(enumerate(FIELDS)))
+    def test_invalid_rows_fail_one_rule(self, bit, field):
+        errors = validate_batch(**PortfolioGenerator(invalid={field: 0.1}).columns(10000))
+
+        assert np.count_nonzero(errors) == 1000
+        assert validation_errors(errors.max()) == (VALIDATION_ERRORS[bit],)
+
+    @pytest.mark.parametrize(
+        'arguments', [
+            {'invalid': {'name': 0.1}},
+            {'invalid': {'age': 1.5}},
+            {'sex': {LoanRating.LOW: 1}},
+            {'sex': {Sex.MALE: 0}},
+            {'height': (1, 2)}
+        ]
+    )
+    def test_wrong_arguments(self, arguments):
+        with pytest.raises(ValueError):
+            PortfolioGenerator(**arguments)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from enums import *
+from batch_scoring import decide_batch, validate_batch
+from generator import PortfolioGenerator
+from rate_table import DEFAULT_POLICY, Policy, POLICY_ENUMS
+from incremental import ScoringState
+
+
+def _policy(version, base_rate=10, changes=()):
+    values = {enum: dict(DEFAULT_POLICY.values[enum]) for enum in POLICY_ENUMS}
+
+    for member, value in changes:
+        values[type(member)][member] = value
+
+    return Policy(version, base_rate, values)
+
+
+class TestScoringState:
+
+    __columns = PortfolioGenerator(seed=4, invalid={'age': 0.01, 'purpose': 0.01}).columns(50000)
+
+    __policies = [
+        _policy('base rate', base_rate=12),
+        _policy('retirement age', changes=[(Sex.MALE, 60)]),
+        _policy('loan rating', changes=[(LoanRating.LOW, (2, 1.5))]),
+        _policy('purpose', changes=[(Purpose.CAR_LOAN, 3)]),
+        _policy('income source', changes=[(IncomeSource.EMPLOYEE, (5, -2))]),
+        DEFAULT_POLICY
+    ]
+
+    def test_initial_decisions_equal_decide_batch(self):
+        self.__assert_decisions(ScoringState.from_columns(self.__columns), DEFAULT_POLICY)
+
+    def test_rescore_equals_decide_batch(self):
+        state = ScoringState.from_columns(self.__columns)
+
+        for policy in self.__policies:
+            old_payment, old_reason = state.decisions()
+            report = state.rescore(policy)
+            payment, reason = self.__assert_decisions(state, policy)
+            changed = reason != old_reason
+
+            assert state.policy is policy
+            assert report.rows == 50000
+            assert report.decisions_changed == changed.sum()
+            assert report.payments_changed == (~changed & (reason == Reason.APPROVED) & (payment != old_payment)).sum()
+
+    @pytest.mark.parametrize('policy, rescored', [
+        (DEFAULT_POLICY, lambda columns, eligible: np.zeros(len(eligible), dtype=bool)),
+        (_policy('purpose', changes=[(Purpose.CAR_LOAN, 3)]),
+         lambda columns, eligible: eligible & (columns['purpose'] == Purpose.CAR_LOAN.code)),
+        (_policy('retirement age', changes=[(Sex.FEMALE, 50)]),
+         lambda columns, eligible: (validate_batch(**columns) == 0) & (columns['sex'] == Sex.FEMALE.code))
+    ])
+    def test_only_affected_rows_are_rescored(self, policy, rescored):
+        state = ScoringState.from_columns(self.__columns)
+        _, reason = state.decisions()
+        eligible = (reason == Reason.APPROVED) | (reason == Reason.HALF_OF_INCOME)
+
+        assert state.rescore(policy).rescored == rescored(self.__columns, eligible).sum()
+
+    def test_rows_approved_again_get_a_payment(self):
+        state = ScoringState.from_columns(self.__columns)
+
+        state.rescore(_policy('young', base_rate=11, changes=[(Sex.MALE, 20), (Sex.FEMALE, 20)]))
+        state.rescore(_policy('old', base_rate=11))
+
+        self.__assert_decisions(state, _policy('old', base_rate=11))
+
+    def test_save_and_load(self, tmp_path):
+        state = ScoringState.from_columns(self.__columns)
+        state.rescore(self.__policies[0])
+        state.save(str(tmp_path / 'state.npz'))
+
+        loaded = ScoringState.load(str(tmp_path / 'state.npz'))
+
+        assert len(loaded) == 50000
+        assert loaded.policy.as_dict() == self.__policies[0].as_dict()
+
+        loaded.rescore(self.__policies[1])
+        self.__assert_decisions(loaded, self.__policies[1])
+
+    def __assert_decisions(self, state, policy):
+        expected_payment, expected_reason = decide_batch(
+            **self.__columns, errors=validate_batch(**self.__columns), policy=policy
+        )
+        payment, reason = state.decisions()
+
+        assert np.array_equal(payment, expected_payment, equal_nan=True)
+        assert np.array_equal(reason, expected_reason)
+
+        return payment, reason
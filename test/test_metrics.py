@@ -0,0 +1,152 @@
+import asyncio
+import numpy as np
+import pytest
+import audit
+import metrics
+from enums import *
+from borrower_scoring import BorrowerScoring
+from batch_scoring import decide_batch, score_batch, validate_batch
+from generator import PortfolioGenerator
+from metrics import Histogram
+from service import ScoringService
+from cli import main
+
+
+@pytest.fixture
+def instruments():
+    yield metrics.enable()
+    metrics.disable()
+
+
+class TestMetrics:
+
+    __columns = PortfolioGenerator(seed=6, invalid={'credit_term': 0.02}).columns(3000)
+
+    @pytest.mark.parametrize('method', ['score', 'decide'])
+    def test_scalar_decisions_match_decide_batch(self, instruments, method):
+        errors = validate_batch(**self.__columns)
+        _, reason = decide_batch(**self.__columns, errors=errors)
+        expected = np.bincount(reason, minlength=len(Reason)).tolist()
+        invalid = expected[Reason.INVALID]
+        expected[Reason.INVALID] = 0
+
+        for row in np.flatnonzero(errors == 0).tolist():
+            getattr(BorrowerScoring(*self.__row(row)), method)()
+
+        assert instruments.decisions['scalar'] == expected
+        assert instruments.scoring_seconds['scalar'].count == 3000 - invalid
+        assert instruments.validation_seconds['scalar'].count == 3000 - invalid
+
+    def test_audited_decide_is_counted(self, instruments, tmp_path):
+        row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        audit.enable(str(tmp_path))
+
+        try:
+            BorrowerScoring(*row).decide()
+        finally:
+            audit.disable()
+
+        assert instruments.decisions['scalar'][Reason.APPROVED] == 1
+
+    def test_batch_decisions(self, instruments):
+        errors = validate_batch(**self.__columns)
+        _, reason = decide_batch(**self.__columns, errors=errors)
+        payment = score_batch(**self.__columns, errors=errors)
+
+        assert np.isnan(payment).sum() == (reason != Reason.APPROVED).sum()
+        assert instruments.decisions['batch'] == (2 * np.bincount(reason, minlength=len(Reason))).tolist()
+        assert instruments.scoring_seconds['batch'].count == 2
+        assert instruments.validation_seconds['batch'].count == 1
+        assert instruments.decisions['scalar'] == [0] * len(Reason)
+
+    def test_disabled_records_nothing(self):
+        assert metrics.active is None
+        assert BorrowerScoring(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score() == 0.2975
+
+    def test_prometheus(self, instruments):
+        BorrowerScoring(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score()
+        BorrowerScoring(60, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE).score()
+        lines = instruments.prometheus().splitlines()
+
+        assert '# TYPE borrower_scoring_decisions_total counter' in lines
+        assert 'borrower_scoring_decisions_total{path="scalar",reason="APPROVED"} 1' in lines
+        assert 'borrower_scoring_decisions_total{path="scalar",reason="RETIREMENT_AGE"} 1' in lines
+        assert 'borrower_scoring_decisions_total{path="batch",reason="APPROVED"} 0' in lines
+        assert '# TYPE borrower_scoring_scoring_seconds histogram' in lines
+        assert 'borrower_scoring_scoring_seconds_bucket{path="scalar",le="+Inf"} 2' in lines
+        assert 'borrower_scoring_validation_seconds_count{path="scalar"} 2' in lines
+
+    def test_histogram(self):
+        histogram = Histogram((1, 2))
+
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe(value)
+
+        assert histogram.prometheus('x', 'path="a"') == [
+            'x_bucket{path="a",le="1"} 2',
+            'x_bucket{path="a",le="2"} 3',
+            'x_bucket{path="a",le="+Inf"} 4',
+            'x_sum{path="a"} 6.0',
+            'x_count{path="a"} 4'
+        ]
+
+    def test_cli_metrics_file(self, tmp_path):
+        source = tmp_path / 'applications.csv'
+        source.write_text(
+            'age,income_amount,loan_rating,loan_amount,credit_term,sex,income_source,purpose\n'
+            '30,10,LOW,1,5,FEMALE,BUSINESSMAN,MORTGAGE\n'
+            '30,10,LOW,1,5,FEMALE,UNEMPLOYED,MORTGAGE\n'
+        )
+
+        assert main([
+            'score', str(source), '-o', str(tmp_path / 'decisions.csv'), '--metrics-file', str(tmp_path / 'scoring.prom')
+        ]) == 0
+
+        lines = (tmp_path / 'scoring.prom').read_text().splitlines()
+
+        assert metrics.active is None
+        assert 'borrower_scoring_decisions_total{path="batch",reason="APPROVED"} 1' in lines
+        assert 'borrower_scoring_decisions_total{path="batch",reason="UNRELIABLE_BORROWER"} 1' in lines
+
+    @pytest.mark.parametrize('enabled, status', [(True, 200), (False, 404)])
+    def test_http_endpoint(self, enabled, status):
+        async def scenario():
+            service = ScoringService(max_batch_size=8, max_wait=0.001)
+            server = await service.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /metrics HTTP/1.1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            response = await reader.read()
+            writer.close()
+            await service.stop(server)
+
+            return response
+
+        if enabled:
+            metrics.enable()
+
+        try:
+            head, _, content = asyncio.run(scenario()).partition(b'\r\n\r\n')
+        finally:
+            metrics.disable()
+
+        assert int(head.split()[1]) == status
+
+        if enabled:
+            assert b'Content-Type: text/plain; version=0.0.4' in head
+            assert content.startswith(b'# HELP borrower_scoring_decisions_total')
+
+    def __row(self, row):
+        columns = self.__columns
+
+        return (
+            int(columns['age'][row]),
+            int(columns['income_amount'][row]),
+            list(LoanRating)[columns['loan_rating'][row]],
+            float(columns['loan_amount'][row]),
+            int(columns['credit_term'][row]),
+            list(Sex)[columns['sex'][row]],
+            list(IncomeSource)[columns['income_source'][row]],
+            list(Purpose)[columns['purpose'][row]]
+        )
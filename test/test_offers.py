@@ -0,0 +1,126 @@
+import itertools
+import math
+import numpy as np
+import pytest
+from enums import *
+from exceptions import *
+from borrower_scoring import BorrowerRecord, BorrowerScoring
+from batch_scoring import decide_batch
+from offers import offer_matrix, counter_offers
+from rate_table import DEFAULT_POLICY, Policy
+
+
+class TestOfferMatrix:
+
+    __amounts = (0.1, 0.5, 1, 1.000001, 2.5, 3, 5, 7.25, 9, 10)
+
+    @pytest.mark.parametrize(
+        'age, income_amount, loan_rating, sex, income_source, purpose',
+        list(itertools.product((25, 50), (1, 4, 16), LoanRating, Sex, IncomeSource, (Purpose.MORTGAGE, Purpose.LOAN)))
+    )
+    def test_matrix_equals_score(self, age, income_amount, loan_rating, sex, income_source, purpose):
+        arguments = (age, income_amount, loan_rating, 1, 1, sex, income_source, purpose)
+        payment, reason = offer_matrix(BorrowerRecord(*arguments), self.__amounts)
+
+        assert payment.shape == reason.shape == (20, len(self.__amounts))
+
+        for (i, term), (j, amount) in itertools.product(enumerate(range(1, 21)), enumerate(self.__amounts)):
+            expected = BorrowerScoring(age, income_amount, loan_rating, amount, term, sex, income_source, purpose).score()
+
+            if expected is None:
+                assert math.isnan(payment[i, j]) and reason[i, j] != Reason.APPROVED
+            else:
+                assert payment[i, j] == expected and reason[i, j] == Reason.APPROVED
+
+    def test_reasons_equal_decide_batch(self):
+        rows = list(itertools.product((25, 50), (1, 4, 16), LoanRating, Sex, IncomeSource, Purpose))
+
+        for age, income_amount, loan_rating, sex, income_source, purpose in rows:
+            borrower = BorrowerRecord(age, income_amount, loan_rating, 1, 1, sex, income_source, purpose)
+            _, reason = offer_matrix(borrower, self.__amounts)
+            terms, amounts = np.meshgrid(range(1, 21), self.__amounts, indexing='ij')
+            size = terms.size
+
+            _, expected = decide_batch(
+                np.full(size, age), np.full(size, income_amount), np.full(size, loan_rating.code), amounts.ravel(),
+                terms.ravel(), np.full(size, sex.code), np.full(size, income_source.code), np.full(size, purpose.code)
+            )
+
+            assert reason.ravel().tolist() == expected.tolist()
+
+    @pytest.mark.parametrize(
+        ('amounts', 'terms', 'exception'), [
+            ([0.05, 1], range(1, 21), InvalidLoanAmountException),
+            ([1, 10.5], range(1, 21), InvalidLoanAmountException),
+            ([1], [0, 1], InvalidCreditTermException),
+            ([1], [1.5], InvalidCreditTermException)
+        ]
+    )
+    def test_invalid_grid(self, amounts, terms, exception):
+        borrower = BorrowerRecord(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+
+        with pytest.raises(exception):
+            offer_matrix(borrower, amounts, terms)
+
+
+class TestCounterOffers:
+
+    __rows = list(itertools.product(
+        (25, 50), (1, 3, 16), (LoanRating.LOW, LoanRating.HIGH), (0.5, 5, 9), (2, 10), Sex,
+        (IncomeSource.PASSIVE, IncomeSource.BUSINESSMAN), (Purpose.MORTGAGE, Purpose.LOAN)
+    ))
+
+    @pytest.mark.parametrize('order', ['closest', 'payment'])
+    def test_one_best_offer_per_approvable_term(self, order):
+        for row in self.__rows:
+            borrower = BorrowerRecord(*row)
+            offers = counter_offers(borrower, k=20, order=order, budget=1)
+            payment, _ = offer_matrix(borrower, [0.1])
+
+            assert sorted(offer.credit_term for offer in offers) == [
+                term for term in range(1, 21) if not math.isnan(payment[term - 1, 0])
+            ]
+
+            for offer in offers:
+                assert BorrowerScoring(*self.__with(row, offer.loan_amount, offer.credit_term)).score() == offer.payment
+
+                if offer.loan_amount < row[3]:
+                    larger = self.__with(row, float(np.nextafter(offer.loan_amount, 10)), offer.credit_term)
+                    assert BorrowerScoring(*larger).score() is None
+
+            if order == 'payment':
+                assert [offer.payment for offer in offers] == sorted(offer.payment for offer in offers)
+
+            assert counter_offers(borrower, k=3, order=order, budget=1) == offers[:3]
+
+    def test_approved_request_is_the_closest_offer(self):
+        row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+
+        assert counter_offers(BorrowerRecord(*row), k=1) == [(1, 5, BorrowerScoring(*row).score())]
+
+    @pytest.mark.parametrize(
+        'row', [
+            (30, 10, LoanRating.PROHIBITED, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE),
+            (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.UNEMPLOYED, Purpose.MORTGAGE),
+            (Sex.MALE.value, 10, LoanRating.LOW, 1, 5, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        ]
+    )
+    def test_no_offers(self, row):
+        assert counter_offers(BorrowerRecord(*row)) == []
+
+    def test_float_retirement_age(self):
+        borrower = BorrowerRecord(50, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+        policies = [Policy.from_dict(dict(DEFAULT_POLICY.as_dict(), Sex={'MALE': 65, 'FEMALE': age})) for age in (57.5, 57)]
+        offers, expected = (counter_offers(borrower, k=20, budget=1, policy=policy) for policy in policies)
+
+        assert offers == expected
+        assert max(offer.credit_term for offer in offers) == 7
+
+    def test_unknown_order(self):
+        borrower = BorrowerRecord(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+
+        with pytest.raises(ValueError):
+            counter_offers(borrower, order='amount')
+
+    def __with(self, row, loan_amount, credit_term):
+        return row[:3] + (loan_amount, credit_term) + row[5:]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from batch_scoring import score_batch, validate_batch
+from parallel import ParallelScorer
+
+
+class TestParallelScorer:
+
+    @pytest.mark.parametrize('rows', [0, 1, 1000, 2503])
+    def test_parallel_equals_batch(self, rows):
+        random = np.random.default_rng(rows)
+        columns = (
+            random.integers(0, 70, rows),
+            random.integers(1, 20, rows),
+            random.integers(0, 5, rows),
+            random.uniform(0.1, 10, rows),
+            random.integers(1, 21, rows),
+            random.integers(0, 2, rows),
+            random.integers(0, 4, rows),
+            random.integers(0, 4, rows)
+        )
+
+        with ParallelScorer(workers=2, chunk_size=300) as scorer:
+            payment = scorer.score(*columns)
+
+        assert np.array_equal(payment, score_batch(*columns), equal_nan=True)
+
+    def test_inputs_are_not_truncated(self):
+        columns = (
+            np.array([64.5, 30, 30, 30]),
+            np.array([10, 10, 10, 10]),
+            np.array([1, 1, 1, 257]),
+            np.array([1, 1, 1, 1]),
+            np.array([1, 2.5, 5, 5]),
+            np.array([0, 0, 0, 0]),
+            np.array([2, 2, 2, 2]),
+            np.array([0, 0, 0, 0])
+        )
+        errors = validate_batch(*columns)
+
+        with ParallelScorer(workers=2, chunk_size=1) as scorer:
+            payment = scorer.score(*(column[:3] for column in columns))
+            validated = scorer.score(*columns, errors=errors)
+
+        assert np.array_equal(payment, score_batch(*(column[:3] for column in columns)), equal_nan=True)
+        assert np.isnan(payment).tolist() == [True, False, False]
+        assert np.array_equal(validated, score_batch(*columns, errors=errors), equal_nan=True)
+        assert np.isnan(validated).tolist() == [True, True, False, True]
+
+    def test_chunk_size_must_be_positive(self):
+        with pytest.raises(ValueError):
+            ParallelScorer(workers=1, chunk_size=0)
@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import json
+import math
+import numpy as np
+import pytest
+from enums import *
+from rate_table import DEFAULT_POLICY, FIXED_RATE, Policy, current_policy, install_policy
+from borrower_scoring import BorrowerRecord, BorrowerScoring, Scorer
+from batch_scoring import score_batch
+from cache import ScoringCache
+from cli import main
+from service import ScoringService
+from test import code_columns
+
+
+class TestPolicy:
+
+    __row = (30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE)
+
+    @pytest.fixture(autouse=True)
+    def restore_default_policy(self):
+        yield
+        install_policy(DEFAULT_POLICY)
+
+    def test_default_policy_round_trips(self):
+        policy = Policy.from_dict(json.loads(json.dumps(DEFAULT_POLICY.as_dict())))
+
+        assert policy.fixed_rate == DEFAULT_POLICY.fixed_rate == FIXED_RATE
+        assert policy.available_loan_amount == DEFAULT_POLICY.available_loan_amount
+        assert policy.retirement_age == (Sex.MALE.value, Sex.FEMALE.value)
+
+    @pytest.mark.parametrize(
+        'change', [
+            lambda data: data.pop('base_rate'),
+            lambda data: data['Sex'].pop('MALE'),
+            lambda data: data['Sex'].update(OTHER=70),
+            lambda data: data['LoanRating'].update(LOW=[1]),
+            lambda data: data['Purpose'].update(LOAN=[1.5]),
+            lambda data: data.update(base_rate='10'),
+            lambda data: data.update(base_rate=float('inf')),
+            lambda data: data['Purpose'].update(LOAN=float('nan')),
+            lambda data: data['LoanRating'].update(LOW=['1', 1])
+        ]
+    )
+    def test_broken_policy_fails(self, change):
+        data = DEFAULT_POLICY.as_dict()
+        change(data)
+
+        with pytest.raises(ValueError):
+            Policy.from_dict(data)
+
+    def test_installed_policy_is_used_everywhere(self):
+        policy = self.__policy('v2', base_rate=12, MALE=70)
+        rows = list(itertools.product(
+            (25, 55, 62), (1, 5, 16), LoanRating, (0.1, 1, 5, 10), (1, 8, 20), Sex, IncomeSource, Purpose
+        ))
+        cache = ScoringCache()
+        cache.score(*self.__row)
+
+        install_policy(policy)
+
+        expected = [Scorer().score(BorrowerRecord(*row), policy) for row in rows]
+        actual = score_batch(*code_columns(rows))
+
+        assert current_policy() is policy
+        assert len(cache) == 0
+        assert [BorrowerScoring(*row).score() for row in rows] == expected
+        assert [cache.score(*row) for row in rows] == expected
+        assert np.array_equal(np.isnan(actual), [payment is None for payment in expected])
+        assert np.allclose(actual, [math.nan if payment is None else payment for payment in expected], equal_nan=True)
+        assert BorrowerScoring(*self.__row).score() != Scorer().score(BorrowerRecord(*self.__row), DEFAULT_POLICY)
+
+    def test_snapshot_outlives_install(self):
+        record = BorrowerRecord(*self.__row)
+        policy = current_policy()
+        expected = Scorer().score(record, policy)
+
+        install_policy(self.__policy('v2', base_rate=20))
+
+        assert Scorer().score(record, policy) == expected
+        assert BorrowerScoring(*self.__row).score() != expected
+
+    def test_cli_policy_version_is_written(self, tmpdir):
+        policy = tmpdir.join('policy.json')
+        policy.write(json.dumps(self.__policy('2026-10', base_rate=11).as_dict()))
+        source = tmpdir.join('input.csv')
+        source.write(
+            'age,income_amount,loan_rating,loan_amount,credit_term,sex,income_source,purpose\n'
+            '30,10,LOW,1,5,FEMALE,BUSINESSMAN,MORTGAGE\n'
+        )
+        output = tmpdir.join('output.csv')
+
+        assert main(['score', str(source), '-o', str(output), '--policy', str(policy)]) == 0
+        assert output.read().splitlines()[1].endswith(',APPROVED,,2026-10')
+
+    def test_service_reloads_policy(self, tmpdir):
+        path = tmpdir.join('policy.json')
+        path.write(json.dumps(self.__policy('v1').as_dict()))
+
+        async def scenario():
+            service = ScoringService(max_wait=0, policy_path=str(path))
+            server = await service.start(port=0)
+            versions = [(await service.batcher.submit(self.__application()))[2]]
+
+            path.write(json.dumps(self.__policy('v2').as_dict()))
+            service.reload_policy()
+            versions.append((await service.batcher.submit(self.__application()))[2])
+
+            path.write('{')
+            service.reload_policy()
+            versions.append((await service.batcher.submit(self.__application()))[2])
+
+            await service.stop(server)
+
+            return versions
+
+        assert asyncio.run(scenario()) == ['v1', 'v2', 'v2']
+
+    def __policy(self, version, base_rate=10, MALE=65):
+        data = DEFAULT_POLICY.as_dict()
+        data.update(version=version, base_rate=base_rate)
+        data['Sex']['MALE'] = MALE
+
+        return Policy.from_dict(data)
+
+    def __application(self):
+        return dict(zip(
+            ('age', 'income_amount', 'loan_rating', 'loan_amount', 'credit_term', 'sex', 'income_source', 'purpose'),
+            (value.name if isinstance(value, Enum) else value for value in self.__row)
+        ))
@@ -0,0 +1,156 @@
+import json
+import numpy as np
+import pytest
+from enums import *
+from batch_scoring import FIELDS, decide_batch, validate_batch
+from generator import PortfolioGenerator
+from rate_table import DEFAULT_POLICY, Policy, POLICY_ENUMS
+from portfolio import (
+    HEADER_SIZE, RECORD_DTYPE, read_portfolio, read_scores, score_portfolio, write_portfolio, write_portfolio_columns
+)
+from cli import main
+
+
+class TestPortfolio:
+
+    @pytest.mark.parametrize('window', [1000, 7, 1048576])
+    def test_scores_equal_decide_batch(self, tmp_path, window):
+        columns = PortfolioGenerator(seed=3, invalid={'age': 0.01, 'credit_term': 0.01}).columns(5000)
+        errors = validate_batch(**columns)
+        payment, reason = decide_batch(**columns, errors=errors)
+        path = str(tmp_path / 'applications.portfolio')
+
+        assert write_portfolio_columns(PortfolioGenerator(
+            seed=3, invalid={'age': 0.01, 'credit_term': 0.01}
+        ).chunks(5000, chunk_size=5000), path) == 5000
+
+        assert score_portfolio(path, window=window) == path + '.scores'
+
+        header, scores = read_scores(path + '.scores')
+
+        assert header['rows'] == 5000
+        assert header['policy_version'] == 'builtin'
+        assert np.array_equal(scores['payment'], payment, equal_nan=True)
+        assert np.array_equal(scores['reason'], reason)
+
+    def test_records(self, tmp_path):
+        path = str(tmp_path / 'applications.portfolio')
+        rows = [
+            self.__row(age=30),
+            self.__row(age=30.5),
+            self.__row(age=70000),
+            self.__row(loan_amount=11)
+        ]
+
+        write_portfolio(iter(rows), path, chunk_size=3)
+        header, records = read_portfolio(path)
+
+        assert header['rows'] == 4
+        assert records.dtype == RECORD_DTYPE
+        assert records['age'].tolist() == [30, 0, 32767, 0]
+        assert records['errors'].tolist() == [0, 1, 0, 8]
+        assert records['loan_rating'].tolist() == [LoanRating.HIGH.code, 0, LoanRating.HIGH.code, 0]
+
+        score_portfolio(path, str(tmp_path / 'decisions'))
+        _, scores = read_scores(str(tmp_path / 'decisions'))
+
+        assert scores['reason'].tolist() == [Reason.APPROVED, Reason.INVALID, Reason.RETIREMENT_AGE, Reason.INVALID]
+
+    def test_empty(self, tmp_path):
+        path = str(tmp_path / 'applications.portfolio')
+
+        assert write_portfolio([], path) == 0
+        assert len(read_portfolio(path)[1]) == 0
+
+        score_portfolio(path)
+
+        assert len(read_scores(path + '.scores')[1]) == 0
+
+    def test_policy(self, tmp_path):
+        path = str(tmp_path / 'applications.portfolio')
+        values = {enum: dict(DEFAULT_POLICY.values[enum]) for enum in POLICY_ENUMS}
+        values[Sex][Sex.MALE] = 20
+
+        write_portfolio([self.__row()], path)
+        score_portfolio(path, policy=Policy('young', 10, values))
+        header, scores = read_scores(path + '.scores')
+
+        assert header['policy_version'] == 'young'
+        assert scores['reason'].tolist() == [Reason.RETIREMENT_AGE]
+
+    def test_enum_codes_follow_member_names(self, tmp_path):
+        path = str(tmp_path / 'applications.portfolio')
+
+        write_portfolio([self.__row(purpose='CAR_LOAN', loan_amount=2.0)], path)
+        # Stored code of CAR_LOAN names another member once the file lists them reversed.
+        self.__rewrite_header(path, lambda header: header['enums']['purpose'].reverse())
+        purpose = list(reversed(Purpose))[Purpose.CAR_LOAN.code]
+
+        score_portfolio(path)
+        _, scores = read_scores(path + '.scores')
+        payment, _ = decide_batch(**self.__columns(purpose=purpose, loan_amount=2.0))
+
+        assert purpose is not Purpose.CAR_LOAN
+        assert not np.isnan(payment).any()
+        assert scores['payment'].tolist() == payment.tolist()
+
+    def test_rows_of_removed_members_are_invalid(self, tmp_path):
+        path = str(tmp_path / 'applications.portfolio')
+
+        write_portfolio([self.__row(), self.__row(loan_rating='LOW')], path)
+        # The file's HIGH is not a member any more.
+        self.__rewrite_header(
+            path, lambda header: header['enums']['loan_rating'].__setitem__(LoanRating.HIGH.code, 'HIGHEST')
+        )
+
+        score_portfolio(path)
+        _, scores = read_scores(path + '.scores')
+
+        assert scores['reason'].tolist() == [Reason.INVALID, Reason.APPROVED]
+        assert np.isnan(scores['payment'][0])
+
+    def test_not_a_portfolio(self, tmp_path):
+        path = tmp_path / 'applications.csv'
+        path.write_text('age,income_amount\n' + ' ' * HEADER_SIZE)
+
+        with pytest.raises(ValueError):
+            read_portfolio(str(path))
+
+    def test_cli(self, tmp_path, capsys):
+        source = tmp_path / 'applications.jsonl'
+        source.write_text('\n'.join(json.dumps(self.__row(age=age)) for age in (30, 70)) + '\n')
+
+        assert main(['convert', str(source), '-o', str(tmp_path / 'applications.portfolio')]) == 0
+        assert main(['score', str(tmp_path / 'applications.portfolio')]) == 0
+
+        _, scores = read_scores(str(tmp_path / 'applications.portfolio.scores'))
+
+        assert scores['reason'].tolist() == [Reason.APPROVED, Reason.RETIREMENT_AGE]
+        assert main(['score', str(tmp_path / 'applications.portfolio'), '--output-format', 'csv']) == 2
+        assert 'scores file' in capsys.readouterr().err
+
+    @staticmethod
+    def __row(**fields):
+        row = {
+            'age': 30, 'income_amount': 10, 'loan_rating': 'HIGH', 'loan_amount': 1.0, 'credit_term': 5,
+            'sex': 'MALE', 'income_source': 'EMPLOYEE', 'purpose': 'MORTGAGE'
+        }
+        row.update(fields)
+
+        return row
+
+    @classmethod
+    def __columns(cls, purpose, **fields):
+        row = cls.__row(purpose=purpose.name, **fields)
+        enums = {'loan_rating': LoanRating, 'sex': Sex, 'income_source': IncomeSource, 'purpose': Purpose}
+
+        return {field: np.array([enums[field][row[field]].code if field in enums else row[field]]) for field in FIELDS}
+
+    @staticmethod
+    def __rewrite_header(path, change):
+        with open(path, 'r+b') as stream:
+            encoded = stream.read(HEADER_SIZE)
+            magic, header = encoded[:8], json.loads(encoded[8:].decode())
+            change(header)
+            stream.seek(0)
+            stream.write((magic + json.dumps(header).encode()).ljust(HEADER_SIZE, b' '))
@@ -0,0 +1,68 @@
+import itertools
+import threading
+import pytest
+from enums import *
+from exceptions import *
+from borrower_scoring import BorrowerRecord, BorrowerScoring, Scorer
+
+
+class TestScorer:
+
+    __rows = list(itertools.product(
+        (25, 55), (1, 5, 16), LoanRating, (0.1, 1, 5, 10), (1, 10, 20), Sex, IncomeSource, (Purpose.MORTGAGE, Purpose.LOAN)
+    ))
+
+    def test_one_scorer_for_all_records(self):
+        scorer = Scorer()
+
+        for row in self.__rows:
+            assert scorer.score(BorrowerRecord(*row)) == BorrowerScoring(*row).score()
+
+    def test_decide_agrees_with_score(self):
+        scorer = Scorer()
+
+        for row in self.__rows:
+            record = BorrowerRecord(*row)
+            decision = scorer.decide(record)
+
+            assert decision.payment == scorer.score(record)
+            assert (decision.reason is Reason.APPROVED) == (decision.payment is not None)
+            assert (decision.rate is None) == (decision.reason not in (Reason.APPROVED, Reason.HALF_OF_INCOME))
+            assert BorrowerScoring(*row).decide() == decision
+
+    def test_decide_known_decisions(self):
+        scorer = Scorer()
+        approved = scorer.decide(BorrowerRecord(30, 10, LoanRating.LOW, 1, 5, Sex.FEMALE, IncomeSource.BUSINESSMAN, Purpose.MORTGAGE))
+        capped = scorer.decide(BorrowerRecord(30, 2, LoanRating.NORMAL, 7, 20, Sex.MALE, IncomeSource.BUSINESSMAN, Purpose.LOAN))
+
+        assert approved == (Reason.APPROVED, 0.2975, 9.75)
+        assert capped.reason is Reason.HALF_OF_INCOME and capped.payment is None and capped.rate is not None
+
+    def test_scorer_shared_between_threads(self):
+        scorer = Scorer()
+        records = [BorrowerRecord(*row) for row in self.__rows]
+        expected = [scorer.score(record) for record in records]
+        results = [None] * 4
+
+        def run(i):
+            results[i] = [scorer.score(record) for record in records]
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert results == [expected] * len(results)
+
+    def test_record_has_no_instance_dict(self):
+        record = BorrowerRecord(*self.__rows[0])
+
+        assert not hasattr(record, '__dict__')
+        assert not hasattr(BorrowerScoring(*self.__rows[0]), '__dict__')
+
+    def test_record_validates_arguments(self):
+        with pytest.raises(InvalidLoanAmountException):
+            BorrowerRecord(25, 5, LoanRating.HIGH, 11, 5, Sex.MALE, IncomeSource.EMPLOYEE, Purpose.MORTGAGE)
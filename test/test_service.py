@@ -0,0 +1,115 @@
+import asyncio
+import json
+import pytest
+from enums import *
+from service import MicroBatcher, ScoringService
+
+
+class TestService:
+
+    __application = {
+        'age': 30,
+        'income_amount': 10,
+        'loan_rating': 'LOW',
+        'loan_amount': 1,
+        'credit_term': 5,
+        'sex': 'FEMALE',
+        'income_source': 'BUSINESSMAN',
+        'purpose': 'MORTGAGE'
+    }
+
+    def test_concurrent_applications_are_batched(self):
+        async def scenario():
+            batcher = MicroBatcher(max_batch_size=4, max_wait=0.05)
+            task = asyncio.ensure_future(batcher.run())
+            results = await asyncio.gather(*(batcher.submit(dict(self.__application)) for _ in range(10)))
+            task.cancel()
+
+            return results, batcher.stats()
+
+        results, stats = asyncio.run(scenario())
+
+        assert results == [(0.2975, Reason.APPROVED, 'builtin')] * 10
+        assert stats['batch_size']['count'] == 3
+        assert stats['batch_size']['buckets']['4'] == 3
+
+    def test_invalid_application_fails_alone(self):
+        async def scenario():
+            batcher = MicroBatcher(max_batch_size=4, max_wait=0.05)
+            task = asyncio.ensure_future(batcher.run())
+            results = await asyncio.gather(
+                batcher.submit(dict(self.__application, sex='UNKNOWN')),
+                batcher.submit(dict(self.__application, income_source='UNEMPLOYED')),
+                return_exceptions=True
+            )
+            task.cancel()
+
+            return results
+
+        invalid, rejected = asyncio.run(scenario())
+
+        assert isinstance(invalid, ValueError)
+        assert rejected == (None, Reason.UNRELIABLE_BORROWER, 'builtin')
+
+    def test_failed_batch_does_not_stop_the_batcher(self, monkeypatch):
+        import service
+
+        def fail(*args, **kwargs):
+            monkeypatch.undo()
+            raise OverflowError('broken batch')
+
+        async def scenario():
+            batcher = MicroBatcher(max_batch_size=4, max_wait=0.05)
+            task = asyncio.ensure_future(batcher.run())
+            monkeypatch.setattr(service, 'decide_batch', fail)
+            failed = await asyncio.gather(
+                asyncio.wait_for(batcher.submit(dict(self.__application)), 1), return_exceptions=True
+            )
+            result = await asyncio.wait_for(batcher.submit(dict(self.__application)), 1)
+            task.cancel()
+
+            return failed, result
+
+        (failed,), result = asyncio.run(scenario())
+
+        assert isinstance(failed, OverflowError)
+        assert result == (0.2975, Reason.APPROVED, 'builtin')
+
+    @pytest.mark.parametrize(
+        ('method', 'path', 'body', 'expected'), [
+            ('POST', '/score', __application, (200, {'payment': 0.2975, 'reason': 'APPROVED', 'policy_version': 'builtin'})),
+            ('POST', '/score', [__application, dict(__application, age=60)], (200, [
+                {'payment': 0.2975, 'reason': 'APPROVED', 'policy_version': 'builtin'},
+                {'payment': None, 'reason': 'RETIREMENT_AGE', 'policy_version': 'builtin'}
+            ])),
+            ('POST', '/score', dict(__application, purpose=None), (400, None)),
+            ('POST', '/score', dict(__application, age=-1), (400, {'error': 'invalid InvalidAgeException'})),
+            ('POST', '/score', dict(__application, age=10 ** 400), (400, {'error': 'invalid InvalidAgeException'})),
+            ('GET', '/score', None, (405, None)),
+            ('GET', '/unknown', None, (404, None))
+        ]
+    )
+    def test_http_endpoint(self, method, path, body, expected):
+        async def scenario():
+            service = ScoringService(max_batch_size=8, max_wait=0.001)
+            server = await service.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            content = b'' if body is None else json.dumps(body).encode()
+            writer.write(('%s %s HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' % (
+                method, path, len(content)
+            )).encode() + content)
+            response = await reader.read()
+            writer.close()
+            await service.stop(server)
+
+            return response
+
+        head, _, content = asyncio.run(scenario()).partition(b'\r\n\r\n')
+        status, payload = expected
+
+        assert int(head.split()[1]) == status
+
+        if payload is not None:
+            assert json.loads(content) == payload